@@ -0,0 +1,152 @@
+# bridge_format.py
+#
+# Compare the JSON worker results with columnar frames (scripts/columnar.py)
+# for the two tabular payloads: portfolio holdings (get_portfolio) and
+# analytics with its per-holding contributions and growth series
+# (get_analytics). For each portfolio size it reports payload size, Python
+# encode time, and Node decode time (JSON.parse vs decodeFrame, and
+# decodeFrame + toResult for callers that still want plain objects).
+#
+# Usage (from the backend directory):
+#   python3 benchmarks/bridge_format.py
+#   python3 benchmarks/bridge_format.py --sizes 17,500,5000 --iterations 20
+#
+# The synthetic portfolio and three years of prices are generated locally, so
+# no network or market-data stand-ins are needed.
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, 'scripts'))
+
+import numpy as np
+import pandas as pd
+
+import columnar
+from allocation import SYMBOL_COLUMN, WEIGHT_COLUMN, holdings_records
+from analytics import compute_analytics, encode_analytics
+from server import portfolio_frame
+
+DEFAULT_SIZES = [17, 500, 5000]
+HISTORY_DAYS = 756  # three years of sessions
+
+# Times decoding each payload file in a fresh node process; prints JSON
+NODE_DECODE = r"""
+const fs = require('fs');
+const { decodeFrame, toResult } = require(process.argv[1]);
+const [jsonPath, framePath, iterations] = [process.argv[2], process.argv[3], Number(process.argv[4])];
+const text = fs.readFileSync(jsonPath, 'utf8');
+const frame = fs.readFileSync(framePath);
+const time = (fn) => {
+  const samples = [];
+  for (let i = 0; i < iterations; i++) {
+    const start = process.hrtime.bigint();
+    fn();
+    samples.push(Number(process.hrtime.bigint() - start) / 1e6);
+  }
+  samples.sort((a, b) => a - b);
+  return samples[Math.floor(samples.length / 2)];
+};
+const same = JSON.stringify(toResult(decodeFrame(frame))) === JSON.stringify(JSON.parse(text));
+console.log(JSON.stringify({
+  json_parse_ms: time(() => JSON.parse(text)),
+  decode_frame_ms: time(() => decodeFrame(frame)),
+  decode_frame_to_result_ms: time(() => toResult(decodeFrame(frame))),
+  round_trip_equal: same
+}));
+"""
+
+def synthetic_portfolio(size, seed=42):
+    rng = np.random.default_rng(seed)
+    weights = rng.dirichlet(np.ones(size)) * 100
+    return pd.DataFrame({
+        SYMBOL_COLUMN: [f"T{i:04d}" for i in range(size)],
+        'Market Cap': rng.uniform(1e9, 3e12, size).round(0),
+        'Revenue': rng.uniform(1e8, 5e11, size).round(0),
+        'Volatility': rng.uniform(0.1, 0.9, size),
+        WEIGHT_COLUMN: weights,
+    })
+
+def synthetic_prices(tickers, seed=42):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end=pd.Timestamp('2026-10-16'), periods=HISTORY_DAYS)
+    steps = rng.normal(0.0004, 0.02, (HISTORY_DAYS, len(tickers)))
+    return pd.DataFrame(100 * np.exp(np.cumsum(steps, axis=0)), index=dates, columns=tickers)
+
+def median_ms(fn, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return round(statistics.median(samples) * 1000, 3)
+
+def node_decode(text, frame, iterations):
+    if not shutil.which('node'):
+        return None
+    with tempfile.TemporaryDirectory() as scratch:
+        json_path = os.path.join(scratch, 'payload.json')
+        frame_path = os.path.join(scratch, 'payload.frame')
+        with open(json_path, 'w') as f:
+            f.write(text)
+        with open(frame_path, 'wb') as f:
+            f.write(frame)
+        output = subprocess.run(
+            ['node', '-e', NODE_DECODE, os.path.join(BACKEND_DIR, 'columnar.js'), json_path, frame_path, str(iterations)],
+            capture_output=True, text=True, check=True
+        ).stdout
+    return {name: round(value, 3) if isinstance(value, float) else value
+            for name, value in json.loads(output).items()}
+
+def measure(encode_json, encode_frame, iterations):
+    text = encode_json()
+    frame = encode_frame()
+    return {
+        'json_bytes': len(text.encode('utf-8')),
+        'frame_bytes': len(frame),
+        'json_encode_ms': median_ms(encode_json, iterations),
+        'frame_encode_ms': median_ms(encode_frame, iterations),
+        'python_round_trip_equal': columnar.to_result(frame) == json.loads(text),
+        'node': node_decode(text, frame, iterations),
+    }
+
+def benchmark(size, iterations):
+    portfolio_df = synthetic_portfolio(size)
+
+    def portfolio_json():
+        return json.dumps({
+            "Portfolio Name": "AlphaFlex Growth",
+            "Holdings": holdings_records(portfolio_df, weight_decimals=0)
+        }, allow_nan=False)
+
+    weights = portfolio_df.set_index(SYMBOL_COLUMN)[WEIGHT_COLUMN]
+    analytics = {'success': True, 'analytics': compute_analytics(synthetic_prices(list(weights.index)), weights)}
+
+    return {
+        'size': size,
+        'get_portfolio': measure(portfolio_json, lambda: portfolio_frame(portfolio_df), iterations),
+        'get_analytics': measure(lambda: json.dumps(analytics, allow_nan=False),
+                                 lambda: encode_analytics(analytics), iterations),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare JSON and columnar worker payloads')
+    parser.add_argument('--sizes', default=','.join(str(size) for size in DEFAULT_SIZES),
+                        help='comma-separated portfolio sizes')
+    parser.add_argument('--iterations', type=int, default=10)
+    args = parser.parse_args()
+
+    results = [benchmark(int(size), args.iterations) for size in args.sizes.split(',')]
+    print(json.dumps({'schema_version': columnar.SCHEMA_VERSION, 'results': results}, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+# Offline stand-in for alpha_flex (see benchmarks/fakes/fake_market.py)
+
+import numpy as np
+import pandas as pd
+
+import fake_market
+
+PERIOD_OFFSETS = {
+    '1d': pd.DateOffset(days=1),
+    '5d': pd.DateOffset(days=7),
+    '1m': pd.DateOffset(months=1),
+    '3m': pd.DateOffset(months=3),
+    '1y': pd.DateOffset(years=1),
+}
+
+def get_portfolio():
+    fake_market.api_call('alpha_flex.get_portfolio')
+    symbols = fake_market.tickers()
+    rng = np.random.default_rng(fake_market.config()['seed'])
+    return pd.DataFrame({
+        'Stock': symbols,
+        'Market Cap': rng.uniform(1e9, 3e12, len(symbols)),
+        'Revenue': rng.uniform(1e8, 1e11, len(symbols)),
+        'Volatility': rng.uniform(10, 90, len(symbols)),
+        'Stock Allocation Weight (%)': fake_market.weights(len(symbols)),
+    })
+
+def backtest_portfolio(initial_investment, period='1y'):
+    fake_market.api_call('alpha_flex.backtest_portfolio')
+    symbols = fake_market.tickers()
+    end = pd.Timestamp.now().normalize()
+    if period == 'ytd':
+        start = pd.Timestamp(year=end.year, month=1, day=1)
+    else:
+        start = end - PERIOD_OFFSETS[period]
+    prices = fake_market.price_history(symbols, start=start, end=end)
+    growth = (prices.iloc[-1] / prices.iloc[0]).to_numpy()
+    w = fake_market.weights(len(symbols)) / 100
+    final_value = initial_investment * float((w * growth).sum())
+    return {
+        'Initial Investment': initial_investment,
+        'Final Value': final_value,
+        'Percentage Return': (final_value / initial_investment - 1) * 100,
+    }
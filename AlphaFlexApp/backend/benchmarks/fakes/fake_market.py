@@ -0,0 +1,85 @@
+# fake_market.py
+#
+# Shared state for the offline stand-ins of robin_stocks, alpha_flex and
+# yfinance used by the benchmarks. Configured through environment variables so
+# it also works for scripts spawned in a subprocess:
+#
+#   FAKE_MARKET_SIZE     number of holdings in the synthetic portfolio (17)
+#   FAKE_LATENCY_MS      added latency per simulated API call (0)
+#   FAKE_FAILURE_RATE    probability that an order call raises (0)
+#   FAKE_SEED            random seed for prices and failures (42)
+
+import functools
+import os
+import random
+import threading
+import time
+import zlib
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+HISTORY_START = '2018-01-02'
+
+_real_sleep = time.sleep
+_lock = threading.Lock()
+
+calls = Counter()
+
+def config():
+    return {
+        'size': int(os.environ.get('FAKE_MARKET_SIZE', '17')),
+        'latency': float(os.environ.get('FAKE_LATENCY_MS', '0')) / 1000,
+        'failure_rate': float(os.environ.get('FAKE_FAILURE_RATE', '0')),
+        'seed': int(os.environ.get('FAKE_SEED', '42')),
+    }
+
+_rng = random.Random(config()['seed'])
+
+def api_call(name, can_fail=False):
+    """Record a simulated API call, apply latency and maybe fail"""
+    settings = config()
+    with _lock:
+        calls[name] += 1
+        fail = can_fail and _rng.random() < settings['failure_rate']
+    if settings['latency']:
+        _real_sleep(settings['latency'])
+    if fail:
+        raise Exception(f"Simulated failure in {name}")
+
+def reset():
+    calls.clear()
+
+def tickers(size=None):
+    size = size or config()['size']
+    return [f"T{i:04d}" for i in range(size)]
+
+def weights(size=None):
+    """Deterministic weights (in %) summing to 100"""
+    size = size or config()['size']
+    raw = np.linspace(2.0, 1.0, size)
+    return raw / raw.sum() * 100
+
+def _symbol_seed(symbol):
+    return zlib.crc32(symbol.encode('utf-8'))
+
+@functools.lru_cache(maxsize=1)
+def _history_dates():
+    return pd.bdate_range(HISTORY_START, pd.Timestamp.now().normalize())
+
+@functools.lru_cache(maxsize=None)
+def _full_history(symbol):
+    dates = _history_dates()
+    rng = np.random.default_rng(_symbol_seed(symbol))
+    closes = 100 * np.exp(np.cumsum(rng.normal(0.0005, 0.02, len(dates))))
+    return pd.Series(closes, index=dates)
+
+def price_history(symbols, start=None, end=None):
+    """Deterministic random-walk daily closes for symbols"""
+    end = pd.Timestamp(end) if end is not None else pd.Timestamp.now().normalize()
+    start = pd.Timestamp(start) if start is not None else end - pd.DateOffset(years=3)
+    return pd.DataFrame({symbol: _full_history(symbol).loc[start:end] for symbol in symbols})
+
+def latest_price(symbol):
+    return float(_full_history(symbol).iloc[-1].round(2))
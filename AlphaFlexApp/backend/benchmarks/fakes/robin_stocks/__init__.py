@@ -0,0 +1 @@
+# Offline stand-in for robin_stocks (see benchmarks/fakes/fake_market.py)
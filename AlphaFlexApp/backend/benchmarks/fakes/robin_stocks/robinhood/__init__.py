@@ -0,0 +1,40 @@
+# Offline stand-in for robin_stocks.robinhood with configurable latency and
+# failures, in the spirit of tests/mocks/robin_stocks.js
+
+import fake_market
+
+from . import helper, orders, stocks, urls
+from .orders import get_all_stock_orders, get_stock_order_info
+
+def login(username=None, password=None, **kwargs):
+    fake_market.api_call('login')
+    return {'access_token': 'fake-token', 'token_type': 'Bearer', 'expires_in': kwargs.get('expiresIn', 3600)}
+
+def logout():
+    fake_market.api_call('logout')
+
+def load_account_profile(*args, **kwargs):
+    fake_market.api_call('load_account_profile')
+    return {'account_number': 'FAKE0001', 'buying_power': '100000000.00'}
+
+def load_portfolio_profile(*args, **kwargs):
+    fake_market.api_call('load_portfolio_profile')
+    return {'withdrawable_amount': '100000000.00'}
+
+def load_user_profile(*args, **kwargs):
+    fake_market.api_call('load_user_profile')
+    return {'first_name': 'Bench', 'last_name': 'Mark'}
+
+def get_all_positions(*args, **kwargs):
+    fake_market.api_call('get_all_positions')
+    return [
+        {
+            'symbol': symbol,
+            'instrument': f"https://api.robinhood.com/instruments/{symbol.lower()}/",
+            'quantity': '1.500000'
+        }
+        for symbol in fake_market.tickers()
+    ]
+
+def get_open_stock_positions(*args, **kwargs):
+    return get_all_positions()
@@ -0,0 +1,11 @@
+import fake_market
+
+def update_session(key, value):
+    pass
+
+def set_login_state(logged_in):
+    pass
+
+def request_post(url, payload=None, **kwargs):
+    fake_market.api_call('request_post')
+    return {'access_token': 'fake-token', 'token_type': 'Bearer', 'refresh_token': 'fake-refresh'}
@@ -0,0 +1,40 @@
+import itertools
+import threading
+from datetime import datetime, timezone
+
+import fake_market
+
+_ids = itertools.count(1)
+_lock = threading.Lock()
+_orders = {}
+
+def _place(side, symbol, quantity):
+    fake_market.api_call(f'order_{side}_fractional_by_quantity', can_fail=True)
+    with _lock:
+        order_id = f"fake-order-{next(_ids)}"
+        now = datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
+        order = {
+            'id': order_id,
+            'state': 'filled',
+            'side': side,
+            'quantity': str(quantity),
+            'instrument': f"https://api.robinhood.com/instruments/{symbol.lower()}/",
+            'created_at': now,
+            'updated_at': now
+        }
+        _orders[order_id] = order
+    return order
+
+def order_buy_fractional_by_quantity(symbol, quantity, timeInForce='gfd', extendedHours=False, **kwargs):
+    return _place('buy', symbol, quantity)
+
+def order_sell_fractional_by_quantity(symbol, quantity, timeInForce='gfd', extendedHours=False, **kwargs):
+    return _place('sell', symbol, quantity)
+
+def get_stock_order_info(orderID):
+    fake_market.api_call('get_stock_order_info')
+    return _orders.get(orderID)
+
+def get_all_stock_orders(info=None, start_date=None, **kwargs):
+    fake_market.api_call('get_all_stock_orders')
+    return list(_orders.values())
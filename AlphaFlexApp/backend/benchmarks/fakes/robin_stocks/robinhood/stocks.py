@@ -0,0 +1,10 @@
+import fake_market
+
+def get_latest_price(inputSymbols, priceType=None, includeExtendedHours=True):
+    fake_market.api_call('get_latest_price')
+    symbols = [inputSymbols] if isinstance(inputSymbols, str) else list(inputSymbols)
+    return [str(fake_market.latest_price(symbol)) for symbol in symbols]
+
+def get_symbol_by_url(url):
+    fake_market.api_call('get_symbol_by_url')
+    return url.rstrip('/').rsplit('/', 1)[-1].upper()
@@ -0,0 +1,2 @@
+def login_url():
+    return 'https://api.robinhood.com/oauth2/token/'
@@ -0,0 +1,27 @@
+# Offline stand-in for yfinance.download (see benchmarks/fakes/fake_market.py)
+
+import pandas as pd
+
+import fake_market
+
+PERIOD_OFFSETS = {
+    '1d': pd.DateOffset(days=1),
+    '5d': pd.DateOffset(days=7),
+    '1mo': pd.DateOffset(months=1),
+    '3mo': pd.DateOffset(months=3),
+    '1y': pd.DateOffset(years=1),
+    '2y': pd.DateOffset(years=2),
+    '3y': pd.DateOffset(years=3),
+    '5y': pd.DateOffset(years=5),
+}
+
+def download(tickers, period=None, start=None, end=None, **kwargs):
+    fake_market.api_call('yfinance.download')
+    symbols = [tickers] if isinstance(tickers, str) else list(tickers)
+    end = pd.Timestamp(end) if end is not None else pd.Timestamp.now().normalize()
+    if start is None:
+        start = end - PERIOD_OFFSETS.get(period or '1y', pd.DateOffset(years=1))
+
+    closes = fake_market.price_history(symbols, start=start, end=end)
+    closes.columns = pd.MultiIndex.from_product([['Close'], closes.columns])
+    return closes
@@ -0,0 +1,105 @@
+# import_profile.py
+#
+# Import-time profile of a backend script's cold start. Runs the script under
+# `python3 -X importtime` and summarizes the slowest imports by cumulative time.
+#
+# Usage (from the backend directory):
+#   python3 benchmarks/import_profile.py robinhood_order.py verify
+#   python3 benchmarks/import_profile.py --top 30 performance.py
+#   python3 benchmarks/import_profile.py --offline --module robinhood_order
+#
+# Options go before the script name; everything after it is passed to the
+# script. --offline resolves robin_stocks, alpha_flex and yfinance to the
+# stand-ins in benchmarks/fakes. --module profiles a bare import instead of
+# running a script.
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS_DIR = os.path.join(BACKEND_DIR, 'scripts')
+FAKES_DIR = os.path.join(BACKEND_DIR, 'benchmarks', 'fakes')
+
+def parse_importtime(stderr):
+    """Parse `-X importtime` lines into [{module, self_us, cumulative_us, depth}]"""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+            imports.append({
+                'module': name.strip(),
+                'self_us': int(self_us),
+                'cumulative_us': int(cumulative_us),
+                # Nested imports are indented two spaces per level
+                'depth': (len(name) - len(name.lstrip()) - 1) // 2,
+            })
+        except ValueError:
+            continue
+    return imports
+
+def profile(argv, env, cwd):
+    """Run argv under -X importtime, returning (wall seconds, parsed imports)"""
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', *argv],
+        cwd=cwd,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True
+    )
+    return time.perf_counter() - start, parse_importtime(completed.stderr)
+
+def summarize(wall_time, imports, top):
+    top_level = [item for item in imports if item['depth'] == 0]
+    return {
+        'wall_ms': round(wall_time * 1000, 1),
+        'import_ms': round(sum(item['cumulative_us'] for item in top_level) / 1000, 1),
+        'modules': len(imports),
+        'slowest': sorted(top_level, key=lambda item: item['cumulative_us'], reverse=True)[:top],
+    }
+
+def print_summary(summary):
+    print(f"wall {summary['wall_ms']} ms, imports {summary['import_ms']} ms across {summary['modules']} modules")
+    print(f"{'cumulative ms':>14}{'self ms':>10}  module")
+    for item in summary['slowest']:
+        print(f"{item['cumulative_us'] / 1000:>14.1f}{item['self_us'] / 1000:>10.1f}  {item['module']}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Summarize import time of a backend script')
+    parser.add_argument('script', nargs='?', help='script under scripts/, e.g. robinhood_order.py')
+    parser.add_argument('args', nargs=argparse.REMAINDER, help='arguments passed to the script')
+    parser.add_argument('--module', help='profile `import MODULE` instead of running a script')
+    parser.add_argument('--top', type=int, default=15, help='number of imports to list')
+    parser.add_argument('--offline', action='store_true', help='use the stand-ins in benchmarks/fakes')
+    parser.add_argument('--json', action='store_true', help='print the summary as JSON')
+    args = parser.parse_args()
+
+    if not args.script and not args.module:
+        parser.error('a script or --module is required')
+
+    env = dict(os.environ)
+    paths = [SCRIPTS_DIR, env.get('PYTHONPATH', '')]
+    if args.offline:
+        paths.insert(0, FAKES_DIR)
+    env['PYTHONPATH'] = os.pathsep.join(paths)
+
+    if args.module:
+        argv = ['-c', f"import {args.module}"]
+    else:
+        argv = [os.path.join(SCRIPTS_DIR, args.script), *args.args]
+
+    summary = summarize(*profile(argv, env, BACKEND_DIR), args.top)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print_summary(summary)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+# run_benchmarks.py
+#
+# Baseline benchmarks for the backend Python entry points against an offline
+# market-data stand-in (benchmarks/fakes). For each entry point and portfolio
+# size it reports wall time, simulated API call counts, peak traced memory and
+# the time taken to import the entry point's module.
+#
+# Usage (from the backend directory):
+#   python3 benchmarks/run_benchmarks.py
+#   python3 benchmarks/run_benchmarks.py --sizes 17,100,500 --latency-ms 50 --failure-rate 0.05
+#   python3 benchmarks/run_benchmarks.py --entry place_orders --sleep-scale 0.01
+#
+# Every measurement runs in a fresh interpreter inside a scratch directory, so
+# caches and the local price store start cold and imports are not shared.
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+SCRIPTS_DIR = os.path.join(BACKEND_DIR, 'scripts')
+FAKES_DIR = os.path.join(BENCH_DIR, 'fakes')
+
+# entry point -> module that provides it
+ENTRY_POINTS = {
+    'get_all_performance': 'performance',
+    'get_portfolio': 'server',
+    'place_orders': 'robinhood_order',
+    'sell_all_positions': 'robinhood_order',
+}
+
+DEFAULT_SIZES = [17, 100, 500]
+
+def offline_env(size, latency_ms=0, failure_rate=0, extra=None):
+    """Environment that resolves robin_stocks, alpha_flex and yfinance to the fakes"""
+    env = dict(os.environ)
+    env.update({
+        'PYTHONPATH': os.pathsep.join([FAKES_DIR, SCRIPTS_DIR, env.get('PYTHONPATH', '')]),
+        'FAKE_MARKET_SIZE': str(size),
+        'FAKE_LATENCY_MS': str(latency_ms),
+        'FAKE_FAILURE_RATE': str(failure_rate),
+    })
+    env.update(extra or {})
+    return env
+
+def holdings(size):
+    import fake_market
+    return [
+        {'Stock': symbol, 'Stock Allocation Weight (%)': float(weight)}
+        for symbol, weight in zip(fake_market.tickers(size), fake_market.weights(size))
+    ]
+
+def prepare_workdir(size):
+    """Write the weights file performance.py expects into the scratch directory"""
+    import fake_market
+    with open('final_file.csv', 'w') as f:
+        f.write('Ticker,Weights\n')
+        for symbol, weight in zip(fake_market.tickers(size), fake_market.weights(size)):
+            f.write(f"{symbol},{weight}\n")
+
+def run_child(entry, size, sleep_scale):
+    """Measure one entry point in this (fresh) process and print a JSON result"""
+    import importlib
+    import tracemalloc
+
+    import fake_market
+
+    # Scale the scripts' deliberate pauses (inter-order delays, retry backoff);
+    # fake_market keeps the real sleep for simulated latency
+    real_sleep = time.sleep
+    time.sleep = lambda seconds: real_sleep(seconds * sleep_scale)
+
+    prepare_workdir(size)
+    module = importlib.import_module(ENTRY_POINTS[entry])
+
+    if entry in ('place_orders', 'sell_all_positions'):
+        module.check_market_hours = lambda: True
+
+    fake_market.reset()
+    tracemalloc.start()
+    start = time.perf_counter()
+
+    if entry == 'get_all_performance':
+        result = module.compute_all_performance()
+    elif entry == 'get_portfolio':
+        result = module.build_portfolio()
+    elif entry == 'place_orders':
+        result = module.place_orders(1000 * size, holdings(size))
+    else:
+        result = module.sell_all_positions(holdings(size))
+
+    wall_time = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    ok = not (isinstance(result, dict) and result.get('success') is False)
+    print(json.dumps({
+        'entry': entry,
+        'size': size,
+        'ok': ok,
+        'wall_s': round(wall_time, 4),
+        'peak_mb': round(peak / (1024 * 1024), 2),
+        'api_calls': dict(fake_market.calls),
+    }), file=sys.__stdout__)
+
+def measure_import_time(entry, env):
+    """Cold import time of the entry point's module in a fresh interpreter"""
+    code = (
+        "import time; start = time.perf_counter(); "
+        f"import {ENTRY_POINTS[entry]}; "
+        "print(time.perf_counter() - start)"
+    )
+    completed = subprocess.run(
+        [sys.executable, '-c', code],
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True
+    )
+    try:
+        return round(float(completed.stdout.strip().splitlines()[-1]), 4)
+    except (ValueError, IndexError):
+        return None
+
+def run_measurement(entry, size, args):
+    env = offline_env(size, args.latency_ms, args.failure_rate)
+    with tempfile.TemporaryDirectory() as workdir:
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--child', entry, str(size),
+             '--sleep-scale', str(args.sleep_scale)],
+            cwd=workdir,
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL if not args.verbose else None,
+            text=True
+        )
+    lines = [line for line in completed.stdout.splitlines() if line.startswith('{"entry"')]
+    if completed.returncode != 0 or not lines:
+        return {'entry': entry, 'size': size, 'ok': False, 'error': f"exit code {completed.returncode}"}
+
+    result = json.loads(lines[-1])
+    result['import_s'] = measure_import_time(entry, env)
+    return result
+
+def print_table(results):
+    header = f"{'entry point':<22}{'size':>6}{'wall s':>10}{'import s':>10}{'peak MB':>10}{'calls':>8}  ok"
+    print(header)
+    print('-' * len(header))
+    for result in results:
+        if 'wall_s' not in result:
+            print(f"{result['entry']:<22}{result['size']:>6}  {result.get('error')}")
+            continue
+        print(f"{result['entry']:<22}{result['size']:>6}{result['wall_s']:>10.3f}{result['import_s']:>10.3f}"
+              f"{result['peak_mb']:>10.2f}{sum(result['api_calls'].values()):>8}  {result['ok']}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark backend Python entry points offline')
+    parser.add_argument('--entry', choices=sorted(ENTRY_POINTS) + ['all'], default='all')
+    parser.add_argument('--sizes', default=','.join(str(size) for size in DEFAULT_SIZES),
+                        help='comma-separated portfolio sizes')
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--failure-rate', type=float, default=0)
+    parser.add_argument('--sleep-scale', type=float, default=0,
+                        help='multiplier for the scripts\' own sleeps (0 skips them)')
+    parser.add_argument('--json', action='store_true', help='print raw JSON results')
+    parser.add_argument('--verbose', action='store_true', help='show script stderr')
+    parser.add_argument('--child', nargs=2, metavar=('ENTRY', 'SIZE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        # Keep the scripts' own prints off the result line
+        sys.stdout = sys.stderr
+        run_child(args.child[0], int(args.child[1]), args.sleep_scale)
+        return
+
+    entries = sorted(ENTRY_POINTS) if args.entry == 'all' else [args.entry]
+    sizes = [int(size) for size in args.sizes.split(',')]
+    results = [run_measurement(entry, size, args) for entry in entries for size in sizes]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_table(results)
+
+if __name__ == "__main__":
+    main()
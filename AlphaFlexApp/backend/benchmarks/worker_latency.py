@@ -0,0 +1,132 @@
+# worker_latency.py
+#
+# Compare request latency of the spawn-per-call model (one python3 process per
+# request, as server.js and order_monitor.js used to do) against the
+# long-lived scripts/worker.py process.
+#
+# Usage (from the backend directory):
+#   python3 benchmarks/worker_latency.py --method verify_order_status --iterations 20
+#   python3 benchmarks/worker_latency.py --method get_all_performance --iterations 5
+#   python3 benchmarks/worker_latency.py --offline --size 500
+#
+# --offline resolves robin_stocks, alpha_flex and yfinance to the stand-ins in
+# benchmarks/fakes so the comparison runs without network access.
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS_DIR = os.path.join(BACKEND_DIR, 'scripts')
+
+# How each worker method was invoked before the worker existed
+SPAWN_COMMANDS = {
+    'get_portfolio': lambda params: ['server.py'],
+    'get_all_performance': lambda params: ['performance.py'],
+    'verify_order_status': lambda params: ['robinhood_order.py', 'verify', params['order_id']],
+}
+
+DEFAULT_PARAMS = {
+    'get_portfolio': {},
+    'get_all_performance': {},
+    'verify_order_status': {'order_id': 'benchmark-order'},
+}
+
+def run_spawned(method, params, env):
+    """Time one request served by a fresh interpreter"""
+    script, *args = SPAWN_COMMANDS[method](params)
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, os.path.join(SCRIPTS_DIR, script), *args],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL
+    )
+    return time.perf_counter() - start
+
+class WorkerClient:
+    """Minimal line-oriented client for scripts/worker.py"""
+
+    def __init__(self, env):
+        start = time.perf_counter()
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.join(SCRIPTS_DIR, 'worker.py')],
+            cwd=BACKEND_DIR,
+            env=env,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True
+        )
+        ready = json.loads(self.process.stdout.readline())
+        if ready.get('event') != 'ready':
+            raise RuntimeError(f"Unexpected worker greeting: {ready}")
+        self.startup_time = time.perf_counter() - start
+        self.next_id = 1
+
+    def call(self, method, params):
+        request_id = self.next_id
+        self.next_id += 1
+        self.process.stdin.write(json.dumps({'id': request_id, 'method': method, 'params': params}) + '\n')
+        self.process.stdin.flush()
+        while True:
+            message = json.loads(self.process.stdout.readline())
+            if message.get('id') == request_id:
+                return message
+
+    def close(self):
+        self.process.stdin.close()
+        self.process.wait()
+
+def summarize(samples):
+    samples = sorted(samples)
+    return {
+        'mean_ms': round(statistics.mean(samples) * 1000, 2),
+        'p50_ms': round(samples[len(samples) // 2] * 1000, 2),
+        'max_ms': round(samples[-1] * 1000, 2),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare spawn-per-call and worker latency')
+    parser.add_argument('--method', choices=sorted(SPAWN_COMMANDS), default='verify_order_status')
+    parser.add_argument('--iterations', type=int, default=10)
+    parser.add_argument('--params', type=json.loads, default=None,
+                        help='JSON object of method parameters')
+    parser.add_argument('--offline', action='store_true', help='use the fake market data stand-ins')
+    parser.add_argument('--size', type=int, default=17, help='offline portfolio size')
+    args = parser.parse_args()
+
+    params = args.params if args.params is not None else DEFAULT_PARAMS[args.method]
+    if args.offline:
+        from run_benchmarks import offline_env
+        env = offline_env(args.size)
+    else:
+        env = dict(os.environ)
+
+    spawned = [run_spawned(args.method, params, env) for _ in range(args.iterations)]
+
+    client = WorkerClient(env)
+    try:
+        worker = []
+        for _ in range(args.iterations):
+            start = time.perf_counter()
+            client.call(args.method, params)
+            worker.append(time.perf_counter() - start)
+    finally:
+        client.close()
+
+    print(json.dumps({
+        'method': args.method,
+        'iterations': args.iterations,
+        'spawn_per_call': summarize(spawned),
+        'worker': summarize(worker),
+        'worker_startup_ms': round(client.startup_time * 1000, 2),
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+// Decoder for the columnar frames written by scripts/columnar.py (see the
+// format description there).
+//
+// decodeFrame() maps a frame onto typed views without building per-row
+// objects: f64 columns become Float64Arrays over the frame bytes and utf8
+// columns become string arrays. toResult() rebuilds the JSON-shaped result
+// for callers that want the same value the JSON path returns.
+
+const MAGIC = 'AFCF';
+const SCHEMA_VERSION = 2;
+const PREFIX_SIZE = 12;
+
+const float64Column = (buffer, start, rows) => {
+  // Typed array views need an 8-byte aligned offset into the underlying
+  // ArrayBuffer; Buffers sliced from a pooled allocation may not have one
+  const byteOffset = buffer.byteOffset + start;
+  if (byteOffset % 8 === 0) {
+    return new Float64Array(buffer.buffer, byteOffset, rows);
+  }
+  return new Float64Array(buffer.buffer.slice(byteOffset, byteOffset + rows * 8));
+};
+
+// Validity bitmap of a utf8 column holding nulls: bit i set when row i has a value
+const isPresent = (buffer, start, i) => (buffer[start + (i >> 3)] >> (i & 7)) & 1;
+
+const utf8Column = (buffer, start, rows, validity = 0) => {
+  const bitmapStart = start;
+  start += validity;
+  const dataStart = start + (rows + 1) * 4;
+  const offsets = new Array(rows + 1);
+  for (let i = 0; i <= rows; i++) {
+    offsets[i] = buffer.readUInt32LE(start + i * 4);
+  }
+
+  // Tickers and dates are ASCII: decode the column once and slice it by
+  // offset instead of decoding every value separately
+  const text = buffer.toString('utf8', dataStart, dataStart + offsets[rows]);
+  const ascii = text.length === offsets[rows];
+
+  const values = new Array(rows);
+  for (let i = 0; i < rows; i++) {
+    if (validity && !isPresent(buffer, bitmapStart, i)) {
+      values[i] = null;
+    } else {
+      values[i] = ascii
+        ? text.slice(offsets[i], offsets[i + 1])
+        : buffer.toString('utf8', dataStart + offsets[i], dataStart + offsets[i + 1]);
+    }
+  }
+  return values;
+};
+
+// Parse a frame Buffer into { schema, version, meta, tables }, where each
+// table is { layout, rows, columns: { name: Float64Array | (string | null)[] } }
+const decodeFrame = (buffer) => {
+  if (buffer.length < PREFIX_SIZE || buffer.toString('latin1', 0, 4) !== MAGIC) {
+    throw new Error('Not a columnar frame');
+  }
+  const version = buffer.readUInt16LE(4);
+  if (version !== SCHEMA_VERSION) {
+    throw new Error(`Unsupported columnar schema version ${version}`);
+  }
+
+  const headerLength = buffer.readUInt32LE(8);
+  const header = JSON.parse(buffer.toString('utf8', PREFIX_SIZE, PREFIX_SIZE + headerLength));
+  const bodyStart = PREFIX_SIZE + headerLength;
+
+  const tables = {};
+  for (const [path, table] of Object.entries(header.tables)) {
+    const columns = {};
+    for (const column of table.columns) {
+      const start = bodyStart + column.offset;
+      if (column.type === 'f64') {
+        columns[column.name] = float64Column(buffer, start, table.rows);
+      } else if (column.type === 'utf8') {
+        columns[column.name] = utf8Column(buffer, start, table.rows, column.validity || 0);
+      } else {
+        throw new Error(`Unknown column type ${column.type}`);
+      }
+    }
+    tables[path] = { layout: table.layout, rows: table.rows, columns };
+  }
+
+  return { schema: header.schema, version, meta: header.meta, tables };
+};
+
+const setPath = (target, path, value) => {
+  const keys = path.split('.');
+  const last = keys.pop();
+  for (const key of keys) {
+    if (target[key] === undefined) {
+      target[key] = {};
+    }
+    target = target[key];
+  }
+  target[last] = value;
+};
+
+// NaN marks null in f64 columns, as JSON has no NaN
+const plain = (values) => (
+  values instanceof Float64Array
+    ? Array.from(values, value => (Number.isNaN(value) ? null : value))
+    : values
+);
+
+const toRecords = ({ rows, columns }) => {
+  const names = Object.keys(columns);
+  const records = new Array(rows);
+  for (let i = 0; i < rows; i++) {
+    const record = {};
+    for (const name of names) {
+      const value = columns[name][i];
+      setPath(record, name, columns[name] instanceof Float64Array && Number.isNaN(value) ? null : value);
+    }
+    records[i] = record;
+  }
+  return records;
+};
+
+// Rebuild the JSON-shaped result a decoded frame was encoded from
+const toResult = (frame) => {
+  const result = frame.meta;
+  for (const [path, table] of Object.entries(frame.tables)) {
+    if (table.layout === 'records') {
+      setPath(result, path, toRecords(table));
+    } else {
+      const columns = {};
+      for (const [name, values] of Object.entries(table.columns)) {
+        columns[name] = plain(values);
+      }
+      setPath(result, path, columns);
+    }
+  }
+  return result;
+};
+
+module.exports = { SCHEMA_VERSION, decodeFrame, toResult };
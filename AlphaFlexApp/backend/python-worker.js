@@ -0,0 +1,233 @@
+const { spawn } = require('child_process');
+const path = require('path');
+const { decodeFrame } = require('./columnar');
+
+// Configuration
+const WORKER_SCRIPT = path.join(__dirname, 'scripts', 'worker.py');
+const DEFAULT_TIMEOUT = 10 * 60 * 1000; // 10 minutes, long enough for a cold backtest
+const RESTART_DELAY = 1000;
+const NEWLINE = 0x0a;
+
+// Splits the worker's stdout into protocol messages: one JSON object per line,
+// except that a {"id", "frame": size} line is followed by `size` raw bytes of
+// columnar frame, which are handed over with it
+class ProtocolReader {
+  constructor(onMessage) {
+    this.onMessage = onMessage;
+    this.chunks = [];
+    this.length = 0;
+    this.frameHeader = null;
+  }
+
+  take(size) {
+    const data = this.chunks.length === 1 ? this.chunks[0] : Buffer.concat(this.chunks, this.length);
+    this.chunks = size < data.length ? [data.subarray(size)] : [];
+    this.length = data.length - size;
+    return data.subarray(0, size);
+  }
+
+  push(chunk) {
+    this.chunks.push(chunk);
+    this.length += chunk.length;
+
+    for (;;) {
+      if (this.frameHeader) {
+        if (this.length < this.frameHeader.frame) {
+          return;
+        }
+        const header = this.frameHeader;
+        this.frameHeader = null;
+        this.onMessage(header, this.take(header.frame));
+        continue;
+      }
+
+      // Only the newest chunk can hold the end of a line that is still open
+      const last = this.chunks[this.chunks.length - 1];
+      if (!last) {
+        return;
+      }
+      const newline = last.indexOf(NEWLINE);
+      if (newline === -1) {
+        return;
+      }
+      const line = this.take(this.length - last.length + newline + 1).toString('utf8').trimEnd();
+      if (!line) {
+        continue;
+      }
+
+      let message;
+      try {
+        message = JSON.parse(line);
+      } catch (error) {
+        console.error('Python worker sent invalid output:', line);
+        continue;
+      }
+
+      if (typeof message.frame === 'number') {
+        this.frameHeader = message;
+      } else {
+        this.onMessage(message);
+      }
+    }
+  }
+}
+
+class PythonWorker {
+  constructor() {
+    this.process = null;
+    this.ready = null;
+    this.pending = new Map(); // Outstanding requests by id
+    this.nextId = 1;
+    this.stopped = false;
+  }
+
+  start() {
+    if (this.ready) {
+      return this.ready;
+    }
+
+    this.stopped = false;
+    this.ready = new Promise((resolve, reject) => {
+      const pythonProcess = spawn('python3', [WORKER_SCRIPT], {
+        cwd: __dirname,
+        stdio: ['pipe', 'pipe', 'pipe']
+      });
+      this.process = pythonProcess;
+
+      const reader = new ProtocolReader((message, frame) => {
+        if (message.event === 'ready') {
+          console.log('Python worker ready');
+          resolve();
+          return;
+        }
+
+        if (message.progress !== undefined) {
+          this.progress(message);
+          return;
+        }
+
+        this.settle(message, frame);
+      });
+      pythonProcess.stdout.on('data', chunk => reader.push(chunk));
+
+      pythonProcess.stderr.on('data', (data) => {
+        console.error('Python worker:', data.toString().trimEnd());
+      });
+
+      pythonProcess.on('error', (error) => {
+        console.error('Failed to start Python worker:', error);
+        reject(error);
+      });
+
+      pythonProcess.on('exit', (code) => {
+        console.error(`Python worker exited with code ${code}`);
+        this.process = null;
+        this.ready = null;
+        reject(new Error(`Python worker exited with code ${code}`));
+
+        // Fail anything still waiting on the dead process
+        for (const { reject: rejectPending, timer } of this.pending.values()) {
+          clearTimeout(timer);
+          rejectPending(new Error('Python worker exited'));
+        }
+        this.pending.clear();
+
+        if (!this.stopped) {
+          setTimeout(() => this.start().catch(() => {}), RESTART_DELAY);
+        }
+      });
+    });
+
+    return this.ready;
+  }
+
+  settle(message, frame) {
+    const request = this.pending.get(message.id);
+    if (!request) {
+      return;
+    }
+
+    clearTimeout(request.timer);
+    this.pending.delete(message.id);
+
+    if (message.error !== undefined) {
+      request.reject(new Error(message.error));
+    } else if (frame) {
+      try {
+        request.resolve(decodeFrame(frame));
+      } catch (error) {
+        request.reject(error);
+      }
+    } else {
+      request.resolve(message.result);
+    }
+  }
+
+  progress(message) {
+    const request = this.pending.get(message.id);
+    if (!request || !request.onEvent) {
+      return;
+    }
+
+    // A streaming call only times out after a quiet spell, not a long batch
+    clearTimeout(request.timer);
+    request.timer = request.arm();
+
+    try {
+      request.onEvent(message.progress);
+    } catch (error) {
+      console.error('Python worker progress handler failed:', error);
+    }
+  }
+
+  async call(method, params = {}, timeout = DEFAULT_TIMEOUT) {
+    return this.request(method, params, timeout);
+  }
+
+  // Like call(), but onEvent receives each progress event (one per order for
+  // place_orders and sell_all_positions) before the promise resolves with the
+  // summary result
+  async stream(method, params, onEvent, timeout = DEFAULT_TIMEOUT) {
+    return this.request(method, params, timeout, onEvent);
+  }
+
+  // Like call(), but asks for a columnar frame (methods in FRAMES in
+  // scripts/worker.py) and resolves with the decoded frame; pass it to
+  // toResult() from ./columnar for the value call() would have returned
+  async frame(method, params = {}, timeout = DEFAULT_TIMEOUT) {
+    return this.request(method, params, timeout, undefined, 'columnar');
+  }
+
+  async request(method, params, timeout, onEvent, format) {
+    await this.start();
+
+    const id = this.nextId++;
+    return new Promise((resolve, reject) => {
+      const arm = () => setTimeout(() => {
+        this.pending.delete(id);
+        reject(new Error(`Python worker call ${method} timed out`));
+      }, timeout);
+
+      this.pending.set(id, { resolve, reject, timer: arm(), arm, onEvent });
+      const message = { id, method, params };
+      if (onEvent) {
+        message.stream = true;
+      }
+      if (format) {
+        message.format = format;
+      }
+      this.process.stdin.write(JSON.stringify(message) + '\n');
+    });
+  }
+
+  stop() {
+    this.stopped = true;
+    if (this.process) {
+      this.process.stdin.end();
+    }
+  }
+}
+
+// Export the shared worker instance
+const pythonWorker = new PythonWorker();
+module.exports = pythonWorker;
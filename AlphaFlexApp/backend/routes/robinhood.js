@@ -4,10 +4,25 @@ const express = require('express');
 const router = express.Router();
 const { spawn } = require('child_process');
 const path = require('path');
+const storageManager = require('../storage-manager');
 
 // Store active Python processes
 const activeProcesses = new Map();
 
+// Remember which Robinhood login belongs to the app account, so trading and
+// order monitoring can run inside that user's stored session
+const rememberRobinhoodUser = async (req, username, result) => {
+  if (!result || !result.success) {
+    return;
+  }
+  const email = (req.session && req.session.email) || username;
+  try {
+    await storageManager.saveSession(email, { robinhoodUsername: username });
+  } catch (error) {
+    console.error('Failed to save Robinhood session owner:', error);
+  }
+};
+
 // Helper function to run Python script and handle MFA prompt
 const runPythonScript = (scriptArgs) => {
   return new Promise((resolve, reject) => {
@@ -71,6 +86,7 @@ router.post('/auth', async (req, res) => {
     }
 
     const result = await runPythonScript(['login', username, password]);
+    await rememberRobinhoodUser(req, username, result);
     res.json(result);
 
   } catch (error) {
@@ -114,10 +130,11 @@ router.post('/auth/mfa', async (req, res) => {
     pythonProcess.stdin.write(mfaCode + '\n');
 
     // Handle process completion
-    pythonProcess.on('close', (code) => {
+    pythonProcess.on('close', async (code) => {
       processCompleted = true;
       try {
         const result = JSON.parse(stdoutData);
+        await rememberRobinhoodUser(req, username, result);
         res.json(result);
       } catch (err) {
         res.status(500).json({
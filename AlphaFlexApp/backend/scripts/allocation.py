@@ -0,0 +1,96 @@
+# allocation.py
+#
+# Vectorized allocation and order sizing. Works from a weights DataFrame shaped
+# like portfolio_data.csv (Stock, ..., Stock Allocation Weight (%)) and a price
+# vector, and sizes one account or thousands of accounts in a single NumPy pass.
+
+import numpy as np
+import pandas as pd
+
+SYMBOL_COLUMN = 'Stock'
+WEIGHT_COLUMN = 'Stock Allocation Weight (%)'
+EXPORT_COLUMNS = ['Market Cap', 'Revenue', 'Volatility', WEIGHT_COLUMN]
+QUANTITY_DECIMALS = 6
+
+def holdings_frame(holdings):
+    """Build a weights DataFrame from a list of holding dicts"""
+    frame = pd.DataFrame(list(holdings))
+    if frame.empty:
+        return pd.DataFrame(columns=[SYMBOL_COLUMN, WEIGHT_COLUMN])
+    frame[WEIGHT_COLUMN] = frame[WEIGHT_COLUMN].astype(float)
+    return frame
+
+def price_vector(symbols, prices):
+    """Align a {symbol: price} mapping (or Series) to symbols; missing prices are NaN"""
+    if isinstance(prices, pd.Series):
+        return prices.reindex(symbols).to_numpy(dtype=float)
+    if isinstance(prices, dict):
+        return np.array([prices.get(symbol, np.nan) for symbol in symbols], dtype=float)
+    return np.asarray(prices, dtype=float)
+
+def size_orders(amounts, weights, prices, decimals=QUANTITY_DECIMALS):
+    """Size orders for every account at once.
+
+    amounts: (accounts,) dollars to invest per account
+    weights: (stocks,) allocation weights in percent
+    prices:  (stocks,) latest prices; NaN or non-positive prices get no order
+
+    Returns (target_amounts, quantities, residual_cash) with shapes
+    (accounts, stocks), (accounts, stocks) and (accounts,).
+    """
+    amounts = np.atleast_1d(np.asarray(amounts, dtype=float))
+    weights = np.asarray(weights, dtype=float)
+    prices = np.asarray(prices, dtype=float)
+
+    priced = np.isfinite(prices) & (prices > 0)
+    target_amounts = np.outer(amounts, np.where(priced, weights / 100, 0.0))
+
+    safe_prices = np.where(priced, prices, 1.0)
+    quantities = np.round(target_amounts / safe_prices, decimals)
+    quantities = np.where(priced, np.maximum(quantities, 0.0), 0.0)
+
+    residual_cash = amounts - quantities @ np.where(priced, prices, 0.0)
+    return target_amounts, quantities, residual_cash
+
+def drift(target_quantities, current_quantities, prices):
+    """Dollar drift of current positions from target (positive = overweight)"""
+    prices = np.asarray(prices, dtype=float)
+    difference = np.asarray(current_quantities, dtype=float) - np.asarray(target_quantities, dtype=float)
+    return difference * np.where(np.isfinite(prices), prices, 0.0)
+
+def allocate(total_amount, weights_df, prices, current_quantities=None):
+    """Size one account's orders.
+
+    Returns (allocation DataFrame, residual cash). The DataFrame has one row per
+    holding with Stock, Weight, Price, Amount, Quantity and Drift columns.
+    """
+    symbols = weights_df[SYMBOL_COLUMN].to_numpy()
+    weights = weights_df[WEIGHT_COLUMN].to_numpy(dtype=float)
+    price_values = price_vector(symbols, prices)
+
+    target_amounts, quantities, residual_cash = size_orders(total_amount, weights, price_values)
+
+    if current_quantities is None:
+        current = np.zeros(len(symbols))
+    else:
+        current = price_vector(symbols, current_quantities)
+        current = np.where(np.isfinite(current), current, 0.0)
+
+    allocation = pd.DataFrame({
+        SYMBOL_COLUMN: symbols,
+        'Weight': weights,
+        'Price': price_values,
+        'Amount': target_amounts[0],
+        'Quantity': quantities[0],
+        'Drift': drift(quantities[0], current, price_values)
+    })
+    return allocation, float(residual_cash[0])
+
+def holdings_records(portfolio_df, weight_decimals=0):
+    """Export portfolio rows as the Holdings list used in the JSON output;
+    unknown fundamentals are null"""
+    export = portfolio_df[[SYMBOL_COLUMN] + EXPORT_COLUMNS].copy()
+    export[EXPORT_COLUMNS] = export[EXPORT_COLUMNS].astype(float)
+    export[WEIGHT_COLUMN] = export[WEIGHT_COLUMN].round(weight_decimals)
+    export = export.astype(object).where(export.notna(), None)
+    return export.to_dict('records')
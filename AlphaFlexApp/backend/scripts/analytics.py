@@ -0,0 +1,161 @@
+# analytics.py
+#
+# Extended portfolio analytics from the local price store in one vectorized
+# pass over the close matrix (dates x tickers):
+#
+#   - per-horizon return (1D ... 1Y plus 3Y), buy-and-hold from the anchor
+#     exactly like backtest_engine, and each holding's contribution to it
+#   - annualized volatility, max drawdown, Sharpe and Sortino ratios per
+#     horizon, from the daily return series of the portfolio held at its
+#     target weights
+#   - the cumulative growth series itself, for charting
+#
+# Once prices are local this takes milliseconds; the store is only asked
+# for new bars when it is older than ANALYTICS_PRICE_MAX_AGE.
+#
+#   python3 scripts/analytics.py
+
+import sys
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+import columnar
+from backtest_engine import PERIODS, PERIOD_LABELS, anchor_position, load_weights
+from price_store import get_prices
+
+ANALYTICS_PERIODS = PERIODS + ['3y']
+ANALYTICS_LABELS = PERIOD_LABELS + ['3Y']
+ANALYTICS_HISTORY_PERIOD = '3y'
+ANALYTICS_PRICE_MAX_AGE = int(os.environ.get('ANALYTICS_PRICE_MAX_AGE', '900'))  # seconds
+RISK_FREE_RATE = float(os.environ.get('ANALYTICS_RISK_FREE_RATE', '0'))  # annual, e.g. 0.04
+TRADING_DAYS = 252
+
+def clean(value, digits):
+    """Round for JSON, mapping NaN/inf to None"""
+    value = float(value)
+    return round(value, digits) if np.isfinite(value) else None
+
+def risk_metrics(daily, risk_free_rate=RISK_FREE_RATE):
+    """Volatility, max drawdown (both %), Sharpe and Sortino of a daily return series"""
+    if len(daily) < 2:
+        return {'volatility': None, 'max_drawdown': None, 'sharpe': None, 'sortino': None}
+
+    excess = daily - risk_free_rate / TRADING_DAYS
+    std = daily.std(ddof=1)
+    downside = np.sqrt(np.mean(np.minimum(excess, 0) ** 2))
+
+    growth = np.concatenate([[1.0], np.cumprod(1 + daily)])
+    drawdown = growth / np.maximum.accumulate(growth) - 1
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {
+            'volatility': clean(std * np.sqrt(TRADING_DAYS) * 100, 2),
+            'max_drawdown': clean(drawdown.min() * 100, 2),
+            'sharpe': clean(excess.mean() / std * np.sqrt(TRADING_DAYS), 4),
+            'sortino': clean(excess.mean() / downside * np.sqrt(TRADING_DAYS), 4),
+        }
+
+def compute_analytics(prices, weights, periods=ANALYTICS_PERIODS, labels=ANALYTICS_LABELS):
+    """All analytics for a close matrix and weights (in %) indexed by ticker"""
+    prices = prices.reindex(columns=weights.index).ffill().dropna(how='all')
+    if len(prices) < 2:
+        raise ValueError("No price history available for portfolio holdings")
+
+    closes = prices.to_numpy(dtype=np.float64)
+    w = weights.to_numpy(dtype=np.float64)
+    last = closes[-1]
+
+    # Horizon returns and contributions: one (horizons x tickers) growth matrix
+    anchors = np.array([anchor_position(prices.index, period) for period in periods])
+    base = closes[anchors]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth = last / base
+    valid = np.isfinite(growth) & (base > 0)
+    held = np.where(valid, w, 0.0)
+    share = held / np.where(held.sum(axis=1, keepdims=True) > 0, held.sum(axis=1, keepdims=True), np.nan)
+    contribution = np.where(valid, share * (growth - 1) * 100, 0.0)
+    horizon_returns = contribution.sum(axis=1)
+
+    # Daily portfolio returns at target weights, renormalized over holdings
+    # that have a price on both days
+    with np.errstate(divide='ignore', invalid='ignore'):
+        daily_by_ticker = closes[1:] / closes[:-1] - 1
+    daily_valid = np.isfinite(daily_by_ticker)
+    daily_weights = np.where(daily_valid, w, 0.0)
+    weight_sums = daily_weights.sum(axis=1)
+    daily = np.where(
+        weight_sums > 0,
+        (np.where(daily_valid, daily_by_ticker, 0.0) * daily_weights).sum(axis=1) / np.where(weight_sums > 0, weight_sums, 1),
+        0.0
+    )
+
+    horizons = {}
+    for i, (period, label) in enumerate(zip(periods, labels)):
+        horizons[label] = {
+            'return': clean(horizon_returns[i], 2),
+            'start': prices.index[anchors[i]].strftime('%Y-%m-%d'),
+            **risk_metrics(daily[anchors[i]:]),
+        }
+
+    holdings = [
+        {
+            'Stock': str(ticker),
+            'Weight': clean(w[j], 4),
+            'contribution': {label: clean(contribution[i, j], 4) for i, label in enumerate(labels)},
+        }
+        for j, ticker in enumerate(weights.index)
+    ]
+
+    cumulative = np.concatenate([[1.0], np.cumprod(1 + daily)])
+    return {
+        'as_of': prices.index[-1].strftime('%Y-%m-%d'),
+        'risk_free_rate': RISK_FREE_RATE,
+        'horizons': horizons,
+        'holdings': holdings,
+        'series': {
+            'dates': [d.strftime('%Y-%m-%d') for d in prices.index],
+            'values': [round(float(v), 6) for v in cumulative],
+        },
+    }
+
+def get_analytics():
+    """Load weights and the cached price matrix and compute every analytic"""
+    weights = load_weights()
+    prices = get_prices(weights.index, period=ANALYTICS_HISTORY_PERIOD, max_age=ANALYTICS_PRICE_MAX_AGE)
+    return compute_analytics(prices, weights)
+
+def compute_all_analytics():
+    try:
+        return {'success': True, 'analytics': get_analytics()}
+    except Exception as e:
+        print(f"Error calculating analytics: {str(e)}", file=sys.stderr)
+        return {'success': False, 'error': str(e)}
+
+def analytics_frame():
+    """compute_all_analytics() as a columnar frame"""
+    return encode_analytics(compute_all_analytics())
+
+def encode_analytics(result):
+    """Encode an analytics result; holdings and the growth series travel as column buffers"""
+    if not result['success']:
+        return columnar.encode('analytics', meta=result)
+
+    analytics = dict(result['analytics'])
+    holdings = analytics.pop('holdings')
+    series = analytics.pop('series')
+    return columnar.encode(
+        'analytics',
+        meta=dict(result, analytics=analytics),
+        tables={
+            'analytics.holdings': ('records', columnar.record_columns(holdings)),
+            'analytics.series': ('columns', series),
+        }
+    )
+
+if __name__ == "__main__":
+    result = compute_all_analytics()
+    print(json.dumps(result))
+    sys.exit(0 if result['success'] else 1)
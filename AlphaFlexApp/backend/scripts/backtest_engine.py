@@ -0,0 +1,96 @@
+# backtest_engine.py
+#
+# Single-pass multi-horizon backtest. Loads one price matrix (dates x tickers)
+# for every holding from the local price store and derives each horizon's
+# return by slicing it, instead of calling alpha_flex.backtest_portfolio once
+# per period.
+
+import os
+import sys
+from lazy_import import lazy_module
+
+# pandas and the price store are only needed once returns are computed, so
+# callers that just want PERIODS/PERIOD_LABELS (performance.py cache hits)
+# don't pay for them
+pd = lazy_module('pandas')
+
+WEIGHTS_FILE = 'final_file.csv'
+PORTFOLIO_FILE = 'portfolio_data.csv'
+HISTORY_PERIOD = '1y'
+
+PERIODS = ['1d', '5d', '1m', '3m', 'ytd', '1y']
+PERIOD_LABELS = ["1D", "5D", "1M", "3M", "YTD", "1Y"]
+
+# Calendar offsets (pd.DateOffset kwargs) for horizons anchored on a date
+# rather than a bar count
+PERIOD_OFFSETS = {
+    '1m': {'months': 1},
+    '3m': {'months': 3},
+    '1y': {'years': 1},
+    '3y': {'years': 3},
+}
+
+# Horizons anchored a fixed number of trading bars before the latest one
+PERIOD_BARS = {
+    '1d': 1,
+    '5d': 4,
+}
+
+def load_weights():
+    """Load portfolio weights (in %) indexed by ticker"""
+    if os.path.exists(WEIGHTS_FILE):
+        df = pd.read_csv(WEIGHTS_FILE)
+        return df.set_index('Ticker')['Weights'].astype(float)
+
+    if os.path.exists(PORTFOLIO_FILE):
+        df = pd.read_csv(PORTFOLIO_FILE)
+        return df.set_index('Stock')['Stock Allocation Weight (%)'].astype(float)
+
+    from price_store import get_portfolio_fundamentals
+    df = get_portfolio_fundamentals()
+    return df.set_index('Stock')['Stock Allocation Weight (%)'].astype(float)
+
+def anchor_position(index, period):
+    """Return the row position of the base price for a horizon"""
+    last = len(index) - 1
+    if period in PERIOD_BARS:
+        return max(last - PERIOD_BARS[period], 0)
+
+    last_date = index[-1]
+    if period == 'ytd':
+        start = pd.Timestamp(year=last_date.year, month=1, day=1)
+    else:
+        start = last_date - pd.DateOffset(**PERIOD_OFFSETS[period])
+
+    return min(int(index.searchsorted(start, side='left')), last)
+
+def horizon_return(prices, weights, period):
+    """Percentage return of the weighted basket over one horizon"""
+    base = prices.iloc[anchor_position(prices.index, period)]
+    last = prices.iloc[-1]
+
+    valid = base.notna() & last.notna() & (base > 0)
+    if not valid.any():
+        return 0
+
+    w = weights[valid]
+    growth = (last[valid] / base[valid]).to_numpy()
+    return float(((w.to_numpy() / w.sum()) * growth).sum() - 1) * 100
+
+def compute_horizon_returns(prices, weights, periods=PERIODS):
+    """Compute every horizon's percentage return from one price matrix"""
+    prices = prices.reindex(columns=weights.index).ffill()
+    prices = prices.dropna(how='all')
+    if prices.empty:
+        raise ValueError("No price history available for portfolio holdings")
+
+    return {period: round(horizon_return(prices, weights, period), 2) for period in periods}
+
+def get_horizon_returns(periods=PERIODS):
+    """Load weights and prices once and return {period: percentage return}"""
+    from price_store import get_prices
+
+    weights = load_weights()
+    print(f"Loading price history for {len(weights)} holdings", file=sys.stderr)
+    prices = get_prices(weights.index, period=HISTORY_PERIOD)
+    return compute_horizon_returns(prices, weights, periods)
@@ -0,0 +1,177 @@
+# columnar.py
+#
+# Compact binary frames for worker results that are mostly tables (portfolio
+# holdings, price and performance series). A frame carries the small
+# non-tabular part of a result as JSON and every table as typed column
+# buffers, so neither side builds or scans one object per row:
+#
+#   magic 'AFCF' | uint16 schema version | uint16 flags (0) | uint32 header length
+#   header (UTF-8 JSON), zero-padded to 8 bytes
+#   body: column buffers, each starting on an 8-byte boundary
+#
+# The header is
+#
+#   {"schema": "holdings", "meta": {...},
+#    "tables": {"Holdings": {"layout": "records", "rows": 17,
+#                            "columns": [{"name": "Stock", "type": "utf8", "offset": 0, "length": 120}, ...]}}}
+#
+# Column types:
+#   f64    little-endian float64 per row; NaN stands for null
+#   utf8   uint32 offsets (rows + 1) followed by the concatenated UTF-8 strings.
+#          A column holding nulls has "validity": N in its header and starts
+#          with an N-byte bitmap (bit i of byte i // 8, least significant
+#          first, set when row i is not null; N is a multiple of 4) ahead of
+#          the offsets. Null rows are empty strings in the data.
+#
+# Tables are keyed by their dotted path in the result and put back there on
+# decode. "records" tables become a list of row objects (dotted column names
+# nest, e.g. "contribution.1Y"); "columns" tables become an object of arrays.
+# to_result() here and toResult() in ../columnar.js rebuild exactly what
+# json.dumps of the original result would have carried.
+#
+# Bump SCHEMA_VERSION on any incompatible layout change; decoders reject
+# frames with a version they don't know.
+
+import json
+import numbers
+import struct
+
+import numpy as np
+
+MAGIC = b'AFCF'
+SCHEMA_VERSION = 2
+PREFIX = struct.Struct('<4sHHI')
+ALIGNMENT = 8
+FORMAT_NAME = 'columnar'
+
+def _pad(length):
+    return -length % ALIGNMENT
+
+def _is_numeric(values):
+    return all(value is None or (isinstance(value, numbers.Real) and not isinstance(value, bool))
+               for value in values)
+
+def _column_buffer(values):
+    """(header fields, bytes) for one column of values"""
+    array = np.asarray(values)
+    if array.dtype.kind in 'iuf' or (array.dtype.kind == 'O' and _is_numeric(values)):
+        floats = np.array([np.nan if value is None else value for value in values], dtype='<f8') \
+            if array.dtype.kind == 'O' else array.astype('<f8')
+        return {'type': 'f64'}, floats.tobytes()
+
+    encoded = [b'' if value is None else str(value).encode('utf-8') for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype='<u4')
+    offsets[1:] = np.cumsum([len(value) for value in encoded])
+    data = offsets.tobytes() + b''.join(encoded)
+
+    present = np.array([value is not None for value in values], dtype=bool)
+    if present.all():
+        return {'type': 'utf8'}, data
+    bitmap = np.packbits(present, bitorder='little').tobytes()
+    bitmap += b'\0' * (-len(bitmap) % 4)
+    return {'type': 'utf8', 'validity': len(bitmap)}, bitmap + data
+
+def encode(schema, meta=None, tables=None):
+    """Encode a frame.
+
+    tables: {path: (layout, {column name: sequence of values})} where layout
+    is 'records' or 'columns'; columns of one table share a length.
+    """
+    body = []
+    body_length = 0
+    table_headers = {}
+    for path, (layout, columns) in (tables or {}).items():
+        rows = None
+        column_headers = []
+        for name, values in columns.items():
+            rows = len(values) if rows is None else rows
+            if len(values) != rows:
+                raise ValueError(f"Column {name} of {path} has {len(values)} rows, expected {rows}")
+            fields, data = _column_buffer(values)
+            column_headers.append({'name': name, **fields, 'offset': body_length, 'length': len(data)})
+            body.append(data + b'\0' * _pad(len(data)))
+            body_length += len(data) + _pad(len(data))
+        table_headers[path] = {'layout': layout, 'rows': rows or 0, 'columns': column_headers}
+
+    header = json.dumps({'schema': schema, 'meta': meta or {}, 'tables': table_headers},
+                        allow_nan=False, separators=(',', ':')).encode('utf-8')
+    header += b' ' * _pad(PREFIX.size + len(header))
+    return b''.join([PREFIX.pack(MAGIC, SCHEMA_VERSION, 0, len(header)), header, *body])
+
+def decode(data):
+    """Parse a frame into (header, {path: {column name: list of values}})"""
+    magic, version, _, header_length = PREFIX.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Not a columnar frame")
+    if version != SCHEMA_VERSION:
+        raise ValueError(f"Unsupported columnar schema version {version}")
+
+    header = json.loads(bytes(data[PREFIX.size:PREFIX.size + header_length]))
+    body = memoryview(data)[PREFIX.size + header_length:]
+
+    tables = {}
+    for path, table in header['tables'].items():
+        rows = table['rows']
+        columns = {}
+        for column in table['columns']:
+            buffer = body[column['offset']:column['offset'] + column['length']]
+            if column['type'] == 'f64':
+                values = np.frombuffer(buffer, dtype='<f8', count=rows)
+                columns[column['name']] = [None if np.isnan(value) else float(value) for value in values]
+            elif column['type'] == 'utf8':
+                validity = column.get('validity', 0)
+                present = np.unpackbits(np.frombuffer(buffer[:validity], dtype=np.uint8), bitorder='little') \
+                    if validity else None
+                offsets = np.frombuffer(buffer[validity:], dtype='<u4', count=rows + 1)
+                strings = bytes(buffer[validity + (rows + 1) * 4:])
+                columns[column['name']] = [
+                    strings[offsets[i]:offsets[i + 1]].decode('utf-8') if present is None or present[i] else None
+                    for i in range(rows)
+                ]
+            else:
+                raise ValueError(f"Unknown column type {column['type']}")
+        tables[path] = columns
+    return header, tables
+
+def _set_path(target, path, value):
+    *parents, key = path.split('.')
+    for parent in parents:
+        target = target.setdefault(parent, {})
+    target[key] = value
+
+def _records(columns):
+    names = list(columns)
+    rows = len(columns[names[0]]) if names else 0
+    records = []
+    for i in range(rows):
+        record = {}
+        for name in names:
+            _set_path(record, name, columns[name][i])
+        records.append(record)
+    return records
+
+def to_result(data):
+    """Rebuild the JSON-shaped result a frame was encoded from"""
+    header, tables = decode(data)
+    result = header['meta']
+    for path, columns in tables.items():
+        layout = header['tables'][path]['layout']
+        _set_path(result, path, _records(columns) if layout == 'records' else columns)
+    return result
+
+def record_columns(records):
+    """{column name: values} for a list of (possibly nested) row dicts"""
+    columns = {}
+    for i, record in enumerate(records):
+        for name, value in _flatten(record):
+            if name not in columns:
+                columns[name] = [None] * len(records)
+            columns[name][i] = value
+    return columns
+
+def _flatten(record, prefix=''):
+    for key, value in record.items():
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{prefix}{key}.")
+        else:
+            yield f"{prefix}{key}", value
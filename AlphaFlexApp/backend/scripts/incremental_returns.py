@@ -0,0 +1,200 @@
+# incremental_returns.py
+#
+# Incremental multi-horizon returns. Instead of re-slicing the whole price
+# matrix on every refresh, keep a small state file next to the price store:
+#
+#   settled   forward-filled closes as of the last bar that can no longer
+#             change (the bar before the latest one)
+#   last      forward-filled closes as of the latest (possibly intraday) bar
+#   anchors   per horizon: the anchor date, each ticker's base price there
+#             and the share counts the final_file.csv weights imply at that
+#             base (weight / base, per $1 of portfolio)
+#
+# A refresh only applies the bars after the settled date and rolls each
+# anchor forward through the bars it passes over, so the daily job is
+# O(tickers) and an intraday refresh touches a single row. An anchor that
+# lands on the latest bar is re-derived on the next refresh, since that bar
+# may still change. The price matrix itself still comes whole from
+# price_store.get_prices; only the arithmetic is incremental. The state is
+# rebuilt from the full matrix when it is missing, the weights change, or
+# the stored history no longer lines up with it.
+
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from backtest_engine import HISTORY_PERIOD, PERIODS, anchor_position, load_weights
+from price_store import STORE_DIR, _write_atomic, get_prices
+
+STATE_FILE = os.path.join(STORE_DIR, 'horizon_state.json')
+STATE_VERSION = 1
+
+def fill_forward(vector, rows):
+    """Carry `vector` forward through `rows` like DataFrame.ffill"""
+    filled = np.array(vector, dtype=np.float64)
+    for row in rows:
+        present = ~np.isnan(row)
+        filled[present] = row[present]
+    return filled
+
+def implied_shares(weights, base):
+    """Shares per $1 of portfolio bought at `base`; NaN where there is no price"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(base > 0, weights / base, np.nan)
+
+def horizon_return(weights, shares, last):
+    """Percentage return of the weighted basket held since the anchor"""
+    valid = ~np.isnan(shares) & ~np.isnan(last)
+    if not valid.any():
+        return 0
+    return float((shares[valid] * last[valid]).sum() / weights[valid].sum() - 1) * 100
+
+def encode(vector):
+    return [None if np.isnan(value) else float(value) for value in vector]
+
+def decode(values):
+    return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+
+def load_state():
+    try:
+        if os.path.exists(STATE_FILE):
+            with open(STATE_FILE, 'r') as f:
+                state = json.load(f)
+            if state.get('version') == STATE_VERSION:
+                return state
+    except Exception as e:
+        print(f"Error reading horizon state: {e}", file=sys.stderr)
+    return None
+
+def save_state(state):
+    data = json.dumps(state).encode('utf-8')
+    _write_atomic(STATE_FILE, lambda f: f.write(data))
+
+def build_state(weights, prices):
+    """Full rebuild of the state from a (dates x tickers) close matrix"""
+    # Same shape backtest_engine.compute_horizon_returns works on
+    prices = prices.ffill().dropna(how='all')
+    if len(prices) < 2:
+        raise ValueError("Not enough price history for portfolio holdings")
+
+    filled = prices.to_numpy(dtype=np.float64)
+    dates = prices.index
+    w = weights.to_numpy(dtype=np.float64)
+
+    anchors = {}
+    for period in PERIODS:
+        position = anchor_position(dates, period)
+        base = filled[position]
+        anchors[period] = {
+            'date': dates[position].strftime('%Y-%m-%d'),
+            'base': encode(base),
+            'shares': encode(implied_shares(w, base)),
+        }
+
+    state = {
+        'version': STATE_VERSION,
+        'tickers': [str(t) for t in weights.index],
+        'weights': [float(x) for x in w],
+        'dates': [d.strftime('%Y-%m-%d') for d in dates],
+        'settled': encode(filled[-2]),
+        'last': encode(filled[-1]),
+        'anchors': anchors,
+    }
+    return trim_dates(state)
+
+def trim_dates(state):
+    """Drop dates older than the earliest anchor; they can't be needed again"""
+    earliest = min(anchor['date'] for anchor in state['anchors'].values())
+    state['dates'] = [d for d in state['dates'] if d >= earliest]
+    return state
+
+def update_state(state, prices):
+    """Apply the bars after the settled date and roll the anchors forward.
+
+    Returns the updated state, or None when it no longer matches `prices`
+    and has to be rebuilt.
+    """
+    dates = state['dates']
+    settled_date = dates[-2]
+    if pd.Timestamp(settled_date) not in prices.index:
+        return None
+
+    new_bars = prices.loc[prices.index > pd.Timestamp(settled_date)]
+    if new_bars.empty:
+        return None
+
+    rows = new_bars.to_numpy(dtype=np.float64)
+    settled = fill_forward(decode(state['settled']), rows[:-1])
+    last = fill_forward(settled, rows[-1:])
+
+    all_dates = dates[:-1] + [d.strftime('%Y-%m-%d') for d in new_bars.index]
+    index = pd.DatetimeIndex(all_dates)
+    positions = {date: i for i, date in enumerate(all_dates)}
+    old_settled_position = len(dates) - 2
+    settled_position = len(all_dates) - 2
+    w = np.array(state['weights'], dtype=np.float64)
+
+    anchors = {}
+    for period in PERIODS:
+        old = state['anchors'][period]
+        old_position = positions.get(old['date'])
+        position = anchor_position(index, period)
+        if old_position is None or position < old_position:
+            return None
+
+        if position == old_position and position <= old_settled_position:
+            anchors[period] = old
+            continue
+
+        if position > settled_position:
+            base = last
+        elif old_position > old_settled_position:
+            # The old anchor sat on the provisional bar, which has since been
+            # replaced; rebuild its base from the settled closes
+            base = fill_forward(decode(state['settled']), rows[:position - old_settled_position])
+        else:
+            # Bars between the old and new anchor, read from the price matrix
+            passed = prices.loc[pd.DatetimeIndex(all_dates[old_position + 1:position + 1])]
+            base = fill_forward(decode(old['base']), passed.to_numpy(dtype=np.float64))
+
+        anchors[period] = {
+            'date': all_dates[position],
+            'base': encode(base),
+            'shares': encode(implied_shares(w, base)),
+        }
+
+    state = dict(state, dates=all_dates, settled=encode(settled), last=encode(last), anchors=anchors)
+    return trim_dates(state)
+
+def returns_from_state(state, periods=PERIODS):
+    w = np.array(state['weights'], dtype=np.float64)
+    last = decode(state['last'])
+    return {
+        period: round(horizon_return(w, decode(state['anchors'][period]['shares']), last), 2)
+        for period in periods
+    }
+
+def get_incremental_returns(periods=PERIODS):
+    """Refresh prices, advance (or rebuild) the horizon state and return {period: percentage return}"""
+    weights = load_weights()
+    weights = weights / weights.sum()
+    prices = get_prices(weights.index, period=HISTORY_PERIOD)
+
+    state = load_state()
+    if state and state['tickers'] == [str(t) for t in weights.index] \
+            and np.allclose(state['weights'], weights.to_numpy(dtype=np.float64)):
+        updated = update_state(state, prices)
+    else:
+        updated = None
+
+    if updated is None:
+        print(f"Rebuilding horizon state for {len(weights)} holdings", file=sys.stderr)
+        updated = build_state(weights, prices)
+    else:
+        print(f"Advanced horizon state to {updated['dates'][-1]}", file=sys.stderr)
+
+    save_state(updated)
+    return returns_from_state(updated, periods)
@@ -0,0 +1,33 @@
+# lazy_import.py
+#
+# Defers heavy imports (robin_stocks, pandas, alpha_flex) until first use so
+# CLI subcommands that never touch them, and "Invalid arguments" exits, don't
+# pay for them.
+
+import importlib
+import threading
+
+class LazyModule:
+    """Module proxy that imports `name` on first attribute access"""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f"<lazy module '{self._name}' ({state})>"
+
+def lazy_module(name):
+    return LazyModule(name)
@@ -0,0 +1,196 @@
+# market_calendar.py
+#
+# Order-window calendar. Precomputes a year of trading sessions (NYSE
+# holidays and early closes included) as sorted arrays of open/close epoch
+# seconds, so "is the window open", "when does it next open" and "how long
+# until it closes" are a binary search instead of timezone math per call.
+#
+# The order window is the app's own, in Chicago time: 9:00 AM to 2:30 PM,
+# half an hour after the regular open and before the 3:00 PM close. On early
+# close days (12:00 PM Chicago) it ends at 11:30 AM. exchange_calendar covers
+# the full regular session (8:30 AM to 3:00 PM, 12:00 PM on early closes),
+# when good-for-day orders placed in the window can still fill.
+#
+#   python3 scripts/market_calendar.py            # order window status as JSON
+#   python3 scripts/market_calendar.py exchange   # regular session status
+
+import sys
+import json
+import time
+import threading
+from array import array
+from bisect import bisect_right
+from datetime import date, datetime, timedelta, time as dt_time
+
+TIMEZONE = 'America/Chicago'
+WINDOW_OPEN = dt_time(9, 0)
+WINDOW_CLOSE = dt_time(14, 30)
+EARLY_WINDOW_CLOSE = dt_time(11, 30)
+EXCHANGE_OPEN = dt_time(8, 30)
+EXCHANGE_CLOSE = dt_time(15, 0)
+EARLY_EXCHANGE_CLOSE = dt_time(12, 0)
+
+# Sessions precomputed per build, and how close to the end of the table a
+# query may get before it is rebuilt around the query time
+TABLE_DAYS = 366
+REBUILD_MARGIN = timedelta(days=31)
+
+def easter(year):
+    """Gregorian Easter Sunday (anonymous Gregorian algorithm)"""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+def nth_weekday(year, month, weekday, n):
+    """The nth (1-based) given weekday of a month; n=-1 for the last one"""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    following = date(year + month // 12, month % 12 + 1, 1)
+    last = following - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+def observed(day):
+    """Weekend holidays move to the Friday before or the Monday after"""
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+def holidays(year):
+    """NYSE full-day closures for a year"""
+    days = {
+        nth_weekday(year, 1, 0, 3),          # Martin Luther King Jr. Day
+        nth_weekday(year, 2, 0, 3),          # Washington's Birthday
+        easter(year) - timedelta(days=2),    # Good Friday
+        nth_weekday(year, 5, 0, -1),         # Memorial Day
+        observed(date(year, 7, 4)),          # Independence Day
+        nth_weekday(year, 9, 0, 1),          # Labor Day
+        nth_weekday(year, 11, 3, 4),         # Thanksgiving
+        observed(date(year, 12, 25)),        # Christmas
+    }
+    # New Year's Day falling on a Saturday is not observed on the Friday before
+    new_year = date(year, 1, 1)
+    if new_year.weekday() != 5:
+        days.add(observed(new_year))
+    if year >= 2022:
+        days.add(observed(date(year, 6, 19)))  # Juneteenth
+    return days
+
+def early_closes(year):
+    """NYSE early-close days for a year (day before Independence Day, day
+    after Thanksgiving, Christmas Eve) that aren't already closed"""
+    candidates = {
+        date(year, 7, 3),
+        nth_weekday(year, 11, 3, 4) + timedelta(days=1),
+        date(year, 12, 24),
+    }
+    closed = holidays(year)
+    return {day for day in candidates if day.weekday() < 5 and day not in closed}
+
+class MarketCalendar:
+    """Sorted session table answering window queries by binary search"""
+
+    def __init__(self, timezone=TIMEZONE, open_time=WINDOW_OPEN, close_time=WINDOW_CLOSE,
+                 early_close_time=EARLY_WINDOW_CLOSE):
+        self.timezone = timezone
+        self.open_time = open_time
+        self.close_time = close_time
+        self.early_close_time = early_close_time
+        self._lock = threading.Lock()
+        self._opens = array('d')
+        self._closes = array('d')
+        self._start = None
+        self._end = None
+
+    def build(self, start):
+        """Precompute TABLE_DAYS days of order windows from `start` (a date)"""
+        import pytz
+
+        zone = pytz.timezone(self.timezone)
+        end = start + timedelta(days=TABLE_DAYS)
+        closed = set()
+        early = set()
+        for year in range(start.year, end.year + 1):
+            closed |= holidays(year)
+            early |= early_closes(year)
+
+        opens = array('d')
+        closes = array('d')
+        day = start
+        while day < end:
+            if day.weekday() < 5 and day not in closed:
+                close_time = self.early_close_time if day in early else self.close_time
+                opens.append(zone.localize(datetime.combine(day, self.open_time)).timestamp())
+                closes.append(zone.localize(datetime.combine(day, close_time)).timestamp())
+            day += timedelta(days=1)
+
+        self._opens, self._closes = opens, closes
+        self._start = zone.localize(datetime.combine(start, dt_time(0, 0))).timestamp()
+        self._end = zone.localize(datetime.combine(end, dt_time(0, 0))).timestamp()
+
+    def _table(self, now):
+        """The session arrays, rebuilt when `now` falls outside them"""
+        with self._lock:
+            margin = REBUILD_MARGIN.total_seconds()
+            if self._start is None or not self._start <= now < self._end - margin:
+                self.build(date.fromtimestamp(now) - timedelta(days=7))
+            return self._opens, self._closes
+
+    def _session_close(self, now):
+        """Close of the window containing `now`, or None when it is closed"""
+        opens, closes = self._table(now)
+        index = bisect_right(opens, now) - 1
+        if index < 0 or now > closes[index]:
+            return None
+        return closes[index]
+
+    def is_open(self, now=None):
+        now = time.time() if now is None else now
+        return self._session_close(now) is not None
+
+    def seconds_to_close(self, now=None):
+        """Seconds until the current window closes, 0 when it is closed"""
+        now = time.time() if now is None else now
+        close = self._session_close(now)
+        return 0.0 if close is None else close - now
+
+    def next_open(self, now=None):
+        """Epoch seconds of the first window opening after `now`"""
+        now = time.time() if now is None else now
+        opens, _ = self._table(now)
+        return opens[bisect_right(opens, now)]
+
+    def status(self, now=None):
+        now = time.time() if now is None else now
+        next_open = self.next_open(now)
+        return {
+            'is_open': self.is_open(now),
+            'seconds_to_close': round(self.seconds_to_close(now), 3),
+            'next_open': datetime.fromtimestamp(next_open).astimezone().isoformat(),
+            'seconds_to_open': round(next_open - now, 3),
+        }
+
+# Shared calendars; each table is built on first query
+market_calendar = MarketCalendar()
+exchange_calendar = MarketCalendar(open_time=EXCHANGE_OPEN, close_time=EXCHANGE_CLOSE,
+                                   early_close_time=EARLY_EXCHANGE_CLOSE)
+
+def status(session='orders'):
+    """Status of the order window ('orders') or the regular session ('exchange')"""
+    if session not in ('orders', 'exchange'):
+        raise ValueError(f"Unknown session: {session}")
+    return (exchange_calendar if session == 'exchange' else market_calendar).status()
+
+if __name__ == "__main__":
+    print(json.dumps(status(*sys.argv[1:2])))
+    sys.exit(0)
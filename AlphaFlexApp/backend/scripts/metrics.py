@@ -0,0 +1,251 @@
+# metrics.py
+#
+# Timing spans for the trading and performance hot paths.
+#
+#   with metrics.span('get_latest_price', symbols=17):
+#       quotes = r.stocks.get_latest_price(symbols)
+#
+# Each finished span is one JSON line in METRICS_FILE (when set):
+#
+#   {"ts": 1760700000.12, "span": "order_attempt", "duration_ms": 412.7,
+#    "status": "ok", "thread": "broker_0", "symbol": "NVDA", "attempt": 1}
+#
+# metrics.run(name) brackets one batch (an order basket, a rebalance, a
+# performance refresh). Runs are scoped to the thread that started them, so
+# concurrent batches on the worker's lanes don't count each other's spans;
+# work handed to a thread pool joins the caller's runs through
+# metrics.bind(func). When a run ends, a summary of the spans recorded during
+# it, with count, errors, p50/p95/max latency and retries per operation, is
+# written to stderr and METRICS_FILE as {"event": "summary", ...}. The
+# cumulative totals since process start are then rewritten to
+# METRICS_PROM_FILE (when set) in Prometheus text format, for node_exporter's
+# textfile collector.
+#
+# Metrics never fail what they measure: a metrics file that can't be written
+# is reported once as a warning and otherwise ignored.
+
+import json
+import logging
+import math
+import os
+import sys
+import threading
+import time
+import uuid
+import functools
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+METRICS_FILE = os.environ.get('METRICS_FILE')
+METRICS_PROM_FILE = os.environ.get('METRICS_PROM_FILE')
+METRIC_PREFIX = 'alphaflex'
+
+logger = logging.getLogger(__name__)
+
+# Latency samples kept per operation for percentiles
+MAX_SAMPLES = 10000
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return None
+    return ordered[max(math.ceil(fraction * len(ordered)) - 1, 0)]
+
+class SpanStats:
+    """Latency samples, error and retry counts per operation"""
+
+    def __init__(self):
+        self.samples = defaultdict(lambda: deque(maxlen=MAX_SAMPLES))
+        self.counts = defaultdict(int)
+        self.errors = defaultdict(int)
+        self.retries = defaultdict(int)
+        self.total = defaultdict(float)
+
+    def add(self, operation, seconds, error=False):
+        self.samples[operation].append(seconds)
+        self.counts[operation] += 1
+        self.total[operation] += seconds
+        if error:
+            self.errors[operation] += 1
+
+    def summary(self):
+        operations = {}
+        for operation in sorted(set(self.counts) | set(self.retries)):
+            ordered = sorted(self.samples[operation])
+            operations[operation] = {
+                'count': self.counts[operation],
+                'errors': self.errors[operation],
+                'retries': self.retries[operation],
+                'p50_ms': round(percentile(ordered, 0.5) * 1000, 3) if ordered else None,
+                'p95_ms': round(percentile(ordered, 0.95) * 1000, 3) if ordered else None,
+                'max_ms': round(ordered[-1] * 1000, 3) if ordered else None,
+                'total_ms': round(self.total[operation] * 1000, 3),
+            }
+        return operations
+
+class Metrics:
+    """Span recorder with per-run summaries and cumulative process totals"""
+
+    def __init__(self, path=METRICS_FILE, prom_path=METRICS_PROM_FILE):
+        self.path = path
+        self.prom_path = prom_path
+        self.totals = SpanStats()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._unwritable = set()
+
+    def _write_failed(self, path, error):
+        """Warn, once per file, that metrics can't be written there"""
+        if path not in self._unwritable:
+            self._unwritable.add(path)
+            logger.warning(f"Cannot write metrics to {path}: {error}")
+
+    def _emit(self, record):
+        if not self.path:
+            return
+        line = json.dumps(record, default=str) + '\n'
+        try:
+            with self._lock:
+                with open(self.path, 'a') as f:
+                    f.write(line)
+        except OSError as e:
+            self._write_failed(self.path, e)
+
+    def _runs(self):
+        """The runs active on this thread, innermost last"""
+        runs = getattr(self._local, 'runs', None)
+        if runs is None:
+            runs = self._local.runs = []
+        return runs
+
+    def _stats(self):
+        """Every SpanStats a span on this thread currently counts towards"""
+        return [self.totals] + [stats for _, stats in self._runs()]
+
+    def bind(self, func):
+        """Wrap func so it counts towards the caller's runs on whichever thread calls it"""
+        runs = list(self._runs())
+
+        @functools.wraps(func)
+        def bound(*args, **kwargs):
+            saved = getattr(self._local, 'runs', None)
+            self._local.runs = list(runs)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._local.runs = saved
+        return bound
+
+    @contextmanager
+    def span(self, operation, **attrs):
+        """Time the block; the yielded dict can take more attributes"""
+        started = time.time()
+        start = time.perf_counter()
+        error = None
+        try:
+            yield attrs
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            with self._lock:
+                for stats in self._stats():
+                    stats.add(operation, seconds, error is not None)
+
+            record = {
+                'ts': round(started, 3),
+                'span': operation,
+                'duration_ms': round(seconds * 1000, 3),
+                'status': 'error' if error is not None else 'ok',
+                'thread': threading.current_thread().name,
+                **attrs,
+            }
+            if error is not None:
+                record['error'] = str(error)
+            self._emit(record)
+
+    def retry(self, operation):
+        """Count one retry of an operation"""
+        with self._lock:
+            for stats in self._stats():
+                stats.retries[operation] += 1
+
+    @contextmanager
+    def run(self, name):
+        """Collect the spans of one batch and summarize them when it ends"""
+        entry = (name, SpanStats())
+        start = time.perf_counter()
+        runs = self._runs()
+        runs.append(entry)
+        try:
+            yield entry[1]
+        finally:
+            runs.remove(entry)
+            with self._lock:
+                operations = entry[1].summary()
+
+            if operations:
+                summary = {
+                    'event': 'summary',
+                    'run': name,
+                    'duration_ms': round((time.perf_counter() - start) * 1000, 3),
+                    'operations': operations,
+                }
+                try:
+                    print(json.dumps(summary), file=sys.stderr)
+                except OSError:
+                    pass
+                self._emit(summary)
+                self.write_prometheus()
+
+    def summary(self):
+        """Cumulative per-operation summary since process start"""
+        with self._lock:
+            return self.totals.summary()
+
+    def write_prometheus(self, path=None):
+        """Write the cumulative totals in Prometheus text format"""
+        path = path or self.prom_path
+        if not path:
+            return
+
+        name = f"{METRIC_PREFIX}_span_seconds"
+        lines = [
+            f"# HELP {name} Latency of instrumented operations.",
+            f"# TYPE {name} summary",
+        ]
+        errors = []
+        retries = []
+        with self._lock:
+            for operation, counts in self.totals.summary().items():
+                label = f'operation="{operation}"'
+                for quantile, key in (('0.5', 'p50_ms'), ('0.95', 'p95_ms')):
+                    if counts[key] is not None:
+                        lines.append(f'{name}{{{label},quantile="{quantile}"}} {round(counts[key] / 1000, 6)}')
+                lines.append(f"{name}_sum{{{label}}} {round(counts['total_ms'] / 1000, 6)}")
+                lines.append(f"{name}_count{{{label}}} {counts['count']}")
+                errors.append(f"{METRIC_PREFIX}_span_errors_total{{{label}}} {counts['errors']}")
+                retries.append(f"{METRIC_PREFIX}_retries_total{{{label}}} {counts['retries']}")
+
+        lines += [f"# HELP {METRIC_PREFIX}_span_errors_total Instrumented operations that raised.",
+                  f"# TYPE {METRIC_PREFIX}_span_errors_total counter", *errors,
+                  f"# HELP {METRIC_PREFIX}_retries_total Retries of instrumented operations.",
+                  f"# TYPE {METRIC_PREFIX}_retries_total counter", *retries]
+
+        # The textfile collector may read at any moment, so replace atomically,
+        # through a temp file of our own since runs can end concurrently
+        tmp_path = f"{path}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                f.write('\n'.join(lines) + '\n')
+            os.replace(tmp_path, path)
+        except OSError as e:
+            self._write_failed(path, e)
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+# Shared recorder for the process
+metrics = Metrics()
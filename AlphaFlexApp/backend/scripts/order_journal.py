@@ -0,0 +1,132 @@
+# order_journal.py
+#
+# Append-only journal of order legs, so a basket interrupted midway can be
+# resumed without buying or selling anything twice.
+#
+# Every broker order call is bracketed by two journal records:
+#
+#   intent     written (and synced) before order_*_fractional_by_quantity
+#   submitted  written after the broker returned an order id
+#   failed     written after the call gave up
+#
+# A leg's state is its latest record. On resume, submitted legs are skipped,
+# failed and unjournaled legs are placed again, and legs left at intent (the
+# process died during the call, or the broker never confirmed the order) are
+# reconciled against the broker's order list before deciding.
+#
+# The journal is a SQLite database (WAL, synchronous=FULL) at
+# ORDER_JOURNAL_PATH, default order_journal.db in the working directory.
+
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timezone
+
+JOURNAL_PATH = os.environ.get('ORDER_JOURNAL_PATH', 'order_journal.db')
+
+INTENT = 'intent'
+SUBMITTED = 'submitted'
+FAILED = 'failed'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS legs (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    batch_id TEXT NOT NULL,
+    side TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    phase TEXT NOT NULL,
+    quantity REAL,
+    amount REAL,
+    price REAL,
+    order_id TEXT,
+    status TEXT,
+    error TEXT,
+    recorded_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS legs_batch ON legs (batch_id, side, symbol, seq);
+"""
+
+def utc_now():
+    return datetime.now(timezone.utc).isoformat()
+
+def new_batch_id():
+    return uuid.uuid4().hex[:12]
+
+class OrderJournal:
+    """Append-only leg journal shared by every batch on this machine"""
+
+    def __init__(self, path=None):
+        self.path = path or JOURNAL_PATH
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        # Each record is on disk before the broker call it guards
+        self._conn.execute('PRAGMA synchronous=FULL')
+        self._conn.executescript(SCHEMA)
+
+    def append(self, batch_id, side, symbol, phase, **fields):
+        columns = ['batch_id', 'side', 'symbol', 'phase', 'recorded_at', *fields]
+        values = [batch_id, side, symbol, phase, utc_now(), *fields.values()]
+        with self._lock:
+            self._conn.execute(
+                f"INSERT INTO legs ({', '.join(columns)}) VALUES ({', '.join('?' * len(values))})",
+                values
+            )
+
+    def legs(self, batch_id, side):
+        """Latest record per symbol for one batch and side, as dicts"""
+        with self._lock:
+            cursor = self._conn.execute(
+                """
+                SELECT symbol, phase, quantity, amount, price, order_id, status, error, recorded_at
+                FROM legs
+                WHERE seq IN (
+                    SELECT MAX(seq) FROM legs WHERE batch_id = ? AND side = ? GROUP BY symbol
+                )
+                """,
+                (batch_id, side)
+            )
+            names = [column[0] for column in cursor.description]
+            return {row[0]: dict(zip(names, row)) for row in cursor.fetchall()}
+
+    def batch(self, batch_id, side):
+        return JournalBatch(self, batch_id, side)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+class JournalBatch:
+    """The journal as seen by one batch's legs on one side (buy or sell)"""
+
+    def __init__(self, journal, batch_id, side):
+        self.journal = journal
+        self.batch_id = batch_id
+        self.side = side
+
+    def intent(self, symbol, quantity, amount=None, price=None):
+        self.journal.append(self.batch_id, self.side, symbol, INTENT,
+                            quantity=quantity, amount=amount, price=price)
+
+    def submitted(self, symbol, order):
+        self.journal.append(self.batch_id, self.side, symbol, SUBMITTED,
+                            order_id=order.get('order_id') or order.get('id'),
+                            status=order.get('status') or order.get('state'))
+
+    def failed(self, symbol, error):
+        self.journal.append(self.batch_id, self.side, symbol, FAILED, error=str(error))
+
+    def legs(self):
+        return self.journal.legs(self.batch_id, self.side)
+
+_journal = None
+_journal_lock = threading.Lock()
+
+def get_journal():
+    """The process-wide journal, opened on first use"""
+    global _journal
+    with _journal_lock:
+        if _journal is None:
+            _journal = OrderJournal()
+        return _journal
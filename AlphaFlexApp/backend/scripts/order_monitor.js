@@ -1,94 +1,290 @@
 //const robin_stocks = require('robin_stocks');
 const { spawn } = require('child_process');
+const crypto = require('crypto');
 const path = require('path');
 const storageManager = require('../storage-manager');
+const pythonWorker = require('../python-worker');
+
+// Orders are placed moments before their monitoring starts; a sweep looks
+// back this far before the earliest start
+const SWEEP_MARGIN_MS = 60 * 60 * 1000;
+
+// The since date (YYYY-MM-DD, UTC like the broker's created_at) limiting a
+// verify_orders sweep to orders monitored from startTime on
+const sweepSince = (startTime) => new Date(startTime - SWEEP_MARGIN_MS).toISOString().slice(0, 10);
 
 class OrderMonitor {
     constructor() {
-        this.monitoringIntervals = new Map(); // Store monitoring intervals by orderId
+        this.monitoredOrders = new Map(); // Monitoring state by orderId
+        this.pollTimer = null; // One shared interval polls every monitored order
+        this.polling = false;
+        this.marketOpenUntil = 0; // Known exchange session, from the worker's market calendar
+        this.marketClosedUntil = 0;
         this.maxRetries = 3;
         this.checkInterval = 30000; // 30 seconds
         this.maxMonitoringTime = 30 * 60 * 1000; // 30 minutes
     }
 
-    async startMonitoring(email, orderId, orderType = 'buy') {
+    // Robinhood login of an app account, saved at login; checks and orders
+    // run inside that user's stored session on the worker
+    async robinhoodUsername(email) {
+        const session = await storageManager.getSession(email);
+        return (session && session.robinhoodUsername) || email;
+    }
+
+    async startMonitoring(email, orderId, orderType = 'buy', username = null) {
         console.log(`Starting monitoring for order ${orderId}`);
-        
-        let retryCount = 0;
-        let startTime = Date.now();
 
-        const checkStatus = async () => {
-            try {
-                const orderDetails = await this.checkOrderStatus(email, orderId);
-                
-                if (!orderDetails) {
-                    throw new Error('Failed to fetch order details');
-                }
+        this.monitoredOrders.set(orderId, {
+            email,
+            username: username || await this.robinhoodUsername(email),
+            orderType,
+            retryCount: 0,
+            startTime: Date.now()
+        });
 
-                console.log(`Order ${orderId} status: ${orderDetails.state}`);
+        // Start the shared polling interval
+        if (!this.pollTimer) {
+            this.pollTimer = setInterval(() => this.pollAll(), this.checkInterval);
+        }
 
-                switch (orderDetails.state.toLowerCase()) {
-                    case 'filled':
-                        await this.handleFilledOrder(email, orderId, orderDetails);
-                        this.stopMonitoring(orderId);
-                        break;
-
-                    case 'cancelled':
-                    case 'failed':
-                        if (retryCount < this.maxRetries) {
-                            await this.retryOrder(email, orderId, orderType);
-                            retryCount++;
-                        } else {
-                            await this.handleFailedOrder(email, orderId, orderDetails);
-                            this.stopMonitoring(orderId);
-                        }
-                        break;
-
-                    case 'pending':
-                        // Check if we've exceeded max monitoring time
-                        if (Date.now() - startTime > this.maxMonitoringTime) {
-                            await this.handleTimeoutOrder(email, orderId);
-                            this.stopMonitoring(orderId);
-                        }
-                        break;
-
-                    case 'partially_filled':
-                        await this.handlePartialFill(email, orderId, orderDetails);
-                        break;
-                }
+        // Do initial check immediately
+        await this.pollOrders([orderId]);
+    }
 
-            } catch (error) {
-                console.error(`Error monitoring order ${orderId}:`, error);
-                await storageManager.updateOrderStatus(email, orderId, 'error', {
-                    error: error.message,
-                    lastChecked: new Date().toISOString()
-                });
-            }
+    // Run place_orders or sell_all_positions on the worker, recording each
+    // order in orders.json as it streams in rather than after the whole batch.
+    // The batch id the worker journals legs under is chosen here and saved
+    // with the order before any leg goes out, so resumeOrderBatch() can
+    // finish a batch whose worker died midway.
+    async runOrderBatch(email, method, params, onProgress = () => {}) {
+        const username = params.username || await this.robinhoodUsername(email);
+        const batchId = params.batch_id || crypto.randomBytes(6).toString('hex');
+        const batch = await storageManager.saveOrder(email, {
+            type: method === 'sell_all_positions' ? 'sell' : 'buy',
+            method,
+            amount: params.total_amount,
+            holdings: params.holdings,
+            robinhoodUsername: username,
+            batchId
+        });
+
+        return this.streamOrderBatch(email, batch.orderId, method, { ...params, username, batch_id: batchId }, onProgress);
+    }
+
+    // Run a saved batch again with resume, skipping every leg its journal
+    // shows as already submitted
+    async resumeOrderBatch(email, orderId, onProgress = () => {}) {
+        const order = await storageManager.getOrderDetails(email, orderId);
+        if (!order || !order.batchId) {
+            throw new Error(`Order ${orderId} has no batch to resume`);
+        }
+
+        const method = order.method || (order.type === 'sell' ? 'sell_all_positions' : 'place_orders');
+        const params = {
+            holdings: order.holdings,
+            username: order.robinhoodUsername || await this.robinhoodUsername(email),
+            batch_id: order.batchId,
+            resume: true
         };
+        if (method === 'place_orders') {
+            params.total_amount = order.amount;
+        }
+        return this.streamOrderBatch(email, orderId, method, params, onProgress);
+    }
 
-        // Start monitoring interval
-        const intervalId = setInterval(checkStatus, this.checkInterval);
-        this.monitoringIntervals.set(orderId, intervalId);
+    async streamOrderBatch(email, orderId, method, params, onProgress) {
+        const result = await pythonWorker.stream(method, params, (event) => {
+            storageManager.recordOrderEvent(email, orderId, event).catch(() => {});
+            onProgress(event);
+        });
 
-        // Do initial check immediately
-        await checkStatus();
+        await storageManager.recordOrderEvent(email, orderId, { event: 'summary', ...result });
+        return { ...result, orderId };
     }
 
     stopMonitoring(orderId) {
-        const intervalId = this.monitoringIntervals.get(orderId);
-        if (intervalId) {
-            clearInterval(intervalId);
-            this.monitoringIntervals.delete(orderId);
+        if (this.monitoredOrders.delete(orderId)) {
             console.log(`Stopped monitoring order ${orderId}`);
         }
+
+        if (this.monitoredOrders.size === 0 && this.pollTimer) {
+            clearInterval(this.pollTimer);
+            this.pollTimer = null;
+        }
+    }
+
+    // Whether the exchange is open, asking the worker's calendar only once
+    // per open or close boundary. This is the regular session rather than
+    // the order window: good-for-day orders placed by 2:30 PM can still fill
+    // until the 3:00 PM close.
+    async isMarketOpen() {
+        const now = Date.now();
+        if (now < this.marketOpenUntil) {
+            return true;
+        }
+        if (now < this.marketClosedUntil) {
+            return false;
+        }
+
+        try {
+            const status = await pythonWorker.call('market_status', { session: 'exchange' });
+            if (status.is_open) {
+                this.marketOpenUntil = now + status.seconds_to_close * 1000;
+            } else {
+                this.marketClosedUntil = now + status.seconds_to_open * 1000;
+            }
+            return status.is_open;
+        } catch (error) {
+            console.error('Error checking market status:', error);
+            return true;
+        }
+    }
+
+    async pollAll() {
+        // Skip a tick rather than overlap a slow sweep
+        if (this.polling) {
+            return;
+        }
+
+        this.polling = true;
+        try {
+            // Orders don't move while the market is closed; don't ask the broker
+            if (!(await this.isMarketOpen())) {
+                return;
+            }
+
+            await this.pollOrders([...this.monitoredOrders.keys()]);
+        } finally {
+            this.polling = false;
+        }
+    }
+
+    async pollOrders(orderIds) {
+        if (orderIds.length === 0) {
+            return;
+        }
+
+        // One sweep per user, each inside that user's session and covering
+        // only the days since that user's earliest monitored order; a failed
+        // sweep only marks that user's orders
+        const byUser = new Map();
+        for (const orderId of orderIds) {
+            const monitored = this.monitoredOrders.get(orderId);
+            if (!monitored) {
+                continue;
+            }
+            if (!byUser.has(monitored.username)) {
+                byUser.set(monitored.username, { orderIds: [], startTime: monitored.startTime });
+            }
+            const user = byUser.get(monitored.username);
+            user.orderIds.push(orderId);
+            user.startTime = Math.min(user.startTime, monitored.startTime);
+        }
+
+        const statuses = {};
+        for (const [username, { orderIds: userOrderIds, startTime }] of byUser) {
+            try {
+                Object.assign(statuses, await this.checkOrderStatuses(userOrderIds, username, sweepSince(startTime)));
+            } catch (error) {
+                console.error('Error checking order statuses:', error);
+                userOrderIds.forEach(orderId => { statuses[orderId] = { success: false, error: error.message }; });
+            }
+        }
+
+        for (const orderId of orderIds) {
+            await this.handleStatus(orderId, statuses[orderId]);
+        }
+    }
+
+    async handleStatus(orderId, status) {
+        const monitored = this.monitoredOrders.get(orderId);
+        if (!monitored) {
+            return;
+        }
+
+        const { email, orderType } = monitored;
+
+        try {
+            if (!status || !status.success) {
+                throw new Error((status && status.error) || 'Failed to fetch order details');
+            }
+
+            const orderDetails = { ...status, state: status.status };
+
+            // Update order status in storage
+            await storageManager.updateOrderStatus(email, orderId, orderDetails.state, {
+                lastChecked: new Date().toISOString(),
+                details: orderDetails
+            });
+
+            console.log(`Order ${orderId} status: ${orderDetails.state}`);
+
+            switch (orderDetails.state.toLowerCase()) {
+                case 'filled':
+                    await this.handleFilledOrder(email, orderId, orderDetails);
+                    this.stopMonitoring(orderId);
+                    break;
+
+                case 'cancelled':
+                case 'failed':
+                    if (monitored.retryCount < this.maxRetries) {
+                        await this.retryOrder(email, orderId, orderType);
+                        monitored.retryCount++;
+                    } else {
+                        await this.handleFailedOrder(email, orderId, orderDetails);
+                        this.stopMonitoring(orderId);
+                    }
+                    break;
+
+                case 'pending':
+                    // Check if we've exceeded max monitoring time
+                    if (Date.now() - monitored.startTime > this.maxMonitoringTime) {
+                        await this.handleTimeoutOrder(email, orderId);
+                        this.stopMonitoring(orderId);
+                    }
+                    break;
+
+                case 'partially_filled':
+                    await this.handlePartialFill(email, orderId, orderDetails);
+                    break;
+            }
+
+        } catch (error) {
+            console.error(`Error monitoring order ${orderId}:`, error);
+            await storageManager.updateOrderStatus(email, orderId, 'error', {
+                error: error.message,
+                lastChecked: new Date().toISOString()
+            });
+        }
+    }
+
+    async checkOrderStatuses(orderIds, username, since = null) {
+        // Resolve every order with one authentication check and one sweep
+        // (of orders created on or after since, when given), inside the
+        // session of the user who placed them
+        const params = { order_ids: orderIds, username };
+        if (since) {
+            params.since = since;
+        }
+        const result = await pythonWorker.call('verify_orders', params);
+        if (!result.success) {
+            throw new Error(result.error || 'Failed to verify order statuses');
+        }
+        return result.orders;
     }
 
     async checkOrderStatus(email, orderId) {
         try {
-            // Run Python script to check order status
-            const scriptPath = path.join(__dirname, 'robinhood_order.py');
-            const result = await this.runPythonScript(scriptPath, ['check', orderId]);
-            
+            const monitored = this.monitoredOrders.get(orderId);
+            const username = monitored ? monitored.username : await this.robinhoodUsername(email);
+            const statuses = await this.checkOrderStatuses([orderId], username);
+            const status = statuses[orderId];
+            if (!status || !status.success) {
+                throw new Error((status && status.error) || 'Failed to verify order status');
+            }
+            const result = { ...status, state: status.status };
+
             // Update order status in storage
             await storageManager.updateOrderStatus(email, orderId, result.state, {
                 lastChecked: new Date().toISOString(),
@@ -187,7 +383,9 @@ class OrderMonitor {
 
             // Run Python script to retry order
             const scriptPath = path.join(__dirname, 'robinhood_order.py');
+            const username = originalOrder.robinhoodUsername || await this.robinhoodUsername(email);
             const result = await this.runPythonScript(scriptPath, [
+                '--user', username,
                 orderType,
                 JSON.stringify(originalOrder)
             ]);
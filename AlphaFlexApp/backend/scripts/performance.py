@@ -3,89 +3,301 @@ import json
 import sys
 import os
 import time
+import signal
+import uuid
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
 from datetime import datetime, timedelta
-from alpha_flex import backtest_portfolio
+from backtest_engine import PERIODS, PERIOD_LABELS
+from metrics import metrics
 
 CACHE_FILE = 'performance_cache.json'
 CACHE_DURATION = 24 * 60 * 60  # 24 hours in seconds
 
-def read_cache():
+# Incremental mode only applies new bars to stored horizon state, so it is
+# cheap enough to refresh every few minutes
+INCREMENTAL_CACHE_DURATION = int(os.environ.get('PERFORMANCE_INCREMENTAL_MAX_AGE', '300'))
+
+# Per-period backtest fallback: each period runs in its own process, so a cold
+# start takes about as long as the slowest period. Backtests mostly wait on
+# downloads, hence one worker per period rather than per CPU.
+# PERFORMANCE_WORKERS=1 runs them one after another in this process.
+PERFORMANCE_WORKERS = int(os.environ.get('PERFORMANCE_WORKERS', str(len(PERIODS))))
+PERIOD_TIMEOUT = float(os.environ.get('PERFORMANCE_PERIOD_TIMEOUT', '300'))  # seconds
+PERIOD_TIMEOUT_GRACE = 30  # seconds for a worker to start and report a timeout
+
+def portfolio_cache_file(name):
+    """Cache file for a registry portfolio; the default portfolio keeps CACHE_FILE"""
+    from portfolios import DEFAULT_PORTFOLIO, slug
+    if name == DEFAULT_PORTFOLIO:
+        return CACHE_FILE
+    return f"performance_cache.{slug(name)}.json"
+
+def read_cache_entries(cache_file=CACHE_FILE):
+    """Read per-period cache entries: {period: {'value': ..., 'timestamp': ...}}"""
     try:
-        if os.path.exists(CACHE_FILE):
-            with open(CACHE_FILE, 'r') as f:
+        if os.path.exists(cache_file):
+            with open(cache_file, 'r') as f:
                 cache_data = json.load(f)
-                cache_time = cache_data.get('timestamp', 0)
-                
-                # Check if cache is still valid (less than 24 hours old)
-                if time.time() - cache_time < CACHE_DURATION:
-                    print("Using cached performance data", file=sys.stderr)
-                    return cache_data.get('data')
+
+            if 'periods' in cache_data:
+                return cache_data['periods']
+
+            # Older caches stored one blob with a single timestamp
+            performance = (cache_data.get('data') or {}).get('performance') or {}
+            cache_time = cache_data.get('timestamp', 0)
+            return {
+                label.lower(): {'value': value, 'timestamp': cache_time}
+                for label, value in zip(performance.get('labels', []), performance.get('data', []))
+            }
     except Exception as e:
         print(f"Error reading cache: {e}", file=sys.stderr)
-    
-    return None
 
-def write_cache(data):
+    return {}
+
+def stale_periods(entries, periods, max_age=CACHE_DURATION):
+    """Periods that are missing from the cache or older than max_age"""
+    now = time.time()
+    return [
+        period for period in periods
+        if period not in entries or now - entries[period].get('timestamp', 0) >= max_age
+    ]
+
+def build_response(entries, periods, errors=None):
+    """Performance payload; periods in `errors` ({period: error}) without a cached value show 0"""
+    errors = errors or {}
+    response = {
+        "performance": {
+            "labels": [PERIOD_LABELS[PERIODS.index(period)] for period in periods],
+            "data": [entries[period]['value'] if period in entries else 0 for period in periods]
+        }
+    }
+    if errors:
+        response["performance"]["errors"] = {
+            PERIOD_LABELS[PERIODS.index(period)]: str(error) for period, error in errors.items()
+        }
+    return response
+
+def write_cache_entries(entries, cache_file=CACHE_FILE):
+    """Write cache entries atomically so readers never see a partial file.
+
+    Each writer uses its own temporary file, so concurrent period writers
+    never rename each other's partial file into place.
+    """
+    tmp_file = f"{cache_file}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp"
     try:
         cache_data = {
-            'timestamp': time.time(),
-            'data': data
+            'timestamp': max((entry['timestamp'] for entry in entries.values()), default=time.time()),
+            'periods': entries
         }
-        with open(CACHE_FILE, 'w') as f:
+        with open(tmp_file, 'w') as f:
             json.dump(cache_data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, cache_file)
         print("Wrote new data to cache", file=sys.stderr)
     except Exception as e:
         print(f"Error writing cache: {e}", file=sys.stderr)
+        try:
+            os.remove(tmp_file)
+        except OSError:
+            pass
 
-def get_all_performance():
-    # Try to get cached data first
-    cached_data = read_cache()
-    if cached_data:
-        print(json.dumps(cached_data))
-        return
+def backtest_period(investment_amount, period):
+    """Percentage return of one alpha_flex.backtest_portfolio run"""
+    from alpha_flex import backtest_portfolio
 
-    # If no valid cache, calculate new data
-    investment_amount = 10000
-    periods = ['1d', '5d', '1m', '3m', 'ytd', '1y']
-    performance_data = []
+    print(f"Calculating for period: {period}", file=sys.stderr)
+    result = backtest_portfolio(investment_amount, period=period)
+    if isinstance(result, dict) and 'Percentage Return' in result:
+        return round(result['Percentage Return'], 2)
+    raise ValueError(f"Unexpected result format for {period}: {result}")
+
+def timed_backtest_period(investment_amount, period, timeout):
+    """backtest_period in a pool worker, interrupted after `timeout` seconds"""
+    if not hasattr(signal, 'SIGALRM'):
+        return backtest_period(investment_amount, period)
 
+    def expire(signum, frame):
+        raise TimeoutError(f"Backtest for {period} timed out after {timeout:.0f}s")
+
+    signal.signal(signal.SIGALRM, expire)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
     try:
+        return backtest_period(investment_amount, period)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+
+def backtest_each_period(investment_amount, periods, workers=None, timeout=None):
+    """{period: return or exception}, one alpha_flex.backtest_portfolio run per period.
+
+    With more than one worker the periods run on a process pool, and a
+    period still running after `timeout` seconds is interrupted. A period
+    that fails or times out maps to its exception; the others keep their
+    results.
+    """
+    workers = min(workers or PERFORMANCE_WORKERS, len(periods))
+    timeout = timeout or PERIOD_TIMEOUT
+
+    results = {}
+    if workers <= 1:
         for period in periods:
-            print(f"Calculating for period: {period}", file=sys.stderr)
-            result = backtest_portfolio(investment_amount, period=period)
-            
-            if isinstance(result, dict) and 'Percentage Return' in result:
-                return_value = round(result['Percentage Return'], 2)
-            else:
-                print(f"Unexpected result format for {period}: {result}", file=sys.stderr)
-                return_value = 0
-                
-            performance_data.append(return_value)
+            try:
+                with metrics.span('backtest_period', period=period):
+                    results[period] = backtest_period(investment_amount, period)
+            except Exception as e:
+                results[period] = e
+        return results
 
-        # Create the response data
-        response_data = {
-            "performance": {
-                "labels": ["1D", "5D", "1M", "3M", "YTD", "1Y"],
-                "data": performance_data
+    # Spawned rather than forked, since the caller (worker.py) is multi-threaded
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+    try:
+        with metrics.span('backtest_periods_parallel', periods=len(periods), workers=workers):
+            start = time.monotonic()
+            futures = {
+                period: pool.submit(timed_backtest_period, investment_amount, period, timeout)
+                for period in periods
             }
+            for i, (period, future) in enumerate(futures.items()):
+                # Backstop for a worker that can't be interrupted; periods
+                # queued behind a full pool get a later deadline
+                deadline = start + (timeout + PERIOD_TIMEOUT_GRACE) * (i // workers + 1)
+                try:
+                    results[period] = future.result(timeout=max(deadline - time.monotonic(), 0))
+                except FutureTimeout:
+                    results[period] = TimeoutError(f"Backtest for {period} timed out after {timeout:.0f}s")
+                except Exception as e:
+                    results[period] = e
+    finally:
+        # Don't wait on a timed-out backtest; its process exits once it finishes
+        pool.shutdown(wait=False, cancel_futures=True)
+    return results
+
+def calculate_performance(investment_amount, periods, incremental=False):
+    """{period: return or exception} from a single price matrix, falling back to per-period backtests"""
+    from backtest_engine import get_horizon_returns
+
+    try:
+        if incremental:
+            from incremental_returns import get_incremental_returns
+            try:
+                with metrics.span('backtest_incremental', periods=len(periods)):
+                    returns = get_incremental_returns(periods)
+                return {period: returns[period] for period in periods}
+            except Exception as e:
+                print(f"Incremental update failed, recomputing from the price matrix: {e}", file=sys.stderr)
+
+        with metrics.span('backtest_horizon_returns', periods=len(periods)):
+            returns = get_horizon_returns(periods)
+        return {period: returns[period] for period in periods}
+    except Exception as e:
+        print(f"Single-pass backtest failed, falling back to per-period backtests: {e}", file=sys.stderr)
+        return backtest_each_period(investment_amount, periods)
+
+def error_response(error):
+    """Empty performance payload carrying an error message"""
+    return {
+        "performance": {
+            "labels": PERIOD_LABELS,
+            "data": [0] * len(PERIOD_LABELS),
+            "error": str(error)
         }
+    }
+
+def compute_portfolios_performance(names=None):
+    """Performance payloads for several registry portfolios, keyed by name.
+
+    Prices are loaded once for every portfolio with expired periods and each
+    portfolio's returns are computed on the process pool; every portfolio
+    keeps its own cache file, and one failing doesn't affect the others.
+    """
+    from portfolios import resolve, portfolio_returns
 
-        # Cache the new data
-        write_cache(response_data)
+    names = list(resolve(names))
+    cache_files = {name: portfolio_cache_file(name) for name in names}
+    entries = {name: read_cache_entries(cache_files[name]) for name in names}
+    pending = {name: stale_periods(entries[name], PERIODS) for name in names}
+    pending = {name: periods for name, periods in pending.items() if periods}
 
-        # Output the data as JSON
-        print(json.dumps(response_data))
+    results = {}
+    if pending:
+        try:
+            with metrics.span('backtest_portfolios', portfolios=len(pending)):
+                results = portfolio_returns(pending)
+        except Exception as e:
+            print(f"Error loading portfolio data: {str(e)}", file=sys.stderr)
+            results = {name: e for name in pending}
+
+    response = {}
+    now = time.time()
+    for name in names:
+        result = results.get(name)
+        if isinstance(result, Exception):
+            print(f"Error calculating performance for {name}: {str(result)}", file=sys.stderr)
+            response[name] = error_response(result)
+            continue
+        if result is not None:
+            for period in pending[name]:
+                entries[name][period] = {'value': result[period], 'timestamp': now}
+            write_cache_entries(entries[name], cache_files[name])
+        response[name] = build_response(entries[name], PERIODS)
+
+    return {"portfolios": response}
+
+@metrics.run('get_all_performance')
+def compute_all_performance(incremental=False, portfolios=None):
+    """Return the performance payload, recomputing only periods whose cache entry expired.
+
+    With `incremental`, entries expire after INCREMENTAL_CACHE_DURATION and
+    are advanced from the stored horizon state (incremental_returns.py).
+    With `portfolios` (a list of registry names, or "all"), returns
+    {"portfolios": {name: payload}} from compute_portfolios_performance.
+    """
+    if portfolios is not None:
+        return compute_portfolios_performance(None if portfolios == 'all' else portfolios)
+
+    # Try to get cached data first
+    entries = read_cache_entries()
+    periods = PERIODS
+    max_age = INCREMENTAL_CACHE_DURATION if incremental else CACHE_DURATION
+    stale = stale_periods(entries, periods, max_age)
+    if not stale:
+        print("Using cached performance data", file=sys.stderr)
+        return build_response(entries, periods)
+
+    # Calculate new data for the expired periods only
+    investment_amount = 10000
+
+    try:
+        performance_data = calculate_performance(investment_amount, stale, incremental)
+
+        # Cache the new data. Failed periods keep their expired entry, if
+        # any, and are retried on the next request
+        now = time.time()
+        errors = {}
+        for period, value in performance_data.items():
+            if isinstance(value, Exception):
+                print(f"Error calculating performance for {period}: {str(value)}", file=sys.stderr)
+                errors[period] = value
+            else:
+                entries[period] = {'value': value, 'timestamp': now}
+        if len(errors) < len(performance_data):
+            write_cache_entries(entries)
+
+        # Create the response data
+        return build_response(entries, periods, errors)
     except Exception as e:
         print(f"Error calculating performance: {str(e)}", file=sys.stderr)
         # Return empty data structure but with error message
-        error_response = {
-            "performance": {
-                "labels": ["1D", "5D", "1M", "3M", "YTD", "1Y", "3Y"],
-                "data": [0, 0, 0, 0, 0, 0, 0],
-                "error": str(e)
-            }
-        }
-        print(json.dumps(error_response))
+        return error_response(e)
+
+def get_all_performance(incremental=False, portfolios=None):
+    # Output the data as JSON
+    print(json.dumps(compute_all_performance(incremental, portfolios)))
 
 if __name__ == "__main__":
-    get_all_performance()
\ No newline at end of file
+    args = sys.argv[1:]
+    get_all_performance(
+        incremental='--incremental' in args,
+        portfolios='all' if '--all-portfolios' in args else None
+    )
@@ -0,0 +1,191 @@
+# portfolios.py
+#
+# Registry of the strategies the app offers, and one shared data load for any
+# set of them. A Universe loads prices and fundamentals once for the union of
+# its portfolios' tickers; each portfolio's own arithmetic then runs on a
+# process pool, so adding a portfolio costs its computation, not another
+# download.
+#
+# Portfolios are either screened by alpha_flex (weights from final_file.csv /
+# the fundamentals snapshot, as before) or hold fixed weights. Extra or
+# overriding entries can be listed in PORTFOLIOS_FILE:
+#
+#   {"AlphaFlex Dividend": {"weights": {"KO": 40, "PEP": 30, "PG": 30}}}
+
+import json
+import math
+import multiprocessing
+import os
+import re
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from allocation import SYMBOL_COLUMN, WEIGHT_COLUMN, EXPORT_COLUMNS, holdings_records
+from backtest_engine import (
+    HISTORY_PERIOD, PORTFOLIO_FILE, WEIGHTS_FILE, compute_horizon_returns, load_weights
+)
+
+DEFAULT_PORTFOLIO = 'AlphaFlex Growth'
+PORTFOLIOS_FILE = os.environ.get('PORTFOLIOS_FILE', 'portfolios.json')
+PORTFOLIO_WORKERS = int(os.environ.get('PORTFOLIO_WORKERS', str(min(4, os.cpu_count() or 1))))
+TRADING_DAYS = 252
+
+BUILTIN_PORTFOLIOS = {
+    'AlphaFlex Growth': {'source': 'alpha_flex'},
+    'AlphaFlex Safe': {
+        'weights': {'APD': 15, 'EOG': 15, 'CF': 14, 'DKS': 14, 'KR': 14, 'RPRX': 14, 'TPR': 14},
+    },
+}
+
+def load_registry():
+    """Built-in portfolios plus any defined in PORTFOLIOS_FILE"""
+    registry = dict(BUILTIN_PORTFOLIOS)
+    try:
+        if os.path.exists(PORTFOLIOS_FILE):
+            with open(PORTFOLIOS_FILE, 'r') as f:
+                registry.update(json.load(f))
+    except Exception as e:
+        print(f"Error reading {PORTFOLIOS_FILE}: {e}", file=sys.stderr)
+    return registry
+
+def resolve(names=None):
+    """{name: spec} for the requested portfolios (all of them when names is None)"""
+    registry = load_registry()
+    if names is None:
+        return registry
+    if isinstance(names, str):
+        names = [names]
+
+    unknown = [name for name in names if name not in registry]
+    if unknown:
+        raise ValueError(f"Unknown portfolio: {', '.join(unknown)}")
+    return {name: registry[name] for name in names}
+
+def slug(name):
+    return re.sub(r'[^a-z0-9]+', '_', name.lower()).strip('_')
+
+class Universe:
+    """Weights of several portfolios with one price and fundamentals load for all their tickers"""
+
+    def __init__(self, names=None):
+        self.portfolios = resolve(names)
+        self._weights = {}
+        self._fundamentals = None
+        self._prices = None
+
+    def weights(self, name):
+        """Weights (in %) indexed by ticker"""
+        if name not in self._weights:
+            spec = self.portfolios[name]
+            if spec.get('source') == 'alpha_flex':
+                if os.path.exists(WEIGHTS_FILE) or os.path.exists(PORTFOLIO_FILE):
+                    weights = load_weights()
+                else:
+                    # Same fallback as load_weights, through the shared snapshot
+                    weights = self.fundamentals().set_index(SYMBOL_COLUMN)[WEIGHT_COLUMN].astype(float)
+            else:
+                weights = pd.Series(spec['weights'], dtype=float)
+            self._weights[name] = weights
+        return self._weights[name]
+
+    def tickers(self):
+        """Union of every portfolio's tickers, in first-seen order"""
+        return list(dict.fromkeys(t for name in self.portfolios for t in self.weights(name).index))
+
+    def fundamentals(self):
+        """The alpha_flex fundamentals snapshot, loaded once.
+
+        Only portfolios screened by alpha_flex need it fresh; fixed-weight
+        portfolios make do with whatever snapshot is stored.
+        """
+        if self._fundamentals is None:
+            from price_store import get_portfolio_fundamentals, load_fundamentals
+            if any(spec.get('source') == 'alpha_flex' for spec in self.portfolios.values()):
+                self._fundamentals = get_portfolio_fundamentals()
+            else:
+                stored = load_fundamentals(max_age=math.inf)
+                self._fundamentals = stored if stored is not None else pd.DataFrame(columns=[SYMBOL_COLUMN] + EXPORT_COLUMNS)
+        return self._fundamentals
+
+    def prices(self, period=HISTORY_PERIOD):
+        """Closes for every ticker in the universe, in one price store request"""
+        if self._prices is None:
+            from price_store import get_prices
+            tickers = self.tickers()
+            print(f"Loading price history for {len(tickers)} tickers across {len(self.portfolios)} portfolios",
+                  file=sys.stderr)
+            self._prices = get_prices(tickers, period=period)
+        return self._prices
+
+    def holdings_frame(self, name):
+        """Stock, Market Cap, Revenue, Volatility and weight rows for one portfolio"""
+        fundamentals = self.fundamentals()
+        if self.portfolios[name].get('source') == 'alpha_flex':
+            return fundamentals
+
+        weights = self.weights(name)
+        known = fundamentals.set_index(SYMBOL_COLUMN).reindex(weights.index)
+        frame = pd.DataFrame({SYMBOL_COLUMN: weights.index})
+        for column in EXPORT_COLUMNS:
+            frame[column] = known[column].to_numpy(dtype=float) if column in known else np.nan
+        frame[WEIGHT_COLUMN] = weights.to_numpy()
+
+        # Volatility for tickers alpha_flex never screened, from the shared closes
+        missing = frame['Volatility'].isna().to_numpy()
+        if missing.any():
+            returns = self.prices().reindex(columns=weights.index).pct_change(fill_method=None)
+            volatility = (returns.std() * np.sqrt(TRADING_DAYS) * 100).to_numpy()
+            frame.loc[missing, 'Volatility'] = volatility[missing]
+        return frame
+
+def holdings_payload(name, portfolio_df, weight_decimals=0):
+    """The {"Portfolio Name", "Holdings"} payload (see allocation.holdings_records)"""
+    return {"Portfolio Name": name, "Holdings": holdings_records(portfolio_df, weight_decimals)}
+
+# Pool shared by every multi-portfolio run in this process. Workers are
+# spawned rather than forked, since the caller (worker.py) is multi-threaded.
+_pool = None
+_pool_lock = threading.Lock()
+
+def process_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=PORTFOLIO_WORKERS,
+                                        mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+def run_parallel(func, tasks):
+    """{key: func(*args)} for tasks {key: args}, on the process pool when there
+    is more than one task. A failed task maps to its exception instead of
+    failing the others."""
+    results = {}
+    if len(tasks) <= 1 or PORTFOLIO_WORKERS <= 1:
+        for key, args in tasks.items():
+            try:
+                results[key] = func(*args)
+            except Exception as e:
+                results[key] = e
+        return results
+
+    futures = {key: process_pool().submit(func, *args) for key, args in tasks.items()}
+    for key, future in futures.items():
+        try:
+            results[key] = future.result()
+        except Exception as e:
+            results[key] = e
+    return results
+
+def portfolio_returns(pending):
+    """{name: {period: return} or exception} for {name: periods}, from one shared price load"""
+    universe = Universe(list(pending))
+    prices = universe.prices()
+    tasks = {}
+    for name, periods in pending.items():
+        weights = universe.weights(name)
+        tasks[name] = (prices.reindex(columns=weights.index), weights, periods)
+    return run_parallel(compute_horizon_returns, tasks)
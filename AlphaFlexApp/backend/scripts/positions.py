@@ -0,0 +1,174 @@
+# positions.py
+#
+# Point-in-time positions of one account, indexed by symbol.
+#
+# Robinhood positions and orders name their stock by instrument URL. The
+# InstrumentCache maps each URL to its symbol once and keeps the mapping in a
+# SQLite table at INSTRUMENT_CACHE_PATH (default instrument_cache.db in the
+# working directory), so selling, drift reports and multi-account rebalances
+# never look the same instrument up twice, in this process or the next.
+#
+# A PositionSnapshot is one get_all_positions call: the held symbols in a list,
+# a {symbol: index} map and the quantities in a float64 array, converted from
+# the broker's strings once. Lookups for a basket of symbols are a single
+# array gather.
+
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+from lazy_import import lazy_module
+from metrics import metrics
+from retry_policy import read_policy
+
+# robinhood_order imports this module for every subcommand; numpy, pandas
+# (through allocation) and robin_stocks load only once positions are used
+np = lazy_module('numpy')
+allocation = lazy_module('allocation')
+r = lazy_module('robin_stocks.robinhood')
+
+INSTRUMENT_CACHE_PATH = os.environ.get('INSTRUMENT_CACHE_PATH', 'instrument_cache.db')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS instruments (
+    url TEXT PRIMARY KEY,
+    symbol TEXT NOT NULL,
+    resolved_at TEXT NOT NULL
+);
+"""
+
+class InstrumentCache:
+    """Persistent instrument URL -> symbol map, loaded into memory on first use"""
+
+    def __init__(self, path=None):
+        self.path = path or INSTRUMENT_CACHE_PATH
+        self._lock = threading.Lock()
+        self._conn = None
+        self._symbols = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _connect(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.executescript(SCHEMA)
+            self._symbols = dict(self._conn.execute('SELECT url, symbol FROM instruments'))
+        return self._conn
+
+    def learn(self, url, symbol):
+        """Record a mapping the broker handed us along with other data"""
+        with self._lock:
+            conn = self._connect()
+            if self._symbols.get(url) != symbol:
+                self._symbols[url] = symbol
+                conn.execute('INSERT OR REPLACE INTO instruments (url, symbol, resolved_at) VALUES (?, ?, ?)',
+                             (url, symbol, datetime.now(timezone.utc).isoformat()))
+
+    def symbol(self, url):
+        """Symbol of an instrument URL, asking the broker only the first time"""
+        with self._lock:
+            self._connect()
+            symbol = self._symbols.get(url)
+            if symbol is not None:
+                self.hits += 1
+                return symbol
+            self.misses += 1
+
+        symbol = read_policy.call('get_symbol_by_url', lambda: r.stocks.get_symbol_by_url(url))
+        if not symbol:
+            raise Exception(f"No symbol found for instrument {url}")
+        self.learn(url, symbol)
+        return symbol
+
+    def stats(self):
+        with self._lock:
+            self._connect()
+            return {'instruments': len(self._symbols), 'hits': self.hits, 'misses': self.misses}
+
+# Shared by every account and batch in this process
+instrument_cache = InstrumentCache()
+
+class PositionSnapshot:
+    """Quantities held by one account, in a float64 array indexed by symbol"""
+
+    def __init__(self, symbols, quantities, instruments=None, taken_at=None):
+        self.symbols = list(symbols)
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.quantities = np.asarray(quantities, dtype=float)
+        self.instruments = list(instruments) if instruments is not None else [None] * len(self.symbols)
+        self.taken_at = taken_at or datetime.now(timezone.utc).isoformat()
+
+    @classmethod
+    def fetch(cls, instruments=None):
+        """Snapshot the open positions of the current session's account"""
+        instruments = instruments or instrument_cache
+        with metrics.span('position_snapshot') as span:
+            positions = read_policy.call('get_all_positions', r.get_all_positions) or []
+            quantities = np.array([float(p.get('quantity') or 0) for p in positions], dtype=float)
+            held = np.flatnonzero(quantities > 0)
+
+            symbols = []
+            urls = []
+            for i in held:
+                position = positions[i]
+                url = position.get('instrument')
+                if position.get('symbol'):
+                    symbol = position['symbol']
+                    if url:
+                        instruments.learn(url, symbol)
+                else:
+                    symbol = instruments.symbol(url)
+                symbols.append(symbol)
+                urls.append(url)
+
+            span['positions'] = len(symbols)
+            return cls(symbols, quantities[held], urls)
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __contains__(self, symbol):
+        return symbol in self.index
+
+    def quantity(self, symbol):
+        """Shares held of one symbol (0 when not held)"""
+        i = self.index.get(symbol)
+        return float(self.quantities[i]) if i is not None else 0.0
+
+    def vector(self, symbols):
+        """Shares held aligned to symbols, 0 where not held"""
+        positions = np.array([self.index.get(symbol, -1) for symbol in symbols], dtype=np.intp)
+        if not len(self.quantities):
+            return np.zeros(len(positions))
+        return np.where(positions >= 0, self.quantities[positions], 0.0)
+
+    def held(self, symbols=None):
+        """{symbol: shares} for held positions, limited to symbols when given"""
+        if symbols is None:
+            return dict(zip(self.symbols, self.quantities.tolist()))
+        symbols = list(symbols)
+        return {symbol: quantity for symbol, quantity in zip(symbols, self.vector(symbols).tolist()) if quantity > 0}
+
+def drift_report(frame, snapshot, prices, total_amount=None):
+    """Per-holding drift of an account's positions from the target weights.
+
+    frame is a weights DataFrame (see allocation.holdings_frame). The target is
+    sized on total_amount, or on the current value of the portfolio's
+    positions when not given. Returns (records, total_amount).
+    """
+    symbols = frame[allocation.SYMBOL_COLUMN].to_numpy()
+    price_values = allocation.price_vector(symbols, prices)
+    held = snapshot.vector(symbols)
+    values = held * np.where(np.isfinite(price_values), price_values, 0.0)
+    if total_amount is None:
+        total_amount = float(values.sum())
+
+    report, _ = allocation.allocate(total_amount, frame, price_values, held)
+    report['Held'] = held
+    report['Value'] = values
+    report['Current Weight'] = values / total_amount * 100 if total_amount > 0 else 0.0
+    report = report.rename(columns={'Weight': allocation.WEIGHT_COLUMN})
+    records = report.astype(object).where(report.notna(), None).to_dict('records')
+    return records, total_amount
@@ -0,0 +1,283 @@
+# price_store.py
+#
+# Persistent local store for daily closes and portfolio fundamentals.
+# Closes live in a memory-mapped NumPy matrix (dates x tickers) with a small
+# JSON index, so a refresh only downloads the bars after the last stored date.
+#
+# Each save writes its matrix under a new name (closes-<version>.npy) and then
+# publishes it by replacing index.json, which names the matrix it describes.
+# That rename is the only step readers can observe, so they always pair a
+# matrix with its own index. The previously published matrix is kept for
+# readers that loaded the old index just before the swap; older matrices are
+# removed once they are MATRIX_GRACE old, so a concurrent save's matrix is
+# never deleted before that save has published it.
+
+import glob
+import json
+import os
+import sys
+import time
+import uuid
+import numpy as np
+import pandas as pd
+
+STORE_DIR = 'price_store'
+PRICES_FILE = os.path.join(STORE_DIR, 'closes.npy')  # matrix of stores written before versioning
+INDEX_FILE = os.path.join(STORE_DIR, 'index.json')
+FUNDAMENTALS_FILE = os.path.join(STORE_DIR, 'fundamentals.csv')
+FUNDAMENTALS_META_FILE = os.path.join(STORE_DIR, 'fundamentals.json')
+DEFAULT_PERIOD = '1y'
+FUNDAMENTALS_MAX_AGE = 24 * 60 * 60  # 24 hours in seconds
+MATRIX_GRACE = 60  # seconds an unpublished or superseded matrix is kept
+
+# Stored history starting within this long after a period's nominal start
+# (weekends, holidays) counts as covering it
+HISTORY_SLACK = pd.Timedelta(days=7)
+
+def period_start(period):
+    """First date a yfinance-style period ('5d', '6mo', '1y', '3y') reaches back to"""
+    today = pd.Timestamp.now().normalize()
+    if period == 'ytd':
+        return pd.Timestamp(year=today.year, month=1, day=1)
+    count = int(''.join(ch for ch in period if ch.isdigit()) or 1)
+    if period.endswith('mo'):
+        return today - pd.DateOffset(months=count)
+    if period.endswith('y'):
+        return today - pd.DateOffset(years=count)
+    return today - pd.DateOffset(days=count)
+
+def download_price_matrix(tickers, period=DEFAULT_PERIOD, start=None, end=None):
+    """Download daily closes for all tickers in one request"""
+    import yfinance as yf
+
+    tickers = list(tickers)
+    kwargs = {'start': start} if start is not None else {'period': period}
+    if end is not None:
+        kwargs['end'] = end
+    data = yf.download(
+        tickers,
+        interval='1d',
+        auto_adjust=True,
+        progress=False,
+        group_by='column',
+        **kwargs
+    )
+    if data.empty:
+        return pd.DataFrame(columns=tickers, dtype=float)
+
+    closes = data['Close']
+    if isinstance(closes, pd.Series):
+        closes = closes.to_frame(name=tickers[0])
+
+    closes.index = pd.to_datetime(closes.index).tz_localize(None).normalize()
+    return closes.reindex(columns=tickers).sort_index()
+
+def _write_atomic(path, write):
+    """Write a file through a temporary sibling and rename it into place.
+
+    The temporary name is unique to the writer, so concurrent saves (the
+    worker's background refresh and a CLI run) never rename each other's
+    partly written file into place.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+def _matrix_path(index):
+    return os.path.join(STORE_DIR, index['matrix']) if 'matrix' in index else PRICES_FILE
+
+def _read_published():
+    """(index, memory-mapped matrix) of the published store, or None"""
+    for attempt in range(3):
+        try:
+            with open(INDEX_FILE, 'r') as f:
+                index = json.load(f)
+            matrix = np.load(_matrix_path(index), mmap_mode='r')
+        except FileNotFoundError:
+            # Two saves landed between reading the index and opening its
+            # matrix; the new index names one that exists
+            if attempt < 2 and os.path.exists(INDEX_FILE):
+                continue
+            return None
+
+        expected = (len(index['dates']), len(index['tickers']))
+        if matrix.shape != expected:
+            raise ValueError(f"Stored price matrix has shape {matrix.shape}, index describes {expected}")
+        return index, matrix
+
+def load_prices(tickers=None):
+    """Load the stored close matrix as a DataFrame (empty if nothing is stored)"""
+    published = _read_published()
+    if published is None:
+        return pd.DataFrame(columns=list(tickers or []), dtype=float)
+
+    index, matrix = published
+    prices = pd.DataFrame(
+        matrix,
+        index=pd.to_datetime(index['dates']),
+        columns=index['tickers'],
+        copy=False
+    )
+    if tickers is not None:
+        prices = prices.reindex(columns=list(tickers))
+    return prices
+
+def save_prices(prices):
+    """Persist a close matrix, replacing whatever was stored"""
+    prices = prices.sort_index()
+    matrix = np.ascontiguousarray(prices.to_numpy(dtype=np.float64))
+    matrix_name = f"closes-{uuid.uuid4().hex[:12]}.npy"
+    index = {
+        'matrix': matrix_name,
+        'tickers': [str(t) for t in prices.columns],
+        'dates': [d.strftime('%Y-%m-%d') for d in prices.index],
+        'updated': time.time()
+    }
+
+    try:
+        with open(INDEX_FILE, 'r') as f:
+            previous = _matrix_path(json.load(f))
+    except (OSError, ValueError):
+        previous = None
+
+    _write_atomic(os.path.join(STORE_DIR, matrix_name), lambda f: np.save(f, matrix))
+    _write_atomic(INDEX_FILE, lambda f: f.write(json.dumps(index).encode('utf-8')))
+
+    # Keep the new matrix and the one just replaced; older ones have no readers left
+    _remove_superseded({os.path.join(STORE_DIR, matrix_name), previous})
+
+def _remove_superseded(keep):
+    """Delete stored matrices other than `keep` once they are MATRIX_GRACE old"""
+    cutoff = time.time() - MATRIX_GRACE
+    for path in glob.glob(os.path.join(STORE_DIR, 'closes*.npy')):
+        if path in keep:
+            continue
+        try:
+            if os.path.getmtime(path) <= cutoff:
+                os.remove(path)
+        except OSError:
+            pass
+
+def refresh_prices(tickers, period=DEFAULT_PERIOD):
+    """Bring the store up to date for tickers, downloading only missing bars"""
+    tickers = list(tickers)
+    stored = load_prices()
+    stored = stored.copy() if not stored.empty else stored
+
+    # A longer period than the store holds extends every known ticker backwards
+    new_tickers = [t for t in tickers if t not in stored.columns]
+    wanted_start = period_start(period)
+    if not stored.empty and stored.index[0] - wanted_start > HISTORY_SLACK:
+        known = [t for t in tickers if t not in new_tickers]
+        print(f"Extending history back to {wanted_start.date()}", file=sys.stderr)
+        prefix = download_price_matrix(
+            known, start=wanted_start.strftime('%Y-%m-%d'), end=stored.index[0].strftime('%Y-%m-%d')
+        )
+        prefix = prefix.loc[prefix.index < stored.index[0]]
+        if not prefix.empty:
+            stored = pd.concat([prefix.reindex(columns=stored.columns), stored])
+
+    # Tickers we have never seen need their full history
+    if new_tickers:
+        if stored.empty:
+            print(f"Downloading {period} history for {len(new_tickers)} tickers", file=sys.stderr)
+            backfill = download_price_matrix(new_tickers, period=period)
+        else:
+            print(f"Backfilling history for new tickers: {new_tickers}", file=sys.stderr)
+            backfill = download_price_matrix(new_tickers, start=stored.index[0].strftime('%Y-%m-%d'))
+        stored = backfill if stored.empty else stored.join(backfill, how='outer')
+
+    # Everyone else only needs bars from the last stored date onward; the last
+    # bar is re-fetched because it may have been stored mid-session
+    known = [t for t in tickers if t not in new_tickers]
+    if known and not stored.empty:
+        last_date = stored.index[-1]
+        delta = download_price_matrix(known, start=last_date.strftime('%Y-%m-%d'))
+        if not delta.empty:
+            print(f"Appending {len(delta)} bars from {last_date.date()}", file=sys.stderr)
+            stored = stored.reindex(stored.index.union(delta.index))
+            stored.loc[delta.index, delta.columns] = delta.combine_first(
+                stored.loc[delta.index, delta.columns]
+            )
+
+    save_prices(stored)
+    return stored.reindex(columns=tickers)
+
+def stored_is_fresh(tickers, period, max_age):
+    """Whether the store was refreshed within max_age seconds and covers tickers and period"""
+    try:
+        with open(INDEX_FILE, 'r') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return False
+
+    if time.time() - index.get('updated', 0) >= max_age or not index.get('dates'):
+        return False
+    if not set(tickers) <= set(index.get('tickers', [])):
+        return False
+    return pd.Timestamp(index['dates'][0]) - period_start(period) <= HISTORY_SLACK
+
+def get_prices(tickers, period=DEFAULT_PERIOD, max_age=None):
+    """Return closes for tickers, refreshing the store first.
+
+    With max_age, a store refreshed less than max_age seconds ago is used
+    as is, without asking the network for new bars.
+    """
+    if max_age and stored_is_fresh(tickers, period, max_age):
+        return load_prices(tickers)
+
+    try:
+        return refresh_prices(tickers, period=period)
+    except Exception as e:
+        print(f"Price refresh failed, using stored prices: {e}", file=sys.stderr)
+        prices = load_prices(tickers)
+        if prices.empty:
+            raise
+        return prices
+
+def load_fundamentals(max_age=FUNDAMENTALS_MAX_AGE):
+    """Return the stored portfolio fundamentals if they are fresh enough"""
+    try:
+        if not (os.path.exists(FUNDAMENTALS_FILE) and os.path.exists(FUNDAMENTALS_META_FILE)):
+            return None
+        with open(FUNDAMENTALS_META_FILE, 'r') as f:
+            meta = json.load(f)
+        if time.time() - meta.get('timestamp', 0) >= max_age:
+            return None
+        return pd.read_csv(FUNDAMENTALS_FILE)
+    except Exception as e:
+        print(f"Error reading stored fundamentals: {e}", file=sys.stderr)
+        return None
+
+def save_fundamentals(portfolio_df):
+    """Persist the portfolio fundamentals snapshot"""
+    try:
+        csv_data = portfolio_df.to_csv(index=False).encode('utf-8')
+        meta = json.dumps({'timestamp': time.time()}).encode('utf-8')
+        _write_atomic(FUNDAMENTALS_FILE, lambda f: f.write(csv_data))
+        _write_atomic(FUNDAMENTALS_META_FILE, lambda f: f.write(meta))
+    except Exception as e:
+        print(f"Error writing stored fundamentals: {e}", file=sys.stderr)
+
+def get_portfolio_fundamentals():
+    """Return the portfolio DataFrame, calling alpha_flex only when the snapshot is stale"""
+    portfolio_df = load_fundamentals()
+    if portfolio_df is not None:
+        print("Using stored portfolio fundamentals", file=sys.stderr)
+        return portfolio_df
+
+    from alpha_flex import get_portfolio
+    portfolio_df = get_portfolio()
+    save_fundamentals(portfolio_df)
+    return portfolio_df
@@ -0,0 +1,131 @@
+# quote_cache.py
+#
+# In-process cache of latest quotes shared by the buy and sell paths.
+#
+# - Entries live for QUOTE_TTL seconds; the cache holds at most
+#   QUOTE_CACHE_SIZE symbols and evicts the least recently used.
+# - Lookups are single-flight: while one caller is fetching a symbol, other
+#   callers asking for it wait on that request instead of sending their own.
+# - Misses are fetched in one batched call through the supplied fetcher,
+#   which takes a list of symbols and returns ({symbol: price}, {symbol: error}).
+#   Errors are handed to the callers that asked but never cached.
+
+import os
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+QUOTE_TTL = float(os.environ.get('QUOTE_TTL', '15'))  # seconds
+QUOTE_CACHE_SIZE = int(os.environ.get('QUOTE_CACHE_SIZE', '2048'))
+
+class QuoteCache:
+    """TTL + LRU quote cache with single-flight batched fetches"""
+
+    def __init__(self, fetch, ttl=QUOTE_TTL, max_size=QUOTE_CACHE_SIZE):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # symbol -> (price, fetched at)
+        self._inflight = {}            # symbol -> Future of (price, error)
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def _lookup(self, symbol, now):
+        entry = self._entries.get(symbol)
+        if entry is None:
+            return None
+        if now - entry[1] > self.ttl:
+            del self._entries[symbol]
+            return None
+        self._entries.move_to_end(symbol)
+        return entry[0]
+
+    def _store(self, symbol, price, now):
+        self._entries[symbol] = (price, now)
+        self._entries.move_to_end(symbol)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get_many(self, symbols):
+        """Latest prices for symbols as ({symbol: price}, {symbol: error})"""
+        prices = {}
+        errors = {}
+        waiting = {}
+        owned = {}
+
+        with self._lock:
+            now = time.monotonic()
+            for symbol in dict.fromkeys(symbols):
+                price = self._lookup(symbol, now)
+                if price is not None:
+                    self.hits += 1
+                    prices[symbol] = price
+                elif symbol in self._inflight:
+                    self.coalesced += 1
+                    waiting[symbol] = self._inflight[symbol]
+                else:
+                    self.misses += 1
+                    owned[symbol] = self._inflight[symbol] = Future()
+
+        if owned:
+            try:
+                fetched, fetch_errors = self.fetch(list(owned))
+            except Exception as e:
+                fetched, fetch_errors = {}, {symbol: str(e) for symbol in owned}
+
+            with self._lock:
+                now = time.monotonic()
+                for symbol, future in owned.items():
+                    del self._inflight[symbol]
+                    if symbol in fetched:
+                        self._store(symbol, fetched[symbol], now)
+                        future.set_result((fetched[symbol], None))
+                    else:
+                        future.set_result((None, fetch_errors.get(symbol, f"No price returned for {symbol}")))
+
+            waiting.update(owned)
+
+        for symbol, future in waiting.items():
+            price, error = future.result()
+            if error is None:
+                prices[symbol] = price
+            else:
+                errors[symbol] = error
+
+        return prices, errors
+
+    def get(self, symbol):
+        """Latest price for one symbol; raises if it could not be fetched"""
+        prices, errors = self.get_many([symbol])
+        if symbol in errors:
+            raise Exception(errors[symbol])
+        return prices[symbol]
+
+    def prefetch(self, symbols):
+        """Warm the cache for symbols in one batched request"""
+        return self.get_many(symbols)
+
+    def invalidate(self, symbols=None):
+        with self._lock:
+            if symbols is None:
+                self._entries.clear()
+            else:
+                for symbol in symbols:
+                    self._entries.pop(symbol, None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,258 @@
+# rebalance.py
+#
+# Batched autopilot rebalancing for many accounts.
+#
+#   python3 scripts/rebalance.py batch.json
+#
+# batch.json:
+#   {
+#     "holdings": [{"Stock": "NVDA", "Stock Allocation Weight (%)": 7.39}, ...],
+#     "accounts": [{"username": "user@example.com", "amount": 1000}, ...],
+#     "batch_id": "optional id, generated when missing",
+#     "resume": false
+#   }
+#
+# Quotes are fetched once for the union of symbols, every account's orders are
+# sized in one vectorized pass, each account's positions are snapshotted once
+# (see positions.py) for its drift report, and all orders go through one shared
+# rate-limited scheduler. robin_stocks holds a single global session, so
+# accounts are submitted one after another (each inside its own stored session)
+# while each account's legs fan out over the shared thread pool. Each account's
+# result is written to its own file under rebalance_results/<batch id>/.
+#
+# Each account's amount is new money, invested by the target weights; nothing
+# is sold. Orders are sized on that amount alone, and the drift report only
+# records how far the positions already held are from the weights.
+#
+# The order window is checked before every account and again before every
+# leg, so a long batch stops at the cutoff. Accounts reached after it get a
+# "market_closed" result, and legs cut off are not journaled.
+#
+# Every leg is journaled (see order_journal.py) under "<batch id>-<account>",
+# so re-running a batch with "resume": true skips the legs each account
+# already submitted, and places the rest.
+
+import sys
+import json
+import os
+import logging
+import uuid
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from allocation import WEIGHT_COLUMN, holdings_frame, price_vector, size_orders
+from metrics import metrics
+from order_journal import get_journal
+from positions import PositionSnapshot, drift_report
+from rate_limit import TokenBucket
+from retry_policy import read_policy
+from robinhood_order import (
+    ORDER_BURST,
+    ORDER_MAX_WORKERS,
+    ORDER_RATE_LIMIT,
+    check_market_hours,
+    completed_legs,
+    quote_cache,
+    submit_buy_order,
+)
+from session_manager import session_manager
+from lazy_import import lazy_module
+
+r = lazy_module('robin_stocks.robinhood')
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+RESULTS_DIR = 'rebalance_results'
+
+class MarketClosed(Exception):
+    """The order window closed before an account's turn"""
+
+def write_account_result(batch_dir, username, result):
+    """Write one account's result atomically"""
+    path = os.path.join(batch_dir, f"{session_manager.pickle_name(username)}.json")
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(result, f)
+    os.replace(tmp_path, path)
+    return path
+
+def submit_account(username, amount, frame, quantities, targets, prices, executor, bucket, journal, resume=False):
+    """Submit one account's sized orders inside its stored session.
+
+    Returns (orders, failed orders, legs skipped, drift of the positions held
+    before this batch). Legs reached after the order window closes are not
+    submitted; their failures carry market_closed.
+    """
+    symbols = list(frame['Stock'])
+    orders = []
+    failed_orders = []
+
+    with session_manager.session(username), metrics.span('account'):
+        drift, _ = drift_report(frame, PositionSnapshot.fetch(), prices)
+        done = completed_legs(journal) if resume else {}
+        legs = [i for i in range(len(symbols)) if quantities[i] > 0 and symbols[i] not in done]
+
+        required = amount if not done else float(sum(targets[i] for i in legs))
+        account = read_policy.call('load_account_profile', r.load_account_profile)
+        buying_power = float(account.get('buying_power', 0))
+        if buying_power < required:
+            raise Exception(f"Insufficient buying power. Available: ${buying_power}, Required: ${required}")
+
+        def run_leg(index):
+            symbol = symbols[index]
+            try:
+                with metrics.span('rate_limit_wait'):
+                    bucket.acquire()
+                if not check_market_hours():
+                    return None, {
+                        'symbol': symbol,
+                        'error': 'Market closed before the order was submitted',
+                        'allocation_amount': float(targets[index]),
+                        'market_closed': True
+                    }
+                return submit_buy_order(
+                    symbol, float(quantities[index]), float(targets[index]), float(prices[index]), journal
+                ), None
+            except Exception as e:
+                logger.error(f"Error placing order for {symbol}: {str(e)}")
+                return None, {
+                    'symbol': symbol,
+                    'error': str(e),
+                    'allocation_amount': float(targets[index])
+                }
+
+        for order, failure in executor.map(metrics.bind(run_leg), legs):
+            if order:
+                orders.append(order)
+            elif failure:
+                failed_orders.append(failure)
+
+    return orders, failed_orders, len(done), drift
+
+@metrics.run('rebalance_accounts')
+def rebalance_accounts(holdings, accounts, max_workers=None, rate_limit=None, batch_id=None, resume=False):
+    """Size and submit buy orders for many accounts against one set of quotes"""
+    max_workers = max_workers or max(ORDER_MAX_WORKERS, 4)
+    rate_limit = rate_limit or ORDER_RATE_LIMIT
+    batch_id = batch_id or uuid.uuid4().hex[:12]
+
+    try:
+        if not check_market_hours():
+            raise Exception("Orders can only be placed during market hours (9:00 AM - 2:30 PM CDT, Mon-Fri)")
+        if not accounts:
+            raise Exception("No accounts to rebalance")
+
+        frame = holdings_frame(holdings)
+        symbols = list(frame['Stock'])
+
+        # Quotes need an authenticated session; any account's will do
+        with session_manager.session(accounts[0]['username']):
+            stock_prices, price_errors = quote_cache.get_many(symbols)
+
+        prices = price_vector(symbols, stock_prices)
+        amounts = [float(account['amount']) for account in accounts]
+        targets, quantities, residual_cash = size_orders(amounts, frame[WEIGHT_COLUMN], prices)
+
+        batch_dir = os.path.join(RESULTS_DIR, batch_id)
+        os.makedirs(batch_dir, exist_ok=True)
+
+        bucket = TokenBucket(rate_limit, burst=ORDER_BURST)
+        summary = []
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for i, account in enumerate(accounts):
+                username = account['username']
+                failed_orders = [
+                    {'symbol': symbol, 'error': f"Failed to get current price: {error}"}
+                    for symbol, error in price_errors.items()
+                ]
+                try:
+                    if not check_market_hours():
+                        raise MarketClosed("Market closed before this account was submitted")
+                    journal = get_journal().batch(f"{batch_id}-{session_manager.pickle_name(username)}", 'buy')
+                    orders, leg_failures, skipped, drift = submit_account(
+                        username, amounts[i], frame, quantities[i], targets[i], prices, executor, bucket,
+                        journal, resume
+                    )
+                    failed_orders.extend(leg_failures)
+                    result = {
+                        'success': True,
+                        'market_closed': any(failure.get('market_closed') for failure in leg_failures),
+                        'orders': orders,
+                        'failed_orders': failed_orders,
+                        'orders_skipped': skipped,
+                        'total_amount': amounts[i],
+                        'total_allocated': float(targets[i].sum()),
+                        'residual_cash': float(residual_cash[i]),
+                        'drift': drift,
+                        'timestamp': datetime.now().isoformat(),
+                        'partial_success': len(failed_orders) > 0 and len(orders) > 0,
+                        'all_failed': len(orders) == 0 and len(failed_orders) > 0
+                    }
+                except MarketClosed as e:
+                    logger.warning(f"Skipping account {i}: {str(e)}")
+                    result = {
+                        'success': False,
+                        'skipped': True,
+                        'market_closed': True,
+                        'error': str(e),
+                        'error_type': 'market_closed',
+                        'timestamp': datetime.now().isoformat()
+                    }
+                except Exception as e:
+                    logger.error(f"Error rebalancing account {i}: {str(e)}")
+                    result = {
+                        'success': False,
+                        'error': str(e),
+                        'error_type': 'authentication_error' if 'Authentication required' in str(e) else 'order_error',
+                        'timestamp': datetime.now().isoformat()
+                    }
+
+                result['username'] = username
+                # Rerunning the batch with this id and resume finishes what the cutoff left
+                result['batch_id'] = batch_id
+                result_file = write_account_result(batch_dir, username, result)
+                summary.append({
+                    'username': username,
+                    'success': result['success'],
+                    'market_closed': result.get('market_closed', False),
+                    'orders': len(result.get('orders', [])),
+                    'failed_orders': len(result.get('failed_orders', [])),
+                    'result_file': result_file
+                })
+
+        return {
+            'success': True,
+            'batch_id': batch_id,
+            'accounts': summary,
+            'accounts_succeeded': sum(1 for item in summary if item['success']),
+            'accounts_failed': sum(1 for item in summary if not item['success']),
+            'accounts_market_closed': sum(1 for item in summary if item['market_closed']),
+            'timestamp': datetime.now().isoformat()
+        }
+
+    except Exception as e:
+        logger.error(f"Error in rebalance_accounts: {str(e)}")
+        return {
+            'success': False,
+            'batch_id': batch_id,
+            'error': str(e),
+            'error_type': 'authentication_error' if 'Authentication required' in str(e) else 'order_error',
+            'timestamp': datetime.now().isoformat()
+        }
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        result = {
+            'success': False,
+            'error': 'Invalid arguments'
+        }
+    else:
+        with open(sys.argv[1], 'r') as f:
+            batch = json.load(f)
+        result = rebalance_accounts(batch['holdings'], batch['accounts'], batch_id=batch.get('batch_id'),
+                                    resume=batch.get('resume', False))
+
+    print(json.dumps(result))
+    sys.exit(0 if result.get('success', False) else 1)
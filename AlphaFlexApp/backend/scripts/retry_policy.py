@@ -0,0 +1,266 @@
+# retry_policy.py
+#
+# Shared retry policy for broker calls.
+#
+# - Failures are classified first. Throttling, timeouts, connection errors
+#   and 5xx responses are retried. Errors a retry can't fix, such as
+#   insufficient buying power or shares, an unknown symbol or a rejected
+#   session, fail immediately.
+# - Retries back off exponentially with full jitter (a random delay between 0
+#   and base * 2^attempt, capped). When the broker says how long to wait
+#   (a Retry-After header, or "Expected available in N seconds"), that wait
+#   is used instead; a wait longer than BROKER_RETRY_AFTER_MAX gives up.
+# - All policies share one circuit breaker. When too many recent retryable
+#   calls fail, it opens and every broker call in the process waits out the
+#   cooldown, which pauses the whole batch instead of hammering a throttled
+#   API. The first call after the cooldown is a trial: success closes the
+#   breaker, failure reopens it.
+#
+# robin_stocks returns error bodies such as {"detail": "Not enough buying
+# power."} instead of raising, so order calls pass a validator that turns a
+# response without an order id into a BrokerError.
+#
+# Order calls are not idempotent. robin_stocks also returns None when the
+# request timed out or got a 429 or 5xx, and by then the order may already
+# exist. order_policy therefore retries only failures that certainly created
+# no order (throttling, a connection that was never made, an error body from
+# the broker). Everything else is an OrderOutcomeUnknown for the caller to
+# reconcile against the broker's order list before submitting again.
+
+import logging
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+BROKER_RETRY_ATTEMPTS = int(os.environ.get('BROKER_RETRY_ATTEMPTS', '3'))
+BROKER_BACKOFF_BASE = float(os.environ.get('BROKER_BACKOFF_BASE', '1'))  # seconds
+BROKER_BACKOFF_MAX = float(os.environ.get('BROKER_BACKOFF_MAX', '16'))  # seconds
+BROKER_RETRY_AFTER_MAX = float(os.environ.get('BROKER_RETRY_AFTER_MAX', '60'))  # seconds
+
+BREAKER_WINDOW = int(os.environ.get('BREAKER_WINDOW', '20'))  # recent calls considered
+BREAKER_MIN_CALLS = int(os.environ.get('BREAKER_MIN_CALLS', '5'))
+BREAKER_FAILURE_RATE = float(os.environ.get('BREAKER_FAILURE_RATE', '0.5'))
+BREAKER_COOLDOWN = float(os.environ.get('BREAKER_COOLDOWN', '30'))  # seconds
+
+# Messages of errors no retry can fix
+FATAL_PATTERNS = re.compile(
+    r'buying power|insufficient|not enough|invalid|not found|not tradable|not supported'
+    r'|authentication|unauthori[sz]ed|forbidden|permission|account is (?:restricted|deactivated)',
+    re.IGNORECASE
+)
+THROTTLE_PATTERN = re.compile(r'throttled.*?(\d+(?:\.\d+)?)\s*seconds?', re.IGNORECASE)
+
+# Transport errors raised before a request left this machine
+NOT_SENT_PATTERN = re.compile(
+    r'failed to establish a new connection|connection refused|name or service not known'
+    r'|temporary failure in name resolution|connecttimeout',
+    re.IGNORECASE
+)
+
+# Exceptions that mean a bug or bad data rather than a broker problem
+FATAL_EXCEPTIONS = (KeyError, TypeError, ValueError, AttributeError)
+
+class BrokerError(Exception):
+    """A broker response that reported an error instead of raising one"""
+
+    def __init__(self, message, status=None, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+class OrderOutcomeUnknown(BrokerError):
+    """An order call that may or may not have created the order"""
+
+def _retry_after_header(response):
+    headers = getattr(response, 'headers', None) or {}
+    value = headers.get('Retry-After')
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+def _status(error):
+    """(HTTP status or None, response or None) carried by an error"""
+    response = getattr(error, 'response', None)
+    return getattr(error, 'status', None) or getattr(response, 'status_code', None), response
+
+def classify(error):
+    """(retryable, retry_after seconds or None) for a failed broker call"""
+    if isinstance(error, BrokerError) and error.retry_after is not None:
+        return True, error.retry_after
+
+    message = str(error)
+    throttled = THROTTLE_PATTERN.search(message)
+    if throttled:
+        return True, float(throttled.group(1))
+
+    status, response = _status(error)
+    if status == 429:
+        return True, _retry_after_header(response)
+    if status is not None and (status >= 500 or status == 408):
+        return True, _retry_after_header(response)
+    if status is not None and 400 <= status < 500:
+        return False, None
+
+    if FATAL_PATTERNS.search(message):
+        return False, None
+    if isinstance(error, FATAL_EXCEPTIONS):
+        return False, None
+
+    # Connection resets, timeouts and anything unrecognized get another try
+    return True, None
+
+def order_not_sent(error):
+    """True when a failed order call certainly created no order"""
+    if isinstance(error, OrderOutcomeUnknown):
+        return False
+    status, _ = _status(error)
+    if status is not None:
+        # The broker refused the request; 408 and 5xx may come after it acted
+        return 400 <= status < 500 and status != 408
+    if isinstance(error, BrokerError) or THROTTLE_PATTERN.search(str(error)):
+        # The broker answered with an error body instead of an order
+        return True
+    return isinstance(error, ConnectionRefusedError) or bool(
+        NOT_SENT_PATTERN.search(f"{type(error).__name__}: {error}"))
+
+def classify_order(error):
+    """classify() for order calls: only failures that created no order are retried"""
+    if not order_not_sent(error):
+        return False, None
+    return classify(error)
+
+def accepted_order(order):
+    """Validator for order calls: the response must carry an order id"""
+    if isinstance(order, dict) and order.get('id'):
+        return
+    detail = order.get('detail') if isinstance(order, dict) else None
+    if detail:
+        raise BrokerError(detail)
+    # No id and no error body: robin_stocks hides timeouts, 429s and 5xx as None
+    raise OrderOutcomeUnknown(f"Order was not acknowledged: {order}")
+
+class CircuitBreaker:
+    """Opens when the failure rate over the last `window` calls reaches `failure_rate`"""
+
+    def __init__(self, window=BREAKER_WINDOW, min_calls=BREAKER_MIN_CALLS,
+                 failure_rate=BREAKER_FAILURE_RATE, cooldown=BREAKER_COOLDOWN):
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.cooldown = cooldown
+        self.results = deque(maxlen=window)
+        self.opened_at = None
+        self.trial = False
+        self.trips = 0
+        self._lock = threading.Lock()
+
+    def state(self):
+        with self._lock:
+            if self.opened_at is not None:
+                return 'open'
+            return 'half_open' if self.trial else 'closed'
+
+    def wait(self):
+        """Block while the breaker is open"""
+        while True:
+            with self._lock:
+                if self.opened_at is None:
+                    return
+                remaining = self.opened_at + self.cooldown - time.monotonic()
+                if remaining <= 0:
+                    self.opened_at = None
+                    self.trial = True
+                    logger.info("Circuit breaker half-open, sending a trial call")
+                    return
+            with metrics.span('circuit_open_wait'):
+                time.sleep(remaining)
+
+    def _open(self):
+        self.opened_at = time.monotonic()
+        self.results.clear()
+        self.trips += 1
+        logger.warning(f"Circuit breaker opened, pausing broker calls for {self.cooldown:.0f}s")
+
+    def record(self, success):
+        with self._lock:
+            if self.trial:
+                self.trial = False
+                if not success:
+                    self._open()
+                    return
+                self.results.clear()
+                logger.info("Circuit breaker closed")
+
+            self.results.append(success)
+            failures = self.results.count(False)
+            if len(self.results) >= self.min_calls and failures / len(self.results) >= self.failure_rate:
+                self._open()
+
+class RetryPolicy:
+    """Classified retries with jittered exponential backoff behind a circuit breaker"""
+
+    def __init__(self, max_attempts=BROKER_RETRY_ATTEMPTS, base_delay=BROKER_BACKOFF_BASE,
+                 max_delay=BROKER_BACKOFF_MAX, max_retry_after=BROKER_RETRY_AFTER_MAX, breaker=None,
+                 classify=classify):
+        self.max_attempts = max_attempts
+        self.classify = classify
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self.breaker = breaker
+
+    def backoff(self, attempt):
+        """Full-jitter delay before retry number `attempt` (1-based)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def call(self, operation, func, validate=None, **attrs):
+        """Call func() until it succeeds, fails fatally or runs out of attempts.
+
+        Spans: `operation` around the whole call, `<operation>_attempt` and
+        `<operation>_backoff` for each try and wait; `attrs` go on all of them.
+        """
+        with metrics.span(operation, **attrs) as span:
+            for attempt in range(1, self.max_attempts + 1):
+                span['attempts'] = attempt
+                if self.breaker:
+                    self.breaker.wait()
+                try:
+                    with metrics.span(f'{operation}_attempt', attempt=attempt, **attrs):
+                        result = func()
+                        if validate:
+                            validate(result)
+                except Exception as e:
+                    retryable, retry_after = self.classify(e)
+                    # Transient failures count against the breaker even when not retried here
+                    if self.breaker and classify(e)[0]:
+                        self.breaker.record(False)
+                    if not retryable or attempt == self.max_attempts:
+                        raise
+                    if retry_after is not None and retry_after > self.max_retry_after:
+                        logger.warning(f"{operation} asked to wait {retry_after:.0f}s, giving up")
+                        raise
+
+                    delay = retry_after if retry_after is not None else self.backoff(attempt)
+                    logger.warning(f"{operation} failed ({e}), retrying in {delay:.2f}s "
+                                   f"(attempt {attempt} of {self.max_attempts})")
+                    metrics.retry(operation)
+                    with metrics.span(f'{operation}_backoff', **attrs):
+                        time.sleep(delay)
+                else:
+                    if self.breaker:
+                        self.breaker.record(True)
+                    return result
+
+# One breaker for every broker call in the process. Reads retry a little
+# more eagerly; orders only retry failures that created no order.
+broker_breaker = CircuitBreaker()
+order_policy = RetryPolicy(breaker=broker_breaker, classify=classify_order)
+read_policy = RetryPolicy(max_attempts=BROKER_RETRY_ATTEMPTS + 1, base_delay=BROKER_BACKOFF_BASE / 2,
+                          max_delay=BROKER_BACKOFF_MAX / 2, breaker=broker_breaker)
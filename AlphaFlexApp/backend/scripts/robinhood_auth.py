@@ -2,11 +2,14 @@
 
 import sys
 import json
-import robin_stocks.robinhood as r
 import logging
 from pathlib import Path
 import os
 import time
+from lazy_import import lazy_module
+from session_manager import session_manager
+
+r = lazy_module('robin_stocks.robinhood')
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -28,20 +31,18 @@ def clear_session():
         logger.warning(f"Error removing pickle file: {e}")
 
 def perform_login(username, password):
-    """Handle login with interactive MFA"""
+    """Handle login with interactive MFA.
+
+    On success the session is kept (per user, under ~/.tokens) so trading
+    calls can reuse it through the session manager instead of logging in again.
+    """
+    logged_in = False
     try:
         clear_session()
 
         try:
             # Initial login attempt
-            r.login(
-                username=username,
-                password=password,
-                expiresIn=3600,
-                scope='internal',
-                by_sms=True,
-                store_session=False
-            )
+            session_manager.login(username, password)
 
             # Get account info after successful login
             account_profile = r.load_account_profile()
@@ -59,7 +60,7 @@ def perform_login(username, password):
                 }
             }
 
-            r.logout()
+            logged_in = True
             return result
 
         except Exception as e:
@@ -85,7 +86,9 @@ def perform_login(username, password):
             'error': str(e)
         }
     finally:
-        clear_session()
+        # Only tear down sessions from failed logins; successful ones are reused
+        if not logged_in:
+            session_manager.invalidate(username)
 
 if __name__ == "__main__":
     if len(sys.argv) < 4:
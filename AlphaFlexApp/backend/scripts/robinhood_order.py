@@ -1,19 +1,36 @@
 import sys
 import json
-import robin_stocks.robinhood as r
 import logging
-from decimal import Decimal
 from pathlib import Path
 import os
 import time
-from datetime import datetime, time as dt_time
-import pytz
+from datetime import datetime, timedelta, timezone
 import random
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from lazy_import import lazy_module
+from market_calendar import market_calendar
+from metrics import metrics
+from order_journal import SUBMITTED, INTENT, get_journal, new_batch_id
+from positions import PositionSnapshot, drift_report, instrument_cache
+from quote_cache import QuoteCache
+from rate_limit import TokenBucket
+from retry_policy import OrderOutcomeUnknown, accepted_order, classify, order_not_sent, order_policy, read_policy
+from session_manager import session_manager
+
+# robin_stocks is only imported once a command actually talks to the broker
+r = lazy_module('robin_stocks.robinhood')
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Concurrent order submission settings. ORDER_MAX_WORKERS=1 keeps the original
+# one-at-a-time submission with a random 5-10 second pause between orders.
+ORDER_MAX_WORKERS = int(os.environ.get('ORDER_MAX_WORKERS', '1'))
+ORDER_RATE_LIMIT = float(os.environ.get('ORDER_RATE_LIMIT', '0.5'))  # orders per second
+ORDER_BURST = int(os.environ.get('ORDER_BURST', '2'))
+
 def clear_session():
     """Clear any existing Robinhood session."""
     try:
@@ -30,38 +47,274 @@ def clear_session():
         logger.warning(f"Error removing pickle file: {e}")
 
 def check_market_hours():
-    """Check if it's currently market hours"""
-    import pytz
-    from datetime import datetime, time as dt_time
-    
-    # Get current time in Chicago timezone (CDT/CST)
-    cdt = pytz.timezone('America/Chicago')
-    now = datetime.now(cdt)
-    
-    # Check if it's a weekday
-    if now.weekday() >= 5:  # 5 = Saturday, 6 = Sunday
-        return False
-        
-    current_time = now.time()
-    market_open = dt_time(9, 0)  # 9:00 AM CDT
-    market_close = dt_time(14, 30)  # 2:30 PM CDT
-    
-    return market_open <= current_time <= market_close
+    """Check if it's currently market hours (9:00 AM - 2:30 PM CDT on trading days)"""
+    return market_calendar.is_open()
 
 def verify_authentication():
     """Verify that we have an active authenticated session"""
-    try:
-        # Try to get account info as a verification
-        account = r.load_account_profile()
-        if not account or 'account_number' not in account:
+    with metrics.span('verify_authentication') as span:
+        # A session validated moments ago by the session manager needs no round-trip
+        if session_manager.is_validated():
+            span['cached'] = True
+            return True
+
+        span['cached'] = False
+        try:
+            # Try to get account info as a verification
+            account = read_policy.call('load_account_profile', r.load_account_profile)
+            if not account or 'account_number' not in account:
+                span['authenticated'] = False
+                return False
+            session_manager.mark_validated()
+            return True
+        except Exception as e:
+            logger.error(f"Authentication verification failed: {str(e)}")
+            span['authenticated'] = False
             return False
-        return True
+
+def with_user_session(func):
+    """Run func inside the user's stored Robinhood session when a username is given"""
+    @functools.wraps(func)
+    def wrapper(*args, username=None, **kwargs):
+        if not username:
+            return func(*args, **kwargs)
+        try:
+            with session_manager.session(username):
+                return func(*args, **kwargs)
+        except Exception as e:
+            logger.error(f"Error restoring session: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e),
+                'error_type': 'authentication_error',
+                'timestamp': datetime.now().isoformat()
+            }
+    return wrapper
+
+class OrderResults:
+    """Outcomes of one order batch.
+
+    Without `on_event` every record is kept for the final result. With it,
+    each record is handed to `on_event` as soon as it is known and only the
+    counts are kept, so memory stays flat however large the basket is.
+    """
+
+    LISTS = {'placed': 'orders', 'failed': 'failed_orders', 'skipped': 'skipped_stocks'}
+
+    def __init__(self, on_event=None):
+        self.on_event = on_event
+        self.counts = dict.fromkeys(self.LISTS, 0)
+        self.records = {name: [] for name in self.LISTS.values()}
+
+    def add(self, event, record):
+        self.counts[event] += 1
+        if self.on_event:
+            self.on_event({'event': event, **record})
+        else:
+            self.records[self.LISTS[event]].append(record)
+
+    def lists(self, *events):
+        """The collected record lists for the result (empty when streaming)"""
+        if self.on_event:
+            return {}
+        return {self.LISTS[event]: self.records[self.LISTS[event]] for event in events}
+
+def ndjson_writer(stream=None):
+    """on_event callback writing one JSON object per line"""
+    def emit(event):
+        out = stream or sys.stdout
+        out.write(json.dumps(event) + '\n')
+        out.flush()
+    return emit
+
+def fetch_latest_prices(symbols):
+    """Fetch latest prices for all symbols in one call.
+
+    Returns ({symbol: price}, {symbol: error message}).
+    """
+    prices = {}
+    errors = {}
+    if not symbols:
+        return prices, errors
+
+    try:
+        quotes = read_policy.call('get_latest_price', lambda: r.stocks.get_latest_price(list(symbols)),
+                                  symbols=len(symbols))
     except Exception as e:
-        logger.error(f"Authentication verification failed: {str(e)}")
-        return False
+        # Fall back to one request per symbol so errors stay per-symbol
+        logger.warning(f"Batched price request failed, fetching individually: {str(e)}")
+        for symbol in symbols:
+            try:
+                quote = read_policy.call('get_latest_price', lambda: r.stocks.get_latest_price(symbol),
+                                         symbols=1, symbol=symbol)
+                prices[symbol] = float(quote[0])
+            except Exception as symbol_error:
+                errors[symbol] = str(symbol_error)
+        return prices, errors
+
+    for symbol, quote in zip(symbols, quotes or []):
+        try:
+            prices[symbol] = float(quote)
+        except (TypeError, ValueError):
+            errors[symbol] = f"No price returned for {symbol}"
+
+    for symbol in symbols[len(quotes or []):]:
+        errors[symbol] = f"No price returned for {symbol}"
+
+    return prices, errors
+
+# Order states that mean an in-flight leg never reached the market
+DEAD_ORDER_STATES = {'cancelled', 'rejected', 'failed'}
+
+# Allowed difference between the broker's and our clock when matching
+# in-flight legs to the broker's orders
+RECONCILE_SKEW = timedelta(seconds=60)
+
+def parse_timestamp(value):
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+# Submissions of one leg whose outcome was unknown and that the broker's
+# order list didn't show
+ORDER_SUBMIT_ATTEMPTS = int(os.environ.get('ORDER_SUBMIT_ATTEMPTS', '2'))
+
+def journaled_call(journal, symbol, quantity, place, amount=None, price=None):
+    """Run one broker order call under the order retry policy, bracketed by journal records.
+
+    order_policy only retries failures that created no order. When the outcome
+    is unknown (no response, a 5xx, a read timeout) the broker's order list is
+    checked first, and the order is submitted again only if it isn't there. A
+    leg still unknown after that stays at intent, for resume to reconcile.
+    """
+    if journal:
+        journal.intent(symbol, quantity, amount, price)
+    started = datetime.now(timezone.utc)
+
+    for attempt in range(1, ORDER_SUBMIT_ATTEMPTS + 1):
+        try:
+            order = order_policy.call(
+                'order',
+                lambda: place(symbol=symbol, quantity=quantity, timeInForce='gfd', extendedHours=False),
+                validate=accepted_order,
+                symbol=symbol
+            )
+            break
+        except Exception as e:
+            if order_not_sent(e):
+                if journal:
+                    journal.failed(symbol, e)
+                raise
+
+            order = find_placed_order(journal.side, symbol, started) if journal else None
+            if order:
+                logger.warning(f"Order for {symbol} failed ({e}) but the broker has it as {order['id']}")
+                break
+            if attempt == ORDER_SUBMIT_ATTEMPTS or not classify(e)[0]:
+                raise OrderOutcomeUnknown(f"Order for {symbol} may not have been placed: {e}") from e
+            logger.warning(f"Order for {symbol} failed ({e}) and the broker has no such order, submitting again")
+
+    if journal:
+        journal.submitted(symbol, order)
+    return order
+
+# Quotes shared by every order path in this process (see quote_cache.py)
+quote_cache = QuoteCache(fetch_latest_prices)
+
+def submit_buy_order(symbol, quantity, amount, price, journal=None):
+    """Place one fractional buy order with retry logic"""
+    order = journaled_call(journal, symbol, quantity, r.orders.order_buy_fractional_by_quantity, amount, price)
+    if not order:
+        return None
+
+    logger.info(f"Placed order for {quantity} shares of {symbol}")
+    return {
+        'symbol': symbol,
+        'shares': quantity,
+        'amount': amount,
+        'price': price,
+        'order_id': order['id'],
+        'status': order['state']
+    }
+
+def reconcile_in_flight(journal, legs):
+    """Match legs left at intent to orders the broker actually accepted.
+
+    Records each match as submitted and returns {symbol: order id}.
+    """
+    in_flight = {symbol: leg for symbol, leg in legs.items() if leg['phase'] == INTENT}
+    if not in_flight:
+        return {}
+
+    since = min(parse_timestamp(leg['recorded_at']) for leg in in_flight.values())
+    matched = {}
+    for symbol, created_at, order_info in placed_orders(journal.side, since):
+        leg = in_flight.get(symbol)
+        if leg and symbol not in matched and created_at >= parse_timestamp(leg['recorded_at']) - RECONCILE_SKEW:
+            journal.submitted(symbol, order_info)
+            matched[symbol] = order_info['id']
+
+    logger.info(f"Reconciled {len(matched)} of {len(in_flight)} in-flight legs")
+    return matched
+
+def placed_orders(side, since):
+    """(symbol, created_at, order) for live broker orders on `side` created since `since`"""
+    since = since - RECONCILE_SKEW
+    found = []
+    for order_info in get_all_stock_orders(since.date().isoformat()) or []:
+        if not order_info or order_info.get('side') != side:
+            continue
+        if order_info.get('state') in DEAD_ORDER_STATES or not order_info.get('created_at'):
+            continue
+        created_at = parse_timestamp(order_info['created_at'])
+        if created_at >= since:
+            found.append((instrument_cache.symbol(order_info['instrument']), created_at, order_info))
+    return found
+
+def find_placed_order(side, symbol, since):
+    """The broker's live order for symbol created since `since`, or None"""
+    for order_symbol, _, order_info in placed_orders(side, since):
+        if order_symbol == symbol:
+            return order_info
+    return None
+
+def get_all_stock_orders(since=None):
+    """Every stock order on the account, created on or after `since` (YYYY-MM-DD) when given"""
+    if since:
+        try:
+            return read_policy.call('get_all_stock_orders', lambda: r.orders.get_all_stock_orders(start_date=since))
+        except TypeError:
+            # Older robin_stocks releases have no start_date filter
+            pass
+    return read_policy.call('get_all_stock_orders', r.orders.get_all_stock_orders)
+
+def announce_batch(journal, resume=False, on_event=None):
+    """Report the batch id before the first leg goes out, so a run that dies
+    midway can still be resumed with --resume"""
+    logger.info(f"{'Resuming' if resume else 'Starting'} {journal.side} batch {journal.batch_id}")
+    if on_event:
+        on_event({'event': 'batch', 'batch_id': journal.batch_id, 'side': journal.side, 'resume': resume})
+
+def completed_legs(journal):
+    """{symbol: order id} for every leg of a journaled batch that reached the broker"""
+    legs = journal.legs()
+    done = {symbol: leg['order_id'] for symbol, leg in legs.items() if leg['phase'] == SUBMITTED}
+    done.update(reconcile_in_flight(journal, legs))
+    return done
+
+@with_user_session
+@metrics.run('place_orders')
+def place_orders(total_amount, holdings, max_workers=None, rate_limit=None, on_event=None,
+                 batch_id=None, resume=False):
+    """Place multiple orders based on allocation weights.
+
+    With `on_event`, each placed or failed order is streamed as it happens
+    instead of being collected into the result. Every leg is journaled under
+    `batch_id`; with `resume`, legs that batch already submitted are skipped.
+    """
+    from allocation import allocate, holdings_frame
+
+    max_workers = max_workers or ORDER_MAX_WORKERS
+    rate_limit = rate_limit or ORDER_RATE_LIMIT
 
-def place_orders(total_amount, holdings):
-    """Place multiple orders based on allocation weights"""
     try:
         # Verify market hours
         if not check_market_hours():
@@ -71,97 +324,99 @@ def place_orders(total_amount, holdings):
         if not verify_authentication():
             raise Exception("Authentication required or has expired")
 
-        # Get account info to verify buying power
-        account = r.load_account_profile()
-        buying_power = float(account.get('buying_power', 0))
-        
-        if buying_power < total_amount:
-            raise Exception(f"Insufficient buying power. Available: ${buying_power}, Required: ${total_amount}")
+        journal = get_journal().batch(batch_id or new_batch_id(), 'buy')
+        announce_batch(journal, resume, on_event)
+        done = completed_legs(journal) if resume else {}
 
-        orders = []
-        total_allocated = 0
-        failed_orders = []
+        results = OrderResults(on_event)
 
         # Get all stock prices first to verify total investment
-        stock_prices = {}
-        for holding in holdings:
-            symbol = holding['Stock']
-            try:
-                price = float(r.stocks.get_latest_price(symbol)[0])
-                stock_prices[symbol] = price
-            except Exception as e:
-                logger.error(f"Error getting price for {symbol}: {str(e)}")
-                failed_orders.append({
-                    'symbol': symbol,
-                    'error': f"Failed to get current price: {str(e)}"
+        symbols = [holding['Stock'] for holding in holdings]
+        stock_prices, price_errors = quote_cache.get_many(symbols)
+        for symbol, error in price_errors.items():
+            logger.error(f"Error getting price for {symbol}: {error}")
+            results.add('failed', {
+                'symbol': symbol,
+                'error': f"Failed to get current price: {error}"
+            })
+
+        # Size every order in one vectorized pass
+        frame = holdings_frame(holdings)
+        frame = frame[frame['Stock'].isin(list(stock_prices))]
+        allocation, _ = allocate(total_amount, frame, stock_prices)
+        total_allocated = float(allocation['Amount'].sum())
+
+        legs = []
+        for row in allocation.itertuples(index=False):
+            if row.Stock in done:
+                results.add('skipped', {
+                    'symbol': row.Stock,
+                    'reason': 'Already submitted',
+                    'order_id': done[row.Stock]
                 })
+            elif row.Quantity > 0:
+                legs.append((row.Stock, float(row.Quantity), float(row.Amount), float(row.Price)))
 
-        # Place orders for each stock
-        for holding in holdings:
-            try:
-                symbol = holding['Stock']
-                if symbol not in stock_prices:
-                    continue
-
-                # Calculate allocation amount
-                allocation_percentage = float(holding['Stock Allocation Weight (%)'])
-                amount = (allocation_percentage / 100) * total_amount
-                total_allocated += amount
+        # Get account info to verify buying power for what is left to buy
+        required = total_amount if not done else sum(leg[2] for leg in legs)
+        account = read_policy.call('load_account_profile', r.load_account_profile)
+        buying_power = float(account.get('buying_power', 0))
 
-                price = stock_prices[symbol]
-                quantity = round(amount / price, 6)  # Round to 6 decimal places
-
-                if quantity > 0:
-                    # Place market order with retry logic
-                    retries = 3
-                    order = None
-                    for attempt in range(retries):
-                        try:
-                            order = r.orders.order_buy_fractional_by_quantity(
-                                symbol=symbol,
-                                quantity=quantity,
-                                timeInForce='gfd',
-                                extendedHours=False
-                            )
-                            break
-                        except Exception as e:
-                            if attempt == retries - 1:
-                                raise
-                            time.sleep(1 * (attempt + 1))
-
-                    if order:
-                        orders.append({
-                            'symbol': symbol,
-                            'shares': quantity,
-                            'amount': amount,
-                            'price': price,
-                            'order_id': order['id'],
-                            'status': order['state']
-                        })
-                        logger.info(f"Placed order for {quantity} shares of {symbol}")
-                        
-                        # Add random delay between 5-10 seconds before processing the next order
-                        delay_seconds = random.uniform(5, 10)
-                        logger.info(f"Waiting {delay_seconds:.2f} seconds before placing next order...")
-                        time.sleep(delay_seconds)
+        if buying_power < required:
+            raise Exception(f"Insufficient buying power. Available: ${buying_power}, Required: ${required}")
 
+        def run_leg(leg, bucket=None):
+            symbol, quantity, amount, price = leg
+            try:
+                if bucket:
+                    with metrics.span('rate_limit_wait'):
+                        bucket.acquire()
+                return submit_buy_order(symbol, quantity, amount, price, journal), None
             except Exception as e:
                 logger.error(f"Error placing order for {symbol}: {str(e)}")
-                failed_orders.append({
+                return None, {
                     'symbol': symbol,
                     'error': str(e),
-                    'allocation_amount': amount if 'amount' in locals() else None
-                })
+                    'allocation_amount': amount
+                }
+
+        def record(order, failure):
+            if order:
+                results.add('placed', order)
+            elif failure:
+                results.add('failed', failure)
+
+        if max_workers > 1:
+            # Submit on a bounded pool, paced by a token bucket instead of a fixed sleep
+            bucket = TokenBucket(rate_limit, burst=ORDER_BURST)
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                for order, failure in executor.map(metrics.bind(lambda leg: run_leg(leg, bucket)), legs):
+                    record(order, failure)
+        else:
+            for leg in legs:
+                order, failure = run_leg(leg)
+                record(order, failure)
+                if order:
+                    # Add random delay between 5-10 seconds before processing the next order
+                    delay_seconds = random.uniform(5, 10)
+                    logger.info(f"Waiting {delay_seconds:.2f} seconds before placing next order...")
+                    with metrics.span('order_pacing'):
+                        time.sleep(delay_seconds)
 
+        placed = results.counts['placed']
+        failed = results.counts['failed']
         return {
             'success': True,
-            'orders': orders,
-            'failed_orders': failed_orders,
+            'batch_id': journal.batch_id,
+            **results.lists('placed', 'failed', 'skipped'),
+            'orders_placed': placed,
+            'orders_failed': failed,
+            'orders_skipped': results.counts['skipped'],
             'total_amount': total_amount,
             'total_allocated': total_allocated,
             'timestamp': datetime.now().isoformat(),
-            'partial_success': len(failed_orders) > 0 and len(orders) > 0,
-            'all_failed': len(orders) == 0 and len(failed_orders) > 0
+            'partial_success': failed > 0 and placed > 0,
+            'all_failed': placed == 0 and failed > 0
         }
 
     except Exception as e:
@@ -173,8 +428,16 @@ def place_orders(total_amount, holdings):
             'timestamp': datetime.now().isoformat()
         }
 
-def sell_all_positions(holdings):
-    """Sell only the positions specified in holdings"""
+@with_user_session
+@metrics.run('sell_all_positions')
+def sell_all_positions(holdings, on_event=None, batch_id=None, resume=False):
+    """Sell only the positions specified in holdings.
+
+    With `on_event`, each sold, failed or skipped stock is streamed as it
+    happens instead of being collected into the result. Every leg is
+    journaled under `batch_id`; with `resume`, legs that batch already
+    submitted are skipped.
+    """
     try:
         if not check_market_hours():
             raise Exception("Orders can only be placed during market hours (9:00 AM - 2:30 PM CDT, Mon-Fri)")
@@ -186,26 +449,37 @@ def sell_all_positions(holdings):
         # Create a set of symbols from our holdings for quick lookup
         portfolio_symbols = {holding['Stock'] for holding in holdings}
 
-        # Get current positions to verify shares
-        positions = r.get_all_positions()
-        position_map = {
-            p['symbol']: float(p['quantity'])
-            for p in positions 
-            if float(p['quantity']) > 0 and p['symbol'] in portfolio_symbols  # Only include portfolio stocks
-        }
+        # Get current positions to verify shares, limited to portfolio stocks
+        position_map = PositionSnapshot.fetch().held(portfolio_symbols)
+
+        journal = get_journal().batch(batch_id or new_batch_id(), 'sell')
+        announce_batch(journal, resume, on_event)
+        done = completed_legs(journal) if resume else {}
 
-        orders = []
-        failed_orders = []
-        skipped_stocks = []
+        results = OrderResults(on_event)
+        total_value = 0
+
+        # One batched quote request up front for every position we will sell.
+        # The paced loop outlasts QUOTE_TTL, so the prices are kept here for
+        # the whole batch rather than looked up in the cache again.
+        sell_prices, _ = quote_cache.prefetch([symbol for symbol in position_map if symbol not in done])
 
         for holding in holdings:
             try:
                 symbol = holding['Stock']
-                
+
+                if symbol in done:
+                    results.add('skipped', {
+                        'symbol': symbol,
+                        'reason': 'Already submitted',
+                        'order_id': done[symbol]
+                    })
+                    continue
+
                 # Check if we have this position
                 if symbol not in position_map:
                     logger.warning(f"No position found for {symbol}")
-                    skipped_stocks.append({
+                    results.add('skipped', {
                         'symbol': symbol,
                         'reason': 'No position found'
                     })
@@ -214,28 +488,15 @@ def sell_all_positions(holdings):
                 quantity = position_map[symbol]
                 if quantity > 0:
                     # Place sell order with retry logic
-                    retries = 3
-                    order = None
-                    for attempt in range(retries):
-                        try:
-                            order = r.orders.order_sell_fractional_by_quantity(
-                                symbol=symbol,
-                                quantity=quantity,
-                                timeInForce='gfd',
-                                extendedHours=False
-                            )
-                            break
-                        except Exception as e:
-                            if attempt == retries - 1:
-                                raise
-                            time.sleep(1 * (attempt + 1))
+                    order = journaled_call(journal, symbol, quantity, r.orders.order_sell_fractional_by_quantity)
 
                     if order:
-                        # Get current price for value calculation
-                        current_price = float(r.stocks.get_latest_price(symbol)[0])
+                        # Price from the prefetch, for the value calculation
+                        current_price = sell_prices[symbol] if symbol in sell_prices else quote_cache.get(symbol)
                         estimated_value = quantity * current_price
 
-                        orders.append({
+                        total_value += estimated_value
+                        results.add('placed', {
                             'symbol': symbol,
                             'shares': quantity,
                             'estimated_value': estimated_value,
@@ -248,30 +509,30 @@ def sell_all_positions(holdings):
                         # Add random delay between 5-10 seconds before processing the next sell order
                         delay_seconds = random.uniform(5, 10)
                         logger.info(f"Waiting {delay_seconds:.2f} seconds before placing next sell order...")
-                        time.sleep(delay_seconds)
+                        with metrics.span('order_pacing'):
+                            time.sleep(delay_seconds)
 
             except Exception as e:
                 logger.error(f"Error selling {symbol}: {str(e)}")
-                failed_orders.append({
+                results.add('failed', {
                     'symbol': symbol,
                     'error': str(e),
                     'quantity': position_map.get(symbol, 0)
                 })
 
-        total_value = sum(order['estimated_value'] for order in orders)
-
+        sold = results.counts['placed']
+        failed = results.counts['failed']
         return {
             'success': True,
-            'orders': orders,
-            'failed_orders': failed_orders,
-            'skipped_stocks': skipped_stocks,
+            'batch_id': journal.batch_id,
+            **results.lists('placed', 'failed', 'skipped'),
             'timestamp': datetime.now().isoformat(),
             'total_estimated_value': total_value,
-            'stocks_sold': len(orders),
-            'stocks_failed': len(failed_orders),
-            'stocks_skipped': len(skipped_stocks),
-            'partial_success': len(failed_orders) > 0 and len(orders) > 0,
-            'all_failed': len(orders) == 0 and len(failed_orders) > 0
+            'stocks_sold': sold,
+            'stocks_failed': failed,
+            'stocks_skipped': results.counts['skipped'],
+            'partial_success': failed > 0 and sold > 0,
+            'all_failed': sold == 0 and failed > 0
         }
 
     except Exception as e:
@@ -283,6 +544,53 @@ def sell_all_positions(holdings):
             'timestamp': datetime.now().isoformat()
         }
 
+@with_user_session
+def position_drift(holdings, total_amount=None):
+    """Drift of the account's positions from the holdings' target weights"""
+    from allocation import holdings_frame
+
+    try:
+        if not verify_authentication():
+            raise Exception("Authentication required or has expired")
+
+        frame = holdings_frame(holdings)
+        snapshot = PositionSnapshot.fetch()
+        prices, price_errors = quote_cache.get_many(list(frame['Stock']))
+        records, total = drift_report(frame, snapshot, prices, total_amount)
+        return {
+            'success': True,
+            'holdings': records,
+            'total_amount': total,
+            'positions': len(snapshot),
+            'price_errors': price_errors,
+            'snapshot_at': snapshot.taken_at,
+            'timestamp': datetime.now().isoformat()
+        }
+
+    except Exception as e:
+        logger.error(f"Error in position_drift: {str(e)}")
+        return {
+            'success': False,
+            'error': str(e),
+            'error_type': 'authentication_error' if 'Authentication required' in str(e) else 'order_error',
+            'timestamp': datetime.now().isoformat()
+        }
+
+def order_status_payload(order_id, order_info):
+    """Shape a Robinhood order record into the status payload returned to Node"""
+    return {
+        'success': True,
+        'order_id': order_id,
+        'status': order_info.get('state', 'unknown'),
+        'created_at': order_info.get('created_at'),
+        'last_updated': order_info.get('updated_at'),
+        'side': order_info.get('side'),
+        'quantity': order_info.get('quantity'),
+        'symbol': order_info.get('symbol', {}).get('symbol'),
+        'timestamp': datetime.now().isoformat()
+    }
+
+@with_user_session
 def verify_order_status(order_id):
     """Verify the status of a specific order"""
     try:
@@ -291,7 +599,7 @@ def verify_order_status(order_id):
             raise Exception("Authentication required or has expired")
             
         # Get order information
-        order_info = r.orders.get_stock_order_info(order_id)
+        order_info = read_policy.call('get_stock_order_info', lambda: r.orders.get_stock_order_info(order_id))
         
         if not order_info:
             return {
@@ -300,20 +608,71 @@ def verify_order_status(order_id):
                 'timestamp': datetime.now().isoformat()
             }
             
+        return order_status_payload(order_id, order_info)
+        
+    except Exception as e:
+        logger.error(f"Error verifying order status for {order_id}: {str(e)}")
+        return {
+            'success': False,
+            'error': str(e),
+            'error_type': 'authentication_error' if 'Authentication required' in str(e) else 'order_error',
+            'timestamp': datetime.now().isoformat()
+        }
+
+# Above this many orders a single orders-list sweep is cheaper than one
+# request per order
+VERIFY_SWEEP_THRESHOLD = 5
+VERIFY_MAX_WORKERS = 4
+
+@with_user_session
+@metrics.run('verify_orders')
+def verify_orders(order_ids, since=None):
+    """Verify the status of many orders with one authentication check.
+
+    Large batches are resolved from one paginated get_all_stock_orders sweep
+    (optionally limited to orders created on or after `since`, YYYY-MM-DD);
+    anything the sweep misses, and small batches, are looked up individually
+    on a bounded thread pool.
+    """
+    try:
+        # Verify authentication once for the whole batch
+        if not verify_authentication():
+            raise Exception("Authentication required or has expired")
+
+        wanted = list(dict.fromkeys(order_ids))
+        statuses = {}
+
+        if len(wanted) > VERIFY_SWEEP_THRESHOLD:
+            all_orders = get_all_stock_orders(since)
+
+            wanted_set = set(wanted)
+            for order_info in all_orders or []:
+                if order_info and order_info.get('id') in wanted_set:
+                    statuses[order_info['id']] = order_status_payload(order_info['id'], order_info)
+
+        def lookup(order_id):
+            try:
+                order_info = read_policy.call('get_stock_order_info', lambda: r.orders.get_stock_order_info(order_id))
+                if not order_info:
+                    return order_id, {'success': False, 'error': f"Order {order_id} not found"}
+                return order_id, order_status_payload(order_id, order_info)
+            except Exception as e:
+                logger.error(f"Error verifying order status for {order_id}: {str(e)}")
+                return order_id, {'success': False, 'error': str(e), 'error_type': 'order_error'}
+
+        remaining = [order_id for order_id in wanted if order_id not in statuses]
+        if remaining:
+            with ThreadPoolExecutor(max_workers=min(VERIFY_MAX_WORKERS, len(remaining))) as executor:
+                statuses.update(executor.map(metrics.bind(lookup), remaining))
+
         return {
             'success': True,
-            'order_id': order_id,
-            'status': order_info.get('state', 'unknown'),
-            'created_at': order_info.get('created_at'),
-            'last_updated': order_info.get('updated_at'),
-            'side': order_info.get('side'),
-            'quantity': order_info.get('quantity'),
-            'symbol': order_info.get('symbol', {}).get('symbol'),
+            'orders': statuses,
             'timestamp': datetime.now().isoformat()
         }
-        
+
     except Exception as e:
-        logger.error(f"Error verifying order status for {order_id}: {str(e)}")
+        logger.error(f"Error verifying order statuses: {str(e)}")
         return {
             'success': False,
             'error': str(e),
@@ -322,29 +681,71 @@ def verify_order_status(order_id):
         }
 
 if __name__ == "__main__":
-    if len(sys.argv) < 3:
+    args = sys.argv[1:]
+
+    # Optional --user <email> selects the stored session to trade with
+    username = None
+    if '--user' in args:
+        index = args.index('--user')
+        username = args[index + 1] if index + 1 < len(args) else None
+        del args[index:index + 2]
+
+    # --stream prints one NDJSON event per order for place/sell, after a
+    # {"event": "batch", "batch_id": ...} record naming the batch to resume
+    # and before the result as a final {"event": "summary", ...} record
+    on_event = None
+    if '--stream' in args:
+        args.remove('--stream')
+        on_event = ndjson_writer()
+
+    # --batch <id> journals place/sell legs under a known id; --resume <id>
+    # continues that batch, skipping legs it already submitted
+    batch_id = None
+    resume = False
+    for flag in ('--batch', '--resume'):
+        if flag in args:
+            index = args.index(flag)
+            batch_id = args[index + 1] if index + 1 < len(args) else None
+            resume = resume or flag == '--resume'
+            del args[index:index + 2]
+
+    if len(args) < 2:
         result = {
             'success': False,
             'error': 'Invalid arguments'
         }
     else:
-        command = sys.argv[1]
+        command = args[0]
         
         if command == 'place':
-            amount = float(sys.argv[2])
-            holdings = json.loads(sys.argv[3])
-            result = place_orders(amount, holdings)
+            amount = float(args[1])
+            holdings = json.loads(args[2])
+            result = place_orders(amount, holdings, on_event=on_event, batch_id=batch_id, resume=resume,
+                                  username=username)
         elif command == 'sell':
-            holdings = json.loads(sys.argv[2])
-            result = sell_all_positions(holdings)
+            holdings = json.loads(args[1])
+            result = sell_all_positions(holdings, on_event=on_event, batch_id=batch_id, resume=resume,
+                                        username=username)
         elif command == 'verify':
-            order_id = sys.argv[2]
-            result = verify_order_status(order_id)
+            order_id = args[1]
+            result = verify_order_status(order_id, username=username)
+        elif command == 'verify-batch':
+            order_ids = json.loads(args[1])
+            result = verify_orders(order_ids, username=username)
+        elif command == 'drift':
+            holdings = json.loads(args[1])
+            result = position_drift(holdings, username=username)
+        elif command == 'logout':
+            session_manager.invalidate(args[1])
+            result = {'success': True}
         else:
             result = {
                 'success': False,
                 'error': f'Unknown command: {command}'
             }
     
-    print(json.dumps(result))
-    sys.exit(0 if result.get('success', False) else 1)
\ No newline at end of file
+    if on_event:
+        on_event({'event': 'summary', **result})
+    else:
+        print(json.dumps(result))
+    sys.exit(0 if result.get('success', False) else 1)
@@ -1,7 +1,8 @@
 import sys
 import json
-import pandas as pd
-from alpha_flex import get_portfolio
+from price_store import get_portfolio_fundamentals
+from allocation import holdings_records, SYMBOL_COLUMN, EXPORT_COLUMNS, WEIGHT_COLUMN
+import columnar
 import contextlib
 
 # Function to redirect stdout to stderr
@@ -14,37 +15,93 @@ def redirect_stdout_to_stderr():
     finally:
         sys.stdout = old_stdout
 
-try:
+def build_portfolio(portfolios=None):
+    """Build the portfolio holdings payload.
+
+    With `portfolios` (a list of registry names, or "all"), returns
+    {"portfolios": {name: payload}} built from one shared data load.
+    """
+    if portfolios is not None:
+        return build_portfolios(portfolios)
+
     # Fetch the portfolio data, redirecting any print statements to stderr
     with redirect_stdout_to_stderr():
-        portfolio_df = get_portfolio()
-
-        # Round the 'Stock Allocation Weight (%)' column to 0 decimal places
-        portfolio_df['Stock Allocation Weight (%)'] = portfolio_df['Stock Allocation Weight (%)'].round(0)
+        portfolio_df = get_portfolio_fundamentals()
 
-        # Prepare the data for JSON output
+        # Prepare the data for JSON output, with the 'Stock Allocation Weight (%)'
+        # column rounded to 0 decimal places
         portfolio_data = {
             "Portfolio Name": "AlphaFlex Growth",
-            "Holdings": []
+            "Holdings": holdings_records(portfolio_df, weight_decimals=0)
+        }
+
+    return portfolio_data
+
+def build_portfolios(portfolios):
+    """Holdings payloads for several registry portfolios, keyed by name"""
+    from portfolios import Universe, holdings_payload
+
+    with redirect_stdout_to_stderr():
+        universe = Universe(None if portfolios == 'all' else portfolios)
+        return {
+            "portfolios": {
+                name: holdings_payload(name, universe.holdings_frame(name))
+                for name in universe.portfolios
+            }
         }
 
-        # Loop through each row of the DataFrame and append the data to the 'Holdings' list
-        for _, row in portfolio_df.iterrows():
-            portfolio_data["Holdings"].append({
-                "Stock": row["Stock"],
-                "Market Cap": float(row["Market Cap"]),
-                "Revenue": float(row["Revenue"]),
-                "Volatility": float(row["Volatility"]),
-                "Stock Allocation Weight (%)": float(row["Stock Allocation Weight (%)"])
-            })
+def holdings_columns(portfolio_df):
+    """Holdings columns straight from the DataFrame, weights rounded like the JSON payload"""
+    columns = {SYMBOL_COLUMN: portfolio_df[SYMBOL_COLUMN].astype(str).to_numpy()}
+    for column in EXPORT_COLUMNS:
+        values = portfolio_df[column].astype(float)
+        columns[column] = (values.round(0) if column == WEIGHT_COLUMN else values).to_numpy()
+    return columns
+
+def portfolio_frame(portfolio_df):
+    """Encode the holdings payload as a columnar frame"""
+    return columnar.encode(
+        'holdings',
+        meta={"Portfolio Name": "AlphaFlex Growth"},
+        tables={"Holdings": ('records', holdings_columns(portfolio_df))}
+    )
+
+def build_portfolio_frame(portfolios=None):
+    """The portfolio holdings payload as a columnar frame; with `portfolios`,
+    one Holdings table per registry portfolio"""
+    if portfolios is None:
+        with redirect_stdout_to_stderr():
+            portfolio_df = get_portfolio_fundamentals()
+        return portfolio_frame(portfolio_df)
+
+    from portfolios import Universe
+
+    with redirect_stdout_to_stderr():
+        universe = Universe(None if portfolios == 'all' else portfolios)
+        frames = {name: universe.holdings_frame(name) for name in universe.portfolios}
+
+    return columnar.encode(
+        'holdings',
+        meta={"portfolios": {name: {"Portfolio Name": name} for name in frames}},
+        tables={
+            f"portfolios.{name}.Holdings": ('records', holdings_columns(portfolio_df))
+            for name, portfolio_df in frames.items()
+        }
+    )
+
+if __name__ == "__main__":
+    try:
+        if sys.argv[1:] == ['--format', columnar.FORMAT_NAME]:
+            sys.stdout.buffer.write(build_portfolio_frame())
+            sys.exit(0)
+
+        portfolio_data = build_portfolio()
 
         # Output only the JSON string to stdout
         json_output = json.dumps(portfolio_data, allow_nan=False)
-    
-    # Print the JSON outside the redirect context
-    print(json_output)
-
-except Exception as e:
-    # Print error messages to stderr
-    print(f"Error: {str(e)}", file=sys.stderr)
-    sys.exit(1)
\ No newline at end of file
+        print(json_output)
+
+    except Exception as e:
+        # Print error messages to stderr
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
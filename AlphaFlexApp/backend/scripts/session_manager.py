@@ -0,0 +1,183 @@
+# session_manager.py
+#
+# Keeps one authenticated robin_stocks session per user instead of logging in
+# and out around every operation. Sessions are persisted to a per-user pickle
+# under ~/.tokens so a later process (or the long-lived worker) can restore
+# them without a password/MFA round-trip, and are refreshed with the stored
+# refresh token before the access token's expiresIn window runs out.
+#
+# robin_stocks keeps a single global HTTP session, so only one user's session
+# can be active at a time; session() holds a lock for the duration of the
+# caller's broker calls.
+
+import contextlib
+import hashlib
+import logging
+import os
+import pickle
+import threading
+import time
+from pathlib import Path
+
+from lazy_import import lazy_module
+
+r = lazy_module('robin_stocks.robinhood')
+
+logger = logging.getLogger(__name__)
+
+TOKEN_DIR = Path.home() / '.tokens'
+SESSION_EXPIRES_IN = 3600  # seconds, matches the login expiresIn
+REFRESH_MARGIN = 5 * 60  # refresh this long before expiry
+VALIDATION_INTERVAL = 5 * 60  # re-check the account profile at most this often
+CLIENT_ID = 'c82SH0WZOsabOXGP2sxqcj34FxkvfnWRZBKlBjFS'  # robin_stocks' public OAuth client id
+
+class SessionManager:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._sessions = {}  # username -> {'expires_at', 'validated_at'}
+        self._active = None
+
+    def pickle_name(self, username):
+        """Per-user pickle name, hashed so emails don't end up in filenames"""
+        return hashlib.sha256(username.lower().encode('utf-8')).hexdigest()[:16]
+
+    def pickle_path(self, username):
+        return TOKEN_DIR / f"robinhood{self.pickle_name(username)}.pickle"
+
+    def login(self, username, password, **kwargs):
+        """Full login (may prompt for MFA); the session is stored for reuse"""
+        with self._lock:
+            result = r.login(
+                username=username,
+                password=password,
+                expiresIn=SESSION_EXPIRES_IN,
+                scope='internal',
+                by_sms=True,
+                store_session=True,
+                pickle_name=self.pickle_name(username),
+                **kwargs
+            )
+            now = time.time()
+            self._sessions[username] = {
+                'expires_at': now + SESSION_EXPIRES_IN,
+                'validated_at': now
+            }
+            self._active = username
+            return result
+
+    def _restore(self, username):
+        """Load a stored session from disk without credentials"""
+        from robin_stocks.robinhood.helper import update_session, set_login_state
+
+        path = self.pickle_path(username)
+        if not path.exists():
+            raise Exception("Authentication required or has expired")
+
+        # Install the stored token directly; r.login would fall back to an
+        # interactive password prompt if the token turned out to be stale
+        with open(path, 'rb') as f:
+            stored = pickle.load(f)
+        update_session('Authorization', f"{stored['token_type']} {stored['access_token']}")
+        set_login_state(True)
+        self._active = username
+
+        self._sessions[username] = {
+            'expires_at': path.stat().st_mtime + SESSION_EXPIRES_IN,
+            'validated_at': 0
+        }
+
+    def _refresh(self, username):
+        """Exchange the stored refresh token for a new access token"""
+        from robin_stocks.robinhood.helper import request_post, update_session, set_login_state
+        from robin_stocks.robinhood.urls import login_url
+
+        path = self.pickle_path(username)
+        with open(path, 'rb') as f:
+            stored = pickle.load(f)
+
+        data = request_post(login_url(), {
+            'grant_type': 'refresh_token',
+            'refresh_token': stored['refresh_token'],
+            'scope': 'internal',
+            'client_id': CLIENT_ID,
+            'expires_in': SESSION_EXPIRES_IN,
+            'device_token': stored.get('device_token')
+        })
+        if not data or 'access_token' not in data:
+            raise Exception("Authentication required or has expired")
+
+        token = f"{data['token_type']} {data['access_token']}"
+        update_session('Authorization', token)
+        set_login_state(True)
+
+        stored.update({
+            'token_type': data['token_type'],
+            'access_token': data['access_token'],
+            'refresh_token': data.get('refresh_token', stored['refresh_token'])
+        })
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(stored, f)
+        os.replace(tmp_path, path)
+
+        now = time.time()
+        self._sessions[username] = {
+            'expires_at': now + SESSION_EXPIRES_IN,
+            'validated_at': now
+        }
+        self._active = username
+        logger.info("Refreshed Robinhood session")
+
+    def ensure(self, username):
+        """Make username's session the active, unexpired robin_stocks session"""
+        with self._lock:
+            state = self._sessions.get(username)
+            if self._active != username or state is None:
+                self._restore(username)
+                state = self._sessions[username]
+
+            if time.time() >= state['expires_at'] - REFRESH_MARGIN:
+                try:
+                    self._refresh(username)
+                except Exception as e:
+                    logger.warning(f"Session refresh failed: {str(e)}")
+                    self.invalidate(username)
+                    raise Exception("Authentication required or has expired")
+
+    def is_validated(self):
+        """True if the active session was validated against the API recently"""
+        state = self._sessions.get(self._active) if self._active else None
+        return bool(state) and time.time() - state['validated_at'] < VALIDATION_INTERVAL
+
+    def mark_validated(self):
+        if self._active in self._sessions:
+            self._sessions[self._active]['validated_at'] = time.time()
+
+    @contextlib.contextmanager
+    def session(self, username):
+        """Hold username's session active for the duration of the block"""
+        with self._lock:
+            self.ensure(username)
+            yield
+
+    def invalidate(self, username):
+        """Log out and forget a user's stored session"""
+        with self._lock:
+            if self._active == username:
+                try:
+                    r.logout()
+                except Exception:
+                    pass
+                self._active = None
+            self._sessions.pop(username, None)
+
+            path = self.pickle_path(username)
+            try:
+                if path.exists():
+                    os.remove(path)
+                    logger.info("Removed stored session")
+            except Exception as e:
+                logger.warning(f"Error removing stored session: {e}")
+
+# Shared session manager instance
+session_manager = SessionManager()
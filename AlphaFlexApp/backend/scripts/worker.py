@@ -0,0 +1,166 @@
+# worker.py
+#
+# Long-lived Python worker for the Node backend. Reads one JSON-RPC request per
+# line on stdin and writes one JSON response per line on stdout:
+#
+#   -> {"id": 1, "method": "get_portfolio", "params": {}}
+#   <- {"id": 1, "result": {...}}
+#   <- {"id": 2, "error": "..."}
+#
+# Methods in STREAMING also accept "stream": true on the request; each order
+# event is then sent as it happens, ahead of the final result:
+#
+#   -> {"id": 3, "method": "place_orders", "params": {...}, "stream": true}
+#   <- {"id": 3, "progress": {"event": "placed", "symbol": "NVDA", ...}}
+#   <- {"id": 3, "result": {...}}
+#
+# Methods in FRAMES also accept "format": "columnar" and answer with a compact
+# binary frame (see columnar.py) instead of a JSON result: a header line giving
+# the frame's size, then exactly that many raw bytes.
+#
+#   -> {"id": 4, "method": "get_portfolio", "params": {}, "format": "columnar"}
+#   <- {"id": 4, "frame": 1432}
+#   <- <1432 bytes>
+#
+# Heavy imports (pandas, robin_stocks, alpha_flex) are paid once at startup
+# and the robin_stocks session stays alive between calls. Market-data calls and
+# broker calls run on separate single-threaded lanes so a slow backtest never
+# blocks order status checks. Methods on the 'inline' lane are in-memory
+# lookups answered straight from the reader thread, ahead of anything queued.
+
+import sys
+import json
+import logging
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+# Keep a handle on the real stdout for protocol messages; anything else that
+# prints (alpha_flex, yfinance) goes to stderr
+PROTOCOL_OUT = sys.stdout
+sys.stdout = sys.stderr
+
+logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+logger = logging.getLogger(__name__)
+
+import columnar
+import server
+import performance
+import analytics
+import robinhood_order
+import rebalance
+from positions import instrument_cache
+import market_calendar
+from metrics import metrics
+from session_manager import session_manager
+
+METHODS = {
+    'ping': ('data', lambda: {'success': True}),
+    'get_portfolio': ('data', server.build_portfolio),
+    'get_all_performance': ('data', performance.compute_all_performance),
+    'get_analytics': ('data', analytics.compute_all_analytics),
+    'market_status': ('inline', market_calendar.status),
+    'place_orders': ('broker', robinhood_order.place_orders),
+    'sell_all_positions': ('broker', robinhood_order.sell_all_positions),
+    'verify_order_status': ('broker', robinhood_order.verify_order_status),
+    'verify_orders': ('broker', robinhood_order.verify_orders),
+    'position_drift': ('broker', robinhood_order.position_drift),
+    'quote_cache_stats': ('data', robinhood_order.quote_cache.stats),
+    'instrument_cache_stats': ('data', instrument_cache.stats),
+    'metrics_summary': ('data', metrics.summary),
+    'rebalance_accounts': ('broker', rebalance.rebalance_accounts),
+    'invalidate_session': ('broker', session_manager.invalidate),
+}
+
+# Methods that take an on_event callback for per-order progress
+STREAMING = {'place_orders', 'sell_all_positions'}
+
+# Broker methods that run inside the caller's stored session. The worker
+# serves every user, so these must name one: without a username they would
+# run in whichever session another user's call left active.
+USER_SESSION = {'place_orders', 'sell_all_positions', 'verify_order_status', 'verify_orders', 'position_drift'}
+
+# Methods that can answer with a columnar frame, and the function producing it
+FRAMES = {
+    'get_portfolio': server.build_portfolio_frame,
+    'get_analytics': analytics.analytics_frame,
+}
+
+_write_lock = threading.Lock()
+_lanes = {
+    'data': ThreadPoolExecutor(max_workers=1, thread_name_prefix='data'),
+    'broker': ThreadPoolExecutor(max_workers=1, thread_name_prefix='broker'),
+}
+
+def send(message):
+    """Write one response line to the protocol stream"""
+    line = json.dumps(message, allow_nan=False)
+    with _write_lock:
+        PROTOCOL_OUT.write(line + '\n')
+        PROTOCOL_OUT.flush()
+
+def send_frame(request_id, frame):
+    """Write a frame header line followed by the frame bytes"""
+    line = json.dumps({'id': request_id, 'frame': len(frame)})
+    with _write_lock:
+        PROTOCOL_OUT.write(line + '\n')
+        PROTOCOL_OUT.flush()
+        PROTOCOL_OUT.buffer.write(frame)
+        PROTOCOL_OUT.buffer.flush()
+
+def handle(request_id, method, params, stream=False, output_format=None):
+    """Run one method and send its result or error"""
+    try:
+        _, func = METHODS[method]
+        if output_format == columnar.FORMAT_NAME and method in FRAMES:
+            send_frame(request_id, FRAMES[method](**params))
+            return
+        if stream and method in STREAMING:
+            params = dict(params, on_event=lambda event: send({'id': request_id, 'progress': event}))
+        if isinstance(params, dict):
+            result = func(**params)
+        else:
+            result = func(*params)
+        send({'id': request_id, 'result': result})
+    except Exception as e:
+        logger.error(f"Worker error in {method}: {str(e)}\n{traceback.format_exc()}")
+        send({'id': request_id, 'error': str(e)})
+
+def dispatch(line):
+    """Parse a request line and queue it on the method's lane"""
+    try:
+        request = json.loads(line)
+    except ValueError as e:
+        send({'id': None, 'error': f'Invalid request: {str(e)}'})
+        return
+
+    request_id = request.get('id')
+    method = request.get('method')
+    params = request.get('params') or {}
+
+    if method not in METHODS:
+        send({'id': request_id, 'error': f'Unknown method: {method}'})
+        return
+
+    if method in USER_SESSION and not (isinstance(params, dict) and params.get('username')):
+        send({'id': request_id, 'error': f'{method} requires a username'})
+        return
+
+    lane, _ = METHODS[method]
+    if lane == 'inline':
+        handle(request_id, method, params)
+        return
+    _lanes[lane].submit(handle, request_id, method, params, bool(request.get('stream')), request.get('format'))
+
+def main():
+    send({'id': None, 'event': 'ready', 'methods': sorted(METHODS)})
+    for line in sys.stdin:
+        line = line.strip()
+        if line:
+            dispatch(line)
+
+    for lane in _lanes.values():
+        lane.shutdown(wait=True)
+
+if __name__ == "__main__":
+    main()
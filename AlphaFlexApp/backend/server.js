@@ -3,10 +3,11 @@ const nodemailer = require("nodemailer");
 const cors = require("cors");
 const bodyParser = require("body-parser");
 const { body, validationResult } = require("express-validator");
-const { exec } = require("child_process");
-const path = require("path");
 const session = require('express-session');
 const storageManager = require('./storage-manager');
+const pythonWorker = require('./python-worker');
+const { StaleWhileRevalidateCache } = require('./swr-cache');
+const { toResult } = require('./columnar');
 require('dotenv').config();
 
 const app = express();
@@ -110,39 +111,65 @@ app.post("/verify-code", async (req, res) => {
   }
 });
 
-// Route to get portfolio data
-app.get("/portfolio", async (req, res) => {
-  try {
-    // Check cached portfolio data first
-    const portfolioData = await storageManager.getPortfolio();
-    const now = new Date();
-    
-    if (!portfolioData || !portfolioData.lastUpdated || 
-        (now - new Date(portfolioData.lastUpdated)) > 24 * 60 * 60 * 1000) {
-      
-      // Fetch new data from Python script
-      const scriptPath = path.join(__dirname, 'scripts', 'server.py');
-      const { stdout, stderr } = await exec(`python3 ${scriptPath}`);
+// PYTHON_BRIDGE_FORMAT=columnar has the worker send holdings and analytics
+// series as binary column frames instead of row-per-object JSON
+const bridgeFormat = process.env.PYTHON_BRIDGE_FORMAT || 'json';
 
-      if (stderr) {
-        console.error("Python debug output:", stderr);
-      }
+const callTabular = async (method, params = {}) => (
+  bridgeFormat === 'columnar'
+    ? toResult(await pythonWorker.frame(method, params))
+    : pythonWorker.call(method, params)
+);
 
-      const jsonStart = stdout.indexOf('{');
-      const jsonEnd = stdout.lastIndexOf('}');
-      
-      if (jsonStart === -1 || jsonEnd === -1) {
-        throw new Error("No valid JSON found in Python output");
-      }
+// Portfolio and performance caches serve stale data immediately and refresh
+// in the background through the Python worker
+const portfolioCache = new StaleWhileRevalidateCache({
+  name: 'portfolio',
+  load: () => storageManager.getPortfolioEntry(),
+  save: (data) => storageManager.updatePortfolio(data),
+  refresh: () => callTabular('get_portfolio')
+});
 
-      const jsonStr = stdout.substring(jsonStart, jsonEnd + 1);
-      const newPortfolioData = JSON.parse(jsonStr);
-      
-      // Cache the new data
-      await storageManager.updatePortfolio(newPortfolioData);
-      return res.json(newPortfolioData);
+// PERFORMANCE_REFRESH_MINUTES turns on intraday performance refreshes, which
+// the worker serves incrementally from its stored horizon state
+const performanceRefreshMinutes = Number(process.env.PERFORMANCE_REFRESH_MINUTES || 0);
+
+const performanceCache = new StaleWhileRevalidateCache({
+  name: 'performance',
+  load: () => storageManager.getPerformanceEntry(),
+  save: (data) => storageManager.updatePerformance(data),
+  refresh: () => pythonWorker.call('get_all_performance', { incremental: performanceRefreshMinutes > 0 }),
+  ...(performanceRefreshMinutes > 0 && { maxAge: performanceRefreshMinutes * 60 * 1000 })
+});
+
+// Every registry portfolio (scripts/portfolios.py) in one worker call, so
+// they share a single price and fundamentals load. Kept in memory only.
+const memoryEntry = () => {
+  let entry = null;
+  return {
+    load: async () => entry,
+    save: async (value) => {
+      entry = { value, lastUpdated: new Date().toISOString() };
     }
-    
+  };
+};
+
+const allPortfoliosCache = new StaleWhileRevalidateCache({
+  name: 'portfolios',
+  ...memoryEntry(),
+  refresh: () => callTabular('get_portfolio', { portfolios: 'all' })
+});
+
+const allPerformanceCache = new StaleWhileRevalidateCache({
+  name: 'portfolio performance',
+  ...memoryEntry(),
+  refresh: () => pythonWorker.call('get_all_performance', { portfolios: 'all' })
+});
+
+// Route to get portfolio data
+app.get("/portfolio", async (req, res) => {
+  try {
+    const portfolioData = await portfolioCache.get();
     return res.json(portfolioData);
   } catch (error) {
     console.error("Error in portfolio route:", error);
@@ -153,40 +180,47 @@ app.get("/portfolio", async (req, res) => {
 // Route to get performance data
 app.get("/performance", async (req, res) => {
   try {
-    // Check cached performance data first
-    const performanceData = await storageManager.getPerformance();
-    const now = new Date();
-    
-    if (!performanceData || !performanceData.lastUpdated || 
-        (now - new Date(performanceData.lastUpdated)) > 24 * 60 * 60 * 1000) {
-      
-      // Fetch new data from Python script
-      const scriptPath = path.join(__dirname, 'scripts', 'performance.py');
-      const { stdout, stderr } = await exec(`python3 ${scriptPath}`);
+    const performanceData = await performanceCache.get();
+    return res.json(performanceData);
+  } catch (error) {
+    console.error("Error in performance route:", error);
+    return res.status(500).json({ error: "Failed to fetch performance data" });
+  }
+});
 
-      if (stderr) {
-        console.error("Python debug output:", stderr);
-      }
+// Routes to get holdings and performance of every registry portfolio, keyed by name
+app.get("/portfolios", async (req, res) => {
+  try {
+    const data = await allPortfoliosCache.get();
+    return res.json(data.portfolios);
+  } catch (error) {
+    console.error("Error in portfolios route:", error);
+    return res.status(500).json({ error: "Failed to fetch portfolios" });
+  }
+});
 
-      const jsonStart = stdout.indexOf('{');
-      const jsonEnd = stdout.lastIndexOf('}');
-      
-      if (jsonStart === -1 || jsonEnd === -1) {
-        throw new Error("No valid JSON found in Python output");
-      }
+app.get("/portfolios/performance", async (req, res) => {
+  try {
+    const data = await allPerformanceCache.get();
+    return res.json(data.portfolios);
+  } catch (error) {
+    console.error("Error in portfolios performance route:", error);
+    return res.status(500).json({ error: "Failed to fetch portfolio performance" });
+  }
+});
 
-      const jsonStr = stdout.substring(jsonStart, jsonEnd + 1);
-      const newPerformanceData = JSON.parse(jsonStr);
-      
-      // Cache the new data
-      await storageManager.updatePerformance(newPerformanceData);
-      return res.json(newPerformanceData);
+// Route to get extended analytics (3Y return, volatility, drawdown, Sharpe,
+// Sortino, per-holding contribution), computed from the local price store
+app.get("/performance/analytics", async (req, res) => {
+  try {
+    const result = await callTabular('get_analytics');
+    if (!result.success) {
+      throw new Error(result.error);
     }
-    
-    return res.json(performanceData);
+    return res.json(result.analytics);
   } catch (error) {
-    console.error("Error in performance route:", error);
-    return res.status(500).json({ error: "Failed to fetch performance data" });
+    console.error("Error in analytics route:", error);
+    return res.status(500).json({ error: "Failed to fetch analytics" });
   }
 });
 
@@ -237,4 +271,15 @@ app.use((err, req, res, next) => {
 // Start the server
 app.listen(PORT, () => {
   console.log(`Server is running on port ${PORT}`);
+
+  // Warm up the Python worker so the first request doesn't pay import costs
+  pythonWorker.start().catch((error) => {
+    console.error("Failed to start Python worker:", error);
+  });
+
+  // Pre-warm the caches every weekday before market open (8:00 AM CT)
+  portfolioCache.schedulePrewarm(8, 0);
+  performanceCache.schedulePrewarm(8, 0);
+  allPortfoliosCache.schedulePrewarm(8, 0);
+  allPerformanceCache.schedulePrewarm(8, 0);
 });
\ No newline at end of file
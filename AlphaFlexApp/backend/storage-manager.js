@@ -30,6 +30,10 @@ class StorageManager {
     // Add new file paths
     this.ORDERS_FILE = path.join(DATA_DIR, 'orders.json');
     this.SESSIONS_FILE = path.join(DATA_DIR, 'sessions.json');
+
+    // Streamed order events are applied one at a time so concurrent
+    // read-modify-write cycles on orders.json can't drop an update
+    this.orderEventQueue = Promise.resolve();
     
     console.log('Storage Manager initialized successfully');
     this.initializeStorage();
@@ -98,7 +102,12 @@ class StorageManager {
   async writeEncryptedFile(filePath, data) {
     try {
       const encryptedData = this.encrypt(JSON.stringify(data));
-      await fs.writeFile(filePath, encryptedData);
+
+      // Write to a temporary file and rename it into place so concurrent
+      // readers never see a half-written file
+      const tmpPath = `${filePath}.${process.pid}.${crypto.randomBytes(4).toString('hex')}.tmp`;
+      await fs.writeFile(tmpPath, encryptedData);
+      await fs.rename(tmpPath, filePath);
     } catch (error) {
       console.error(`Error writing to ${path.basename(filePath)}:`, error);
       throw error;
@@ -158,6 +167,16 @@ class StorageManager {
     }
   }
 
+  async getPortfolioEntry() {
+    try {
+      const data = await this.readEncryptedFile(PORTFOLIO_FILE);
+      return data.portfolio ? { value: data.portfolio, lastUpdated: data.lastUpdated } : null;
+    } catch (error) {
+      console.error('Error fetching portfolio:', error);
+      return null;
+    }
+  }
+
   // Performance methods
   async updatePerformance(performanceData) {
     try {
@@ -183,6 +202,16 @@ class StorageManager {
     }
   }
 
+  async getPerformanceEntry() {
+    try {
+      const data = await this.readEncryptedFile(PERFORMANCE_FILE);
+      return data.performance ? { value: data.performance, lastUpdated: data.lastUpdated } : null;
+    } catch (error) {
+      console.error('Error fetching performance:', error);
+      return null;
+    }
+  }
+
   // Order management methods
   async saveOrder(email, orderData) {
     try {
@@ -257,6 +286,46 @@ class StorageManager {
     }
   }
 
+  recordOrderEvent(email, orderId, event) {
+    const apply = () => this.applyOrderEvent(email, orderId, event);
+    const next = this.orderEventQueue.then(apply, apply);
+    this.orderEventQueue = next.catch(() => {});
+    return next;
+  }
+
+  async applyOrderEvent(email, orderId, event) {
+    try {
+      const data = await this.readEncryptedFile(this.ORDERS_FILE);
+      const order = (data.orders[email] || []).find(o => o.orderId === orderId);
+      if (!order) {
+        throw new Error('Order not found');
+      }
+
+      const { event: type, ...details } = event;
+      if (type === 'batch') {
+        // Sent before the first leg: the journal batch a resume picks up
+        order.batchId = details.batch_id;
+      } else if (type === 'summary') {
+        // The summary carries counts and totals; the legs were recorded as they streamed in
+        order.status = details.success ? 'completed' : 'failed';
+        order.summary = details;
+      } else {
+        order.status = 'in_progress';
+        order.legs = order.legs || [];
+        order.legs.push({ type, ...details, recordedAt: new Date().toISOString() });
+        order.progress = order.progress || { placed: 0, failed: 0, skipped: 0 };
+        order.progress[type] = (order.progress[type] || 0) + 1;
+      }
+      order.lastUpdated = new Date().toISOString();
+
+      await this.writeEncryptedFile(this.ORDERS_FILE, data);
+      return order;
+    } catch (error) {
+      console.error('Error recording order event:', error);
+      throw error;
+    }
+  }
+
   // Session management
   async saveSession(email, sessionData) {
     try {
@@ -0,0 +1,115 @@
+// Stale-while-revalidate cache for data computed by the Python worker.
+//
+// get() answers from the stored value right away, even if it has expired, and
+// starts at most one background refresh per cache. Only an empty cache makes
+// the caller wait for the refresh.
+
+const DEFAULT_MAX_AGE = 24 * 60 * 60 * 1000; // 24 hours
+const PREWARM_CHECK_INTERVAL = 5 * 60 * 1000; // 5 minutes
+
+// Current wall-clock time in Chicago as { day, hour, minute, date }
+const chicagoNow = () => {
+  const parts = new Intl.DateTimeFormat('en-US', {
+    timeZone: 'America/Chicago',
+    weekday: 'short',
+    year: 'numeric',
+    month: '2-digit',
+    day: '2-digit',
+    hour: '2-digit',
+    minute: '2-digit',
+    hourCycle: 'h23'
+  }).formatToParts(new Date());
+  const get = (type) => parts.find(part => part.type === type).value;
+
+  return {
+    day: get('weekday'),
+    hour: parseInt(get('hour'), 10),
+    minute: parseInt(get('minute'), 10),
+    date: `${get('year')}-${get('month')}-${get('day')}`
+  };
+};
+
+class StaleWhileRevalidateCache {
+  constructor({ name, load, save, refresh, maxAge = DEFAULT_MAX_AGE }) {
+    this.name = name;
+    this.load = load; // async () => ({ value, lastUpdated }) or null
+    this.save = save; // async (value) => void
+    this.refresh = refresh; // async () => fresh value
+    this.maxAge = maxAge;
+    this.inflight = null;
+    this.prewarmTimer = null;
+    this.lastPrewarm = null;
+  }
+
+  isStale(entry) {
+    return !entry || !entry.lastUpdated ||
+      (Date.now() - new Date(entry.lastUpdated).getTime()) > this.maxAge;
+  }
+
+  async get() {
+    const entry = await this.load();
+
+    if (!entry) {
+      // Nothing to serve yet, so wait for the first fill
+      return this.revalidate();
+    }
+
+    if (this.isStale(entry)) {
+      this.revalidate().catch((error) => {
+        console.error(`Background refresh of ${this.name} failed:`, error);
+      });
+    }
+
+    return entry.value;
+  }
+
+  revalidate() {
+    // Deduplicate: every caller shares the refresh already in progress
+    if (!this.inflight) {
+      console.log(`Refreshing ${this.name} cache`);
+      this.inflight = (async () => {
+        try {
+          const value = await this.refresh();
+          await this.save(value);
+          return value;
+        } finally {
+          this.inflight = null;
+        }
+      })();
+    }
+    return this.inflight;
+  }
+
+  // Refresh once each weekday at the given Chicago time, ahead of market open
+  schedulePrewarm(hour = 8, minute = 0) {
+    if (this.prewarmTimer) {
+      return;
+    }
+
+    const check = () => {
+      const now = chicagoNow();
+      const isWeekday = !['Sat', 'Sun'].includes(now.day);
+      const minutes = now.hour * 60 + now.minute;
+      const target = hour * 60 + minute;
+
+      if (isWeekday && minutes >= target && minutes < target + 60 && this.lastPrewarm !== now.date) {
+        this.lastPrewarm = now.date;
+        this.revalidate().catch((error) => {
+          console.error(`Pre-warming ${this.name} failed:`, error);
+        });
+      }
+    };
+
+    this.prewarmTimer = setInterval(check, PREWARM_CHECK_INTERVAL);
+    check();
+  }
+
+  stopPrewarm() {
+    if (this.prewarmTimer) {
+      clearInterval(this.prewarmTimer);
+      this.prewarmTimer = null;
+    }
+  }
+}
+
+module.exports = { StaleWhileRevalidateCache };
@@ -0,0 +1,120 @@
+const path = require('path');
+
+// setup.js mocks child_process for the route tests; these run real interpreters
+const { spawnSync } = jest.requireActual('child_process');
+
+describe('Order Sizing', () => {
+  const backendDir = path.join(__dirname, '..');
+
+  // Run a snippet against scripts/allocation.py with the synthetic portfolio
+  // from benchmarks/fakes, next to the per-symbol loop it replaced, and parse
+  // what it prints
+  const run = (lines) => {
+    const code = [
+      'import json',
+      'import numpy as np',
+      'import fake_market',
+      'from allocation import *',
+      'symbols = fake_market.tickers(17)',
+      'weights = fake_market.weights(17)',
+      'prices = {symbol: fake_market.latest_price(symbol) for symbol in symbols}',
+      'holdings = [{"Stock": s, "Stock Allocation Weight (%)": float(w)} for s, w in zip(symbols, weights)]',
+      'def legacy_legs(total_amount, holdings, stock_prices):',
+      '    legs = {}',
+      '    for holding in holdings:',
+      '        symbol = holding["Stock"]',
+      '        if symbol not in stock_prices:',
+      '            continue',
+      '        amount = (float(holding["Stock Allocation Weight (%)"]) / 100) * total_amount',
+      '        price = stock_prices[symbol]',
+      '        quantity = round(amount / price, 6)',
+      '        if quantity > 0:',
+      '            legs[symbol] = (quantity, amount, price)',
+      '    return legs',
+      'def legs_of(allocation):',
+      '    return {row.Stock: (float(row.Quantity), float(row.Amount), float(row.Price)) for row in allocation.itertuples(index=False) if row.Quantity > 0}',
+      'def gap(legs, expected):',
+      '    if sorted(legs) != sorted(expected):',
+      '        return None',
+      '    return float(max((abs(a - b) for s in legs for a, b in zip(legs[s], expected[s])), default=0.0))',
+      ...lines
+    ].join('\n');
+    const result = spawnSync('python3', ['-c', code], {
+      encoding: 'utf8',
+      env: {
+        ...process.env,
+        PYTHONPATH: [path.join(backendDir, 'benchmarks', 'fakes'), path.join(backendDir, 'scripts')].join(path.delimiter)
+      }
+    });
+    return JSON.parse(result.stdout);
+  };
+
+  test('should size one account exactly like the per-symbol loop', () => {
+    expect(run([
+      'allocation, residual = allocate(10000, holdings_frame(holdings), prices)',
+      'legs = legs_of(allocation)',
+      'spent = sum(quantity * price for quantity, _, price in legs.values())',
+      'print(json.dumps([len(legs), gap(legs, legacy_legs(10000, holdings, prices)) < 1e-9,',
+      '                  abs(residual - (10000 - spent)) < 1e-9, abs(float(allocation["Amount"].sum()) - 10000) < 1e-6]))'
+    ])).toEqual([17, true, true, true]);
+  });
+
+  test('should size many accounts in one pass like one loop per account', () => {
+    expect(run([
+      'amounts = np.array([250.0, 1000.0, 1234.56, 50000.0])',
+      'price_values = price_vector(symbols, prices)',
+      'targets, quantities, residual = size_orders(amounts, weights, price_values)',
+      'gaps = []',
+      'for i, amount in enumerate(amounts):',
+      '    legs = {s: (float(quantities[i, j]), float(targets[i, j]), float(price_values[j])) for j, s in enumerate(symbols) if quantities[i, j] > 0}',
+      '    single, single_residual = allocate(amount, holdings_frame(holdings), prices)',
+      '    gaps.append([gap(legs, legacy_legs(amount, holdings, prices)) < 1e-9, gap(legs, legs_of(single)) == 0.0,',
+      '                 bool(abs(residual[i] - single_residual) < 1e-9)])',
+      'print(json.dumps([list(targets.shape), list(quantities.shape), list(residual.shape), gaps]))'
+    ])).toEqual([[4, 17], [4, 17], [4], [
+      [true, true, true], [true, true, true], [true, true, true], [true, true, true]
+    ]]);
+  });
+
+  test('should skip holdings without a usable price and keep their money as residual cash', () => {
+    expect(run([
+      'quoted = dict(prices)',
+      'quoted["T0001"] = 0.0',
+      'quoted["T0002"] = float("nan")',
+      'quoted["T0003"] = -5.0',
+      'del quoted["T0004"]',
+      'allocation, residual = allocate(10000, holdings_frame(holdings), quoted)',
+      'legs = legs_of(allocation)',
+      'usable = {s: p for s, p in quoted.items() if np.isfinite(p) and p > 0}',
+      'unpriced = allocation[allocation["Stock"].isin(["T0001", "T0002", "T0003", "T0004"])]',
+      'spent = sum(quantity * price for quantity, _, price in legs.values())',
+      'weight_left = sum(w for s, w in zip(symbols, weights) if s in ["T0001", "T0002", "T0003", "T0004"])',
+      'print(json.dumps([len(legs), gap(legs, legacy_legs(10000, holdings, usable)) < 1e-9,',
+      '                  unpriced["Quantity"].tolist(), unpriced["Amount"].tolist(),',
+      '                  abs(residual - (10000 - spent)) < 1e-9, bool(residual > 10000 * weight_left / 100 - 1)]))'
+    ])).toEqual([13, true, [0, 0, 0, 0], [0, 0, 0, 0], true, true]);
+  });
+
+  test('should keep the rounding difference as residual cash', () => {
+    expect(run([
+      'amounts = np.array([1.0, 10.0, 100.0])',
+      'price_values = price_vector(symbols, prices)',
+      'targets, quantities, residual = size_orders(amounts, weights, price_values, decimals=0)',
+      'spent = quantities @ price_values',
+      'print(json.dumps([bool(np.all(quantities >= 0)), bool(np.allclose(residual, amounts - spent)),',
+      '                  bool(np.all(np.abs(residual) <= 0.5 * price_values.sum() + 1e-9)),',
+      '                  quantities[0].tolist() == [0.0] * 17]))'
+    ])).toEqual([true, true, true, true]);
+  });
+
+  test('should report dollar drift against held positions', () => {
+    expect(run([
+      'held = {"T0000": 3.0, "T0001": 0.5, "T0002": float("nan")}',
+      'allocation, _ = allocate(10000, holdings_frame(holdings), prices, held)',
+      'expected = [(held.get(s, 0.0) if s != "T0002" else 0.0) - q for s, q in zip(allocation["Stock"], allocation["Quantity"])]',
+      'expected = [d * prices[s] for d, s in zip(expected, symbols)]',
+      'unpriced = drift([1.0, 2.0], [3.0, 1.0], [float("nan"), 10.0]).tolist()',
+      'print(json.dumps([bool(np.allclose(allocation["Drift"], expected)), bool(allocation["Drift"].iloc[3] < 0), unpriced]))'
+    ])).toEqual([true, true, [0, -10]]);
+  });
+});
@@ -0,0 +1,86 @@
+const path = require('path');
+const { decodeFrame, toResult, SCHEMA_VERSION } = require('../columnar');
+
+// setup.js mocks child_process for the route tests; these run real interpreters
+const { spawnSync } = jest.requireActual('child_process');
+
+describe('Columnar Frames', () => {
+  const scriptsDir = path.join(__dirname, '..', 'scripts');
+
+  // Encode a frame with scripts/columnar.py and return it with the JSON the
+  // worker would have sent for the same result
+  const encode = (schema, result, tables) => {
+    const code = [
+      'import json, sys',
+      'import columnar',
+      'result, tables = json.loads(sys.argv[1]), json.loads(sys.argv[2])',
+      'meta = {key: value for key, value in result.items() if key not in tables}',
+      'frame = columnar.encode(sys.argv[3], meta, {path: (layout, columnar.record_columns(result[path]) if layout == "records" else result[path]) for path, layout in tables.items()})',
+      'sys.stdout.buffer.write(frame)'
+    ].join('\n');
+    const output = spawnSync('python3', ['-c', code, JSON.stringify(result), JSON.stringify(tables), schema], { cwd: scriptsDir });
+    return output.stdout;
+  };
+
+  const portfolio = {
+    'Portfolio Name': 'AlphaFlex Growth',
+    Holdings: [
+      { Stock: 'NVDA', 'Market Cap': 3.2e12, Revenue: 1.3e11, Volatility: 0.52, 'Stock Allocation Weight (%)': 12 },
+      { Stock: 'AAPL', 'Market Cap': 3.4e12, Revenue: 3.9e11, Volatility: 0.27, 'Stock Allocation Weight (%)': 8 }
+    ]
+  };
+
+  test('should rebuild the holdings payload the JSON path returns', () => {
+    const frame = decodeFrame(encode('holdings', portfolio, { Holdings: 'records' }));
+
+    expect(frame.schema).toBe('holdings');
+    expect(frame.version).toBe(SCHEMA_VERSION);
+    expect(frame.tables.Holdings.rows).toBe(2);
+    expect(frame.tables.Holdings.columns.Stock).toEqual(['NVDA', 'AAPL']);
+    expect(frame.tables.Holdings.columns.Volatility).toBeInstanceOf(Float64Array);
+    expect(toResult(frame)).toEqual(portfolio);
+  });
+
+  test('should nest dotted columns and keep nulls and column layouts', () => {
+    const series = {
+      holdings: [
+        { Stock: 'NVDA', contribution: { '1D': 0.5, '3Y': null } },
+        { Stock: 'Ünïcode', contribution: { '1D': -0.25, '3Y': 4 } }
+      ],
+      series: { dates: ['2026-10-15', '2026-10-16'], values: [1, 1.012] },
+      as_of: '2026-10-16'
+    };
+
+    const frame = decodeFrame(encode('analytics', series, { holdings: 'records', series: 'columns' }));
+    expect(toResult(frame)).toEqual(series);
+  });
+
+  test('should keep nulls in text columns', () => {
+    const result = {
+      holdings: [
+        { Stock: 'NVDA', sector: null, note: 'core' },
+        { Stock: 'AAPL', sector: 'Tech', note: null },
+        { Stock: 'KO', sector: 'Staples', note: 'None' }
+      ],
+      series: { dates: ['2026-10-15', null], labels: [null, 'Ünïcode'] }
+    };
+
+    const data = encode('analytics', result, { holdings: 'records', series: 'columns' });
+    const frame = decodeFrame(data);
+    expect(frame.tables.holdings.columns.sector).toEqual([null, 'Tech', 'Staples']);
+    expect(toResult(frame)).toEqual(result);
+
+    // The Python decoder rebuilds the same result
+    const code = 'import json, sys, columnar; print(json.dumps(columnar.to_result(sys.stdin.buffer.read())))';
+    const decoded = spawnSync('python3', ['-c', code], { cwd: scriptsDir, input: data, encoding: 'utf8' });
+    expect(JSON.parse(decoded.stdout)).toEqual(result);
+  });
+
+  test('should reject frames from an unknown schema version', () => {
+    const data = Buffer.from(encode('holdings', portfolio, { Holdings: 'records' }));
+    data.writeUInt16LE(SCHEMA_VERSION + 1, 4);
+
+    expect(() => decodeFrame(data)).toThrow('Unsupported columnar schema version');
+    expect(() => decodeFrame(Buffer.from('{"id": 1}'))).toThrow('Not a columnar frame');
+  });
+});
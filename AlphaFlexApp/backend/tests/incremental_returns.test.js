@@ -0,0 +1,129 @@
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+
+// setup.js mocks child_process for the route tests; these run real interpreters
+const { spawnSync } = jest.requireActual('child_process');
+
+describe('Incremental Horizon Returns', () => {
+  const backendDir = path.join(__dirname, '..');
+  let workDir;
+
+  // Run a snippet against scripts/incremental_returns.py with random-walk
+  // closes from benchmarks/fakes, in a scratch directory holding the price
+  // store, and parse what it prints
+  const run = (lines) => {
+    const code = [
+      'import json',
+      'import numpy as np',
+      'import pandas as pd',
+      'import fake_market',
+      'from backtest_engine import compute_horizon_returns',
+      'from incremental_returns import *',
+      'tickers = fake_market.tickers(6)',
+      'weights = pd.Series(fake_market.weights(6), index=tickers)',
+      'weights = weights / weights.sum()',
+      'prices = fake_market.price_history(tickers, start="2023-06-01", end="2025-03-31")',
+      // A late listing, a halted ticker and scattered missing bars
+      'prices.loc[:"2024-12-15", "T0005"] = np.nan',
+      'prices.loc["2025-01-20":"2025-02-07", "T0004"] = np.nan',
+      'prices.iloc[::7, 2] = np.nan',
+      'def same(a, b):',
+      '    return bool(np.allclose(decode(a), decode(b), equal_nan=True, rtol=0, atol=1e-9))',
+      'def mismatches(state, full):',
+      '    found = []',
+      '    if state["dates"][-2:] != full["dates"][-2:]:',
+      '        found.append("dates")',
+      '    if not (same(state["settled"], full["settled"]) and same(state["last"], full["last"])):',
+      '        found.append("closes")',
+      '    for period in PERIODS:',
+      '        ours, theirs = state["anchors"][period], full["anchors"][period]',
+      '        if ours["date"] != theirs["date"] or not same(ours["base"], theirs["base"]) or not same(ours["shares"], theirs["shares"]):',
+      '            found.append(period)',
+      '    if returns_from_state(state) != returns_from_state(full):',
+      '        found.append("returns")',
+      '    return found',
+      ...lines
+    ].join('\n');
+    const result = spawnSync('python3', ['-c', code], {
+      cwd: workDir,
+      encoding: 'utf8',
+      env: {
+        ...process.env,
+        PYTHONPATH: [path.join(backendDir, 'benchmarks', 'fakes'), path.join(backendDir, 'scripts')].join(path.delimiter)
+      }
+    });
+    return JSON.parse(result.stdout);
+  };
+
+  beforeEach(() => {
+    workDir = fs.mkdtempSync(path.join(os.tmpdir(), 'incremental-returns-'));
+  });
+
+  afterEach(() => {
+    fs.rmSync(workDir, { recursive: true, force: true });
+  });
+
+  test('should match a full recompute after every daily and intraday refresh', () => {
+    expect(run([
+      'start = prices.index.get_loc(pd.Timestamp("2024-11-29"))',
+      'state = build_state(weights, prices.iloc[:start])',
+      'failures = []',
+      'steps = 0',
+      'for end in range(start + 1, len(prices) + 1):',
+      // Mid-session the latest bar is provisional; the next refresh replaces it
+      '    intraday = prices.iloc[:end].copy()',
+      '    intraday.iloc[-1] = intraday.iloc[-1] * 0.97',
+      '    for window in [intraday, prices.iloc[:end]]:',
+      '        state = update_state(json.loads(json.dumps(state)), window)',
+      '        if state is None:',
+      '            failures.append([str(window.index[-1].date()), "rebuild"])',
+      '            state = build_state(weights, window)',
+      '            continue',
+      '        found = mismatches(state, build_state(weights, window))',
+      '        if returns_from_state(state) != compute_horizon_returns(window, weights):',
+      '            found.append("backtest")',
+      '        if found:',
+      '            failures.append([str(window.index[-1].date()), found])',
+      '        steps += 1',
+      'print(json.dumps([steps, failures]))'
+    ])).toEqual([2 * 87, []]);
+  });
+
+  test('should match a full recompute when refreshes skip several days', () => {
+    expect(run([
+      'start = prices.index.get_loc(pd.Timestamp("2024-11-29"))',
+      'state = build_state(weights, prices.iloc[:start])',
+      'failures = []',
+      'for end in range(start + 3, len(prices) + 1, 3):',
+      '    window = prices.iloc[:end]',
+      '    state = update_state(json.loads(json.dumps(state)), window)',
+      '    if state is None:',
+      '        failures.append([str(window.index[-1].date()), "rebuild"])',
+      '        state = build_state(weights, window)',
+      '    elif mismatches(state, build_state(weights, window)):',
+      '        failures.append([str(window.index[-1].date()), mismatches(state, build_state(weights, window))])',
+      'print(json.dumps(failures))'
+    ])).toEqual([]);
+  });
+
+  test('should ask for a rebuild when the stored history no longer lines up', () => {
+    expect(run([
+      'state = build_state(weights, prices.loc[:"2025-02-28"])',
+      'gap = prices.drop(index=pd.Timestamp(state["dates"][-2]))',
+      'print(json.dumps([update_state(state, prices.loc[:"2025-02-28"]) is None,',
+      '                  update_state(state, gap) is None,',
+      '                  update_state(state, prices.loc[:"2025-03-14"]) is None]))'
+    ])).toEqual([false, true, false]);
+  });
+
+  test('should persist the state next to the price store', () => {
+    expect(run([
+      'state = build_state(weights, prices)',
+      'save_state(state)',
+      'loaded = load_state()',
+      'print(json.dumps([os.path.dirname(STATE_FILE) == STORE_DIR, mismatches(loaded, state),',
+      '                  [name for name in os.listdir(STORE_DIR) if name.endswith(".tmp")]]))'
+    ])).toEqual([true, [], []]);
+  });
+});
@@ -0,0 +1,59 @@
+const path = require('path');
+
+// setup.js mocks child_process for the route tests; these run real interpreters
+const { spawnSync } = jest.requireActual('child_process');
+
+describe('Market Calendar', () => {
+  const scriptsDir = path.join(__dirname, '..', 'scripts');
+
+  // Ask scripts/market_calendar.py about a list of ISO instants
+  const query = (method, instants, calendar = 'market_calendar') => {
+    const code = [
+      'import json, sys',
+      'from datetime import datetime',
+      'from market_calendar import market_calendar, exchange_calendar',
+      `print(json.dumps([${calendar}.${method}(datetime.fromisoformat(t).timestamp()) for t in json.loads(sys.argv[1])]))`
+    ].join('\n');
+    const result = spawnSync('python3', ['-c', code, JSON.stringify(instants)], { cwd: scriptsDir, encoding: 'utf8' });
+    return JSON.parse(result.stdout);
+  };
+
+  test('should follow the 9:00 AM - 2:30 PM Chicago window on trading days', () => {
+    expect(query('is_open', [
+      '2024-02-26T08:59:00-06:00',
+      '2024-02-26T09:00:00-06:00',
+      '2024-02-26T14:30:00-06:00',
+      '2024-02-26T14:31:00-06:00',
+      '2024-02-24T10:00:00-06:00'
+    ])).toEqual([false, true, true, false, false]);
+  });
+
+  test('should be closed on exchange holidays and close early on half days', () => {
+    expect(query('is_open', [
+      '2025-11-27T10:00:00-06:00', // Thanksgiving
+      '2026-04-03T10:00:00-05:00', // Good Friday
+      '2026-07-03T10:00:00-05:00', // Independence Day observed
+      '2025-11-28T11:00:00-06:00', // Day after Thanksgiving, before the early close
+      '2025-11-28T12:00:00-06:00'
+    ])).toEqual([false, false, false, true, false]);
+  });
+
+  test('should report the next open and the time left in the window', () => {
+    const [nextOpen] = query('next_open', ['2025-11-26T15:00:00-06:00']);
+    expect(new Date(nextOpen * 1000).toISOString()).toBe('2025-11-28T15:00:00.000Z');
+
+    expect(query('seconds_to_close', ['2025-11-28T11:00:00-06:00', '2025-11-28T12:00:00-06:00']))
+      .toEqual([1800, 0]);
+  });
+
+  test('should keep the exchange session open until the 3:00 PM close', () => {
+    expect(query('is_open', [
+      '2024-02-26T08:29:00-06:00',
+      '2024-02-26T08:30:00-06:00',
+      '2024-02-26T14:45:00-06:00',
+      '2024-02-26T15:01:00-06:00',
+      '2025-11-28T11:45:00-06:00', // Early close day, after the order window
+      '2025-11-28T12:01:00-06:00'
+    ], 'exchange_calendar')).toEqual([false, true, true, false, true, false]);
+  });
+});
@@ -0,0 +1,39 @@
+const path = require('path');
+
+// setup.js mocks child_process for the route tests; these run real interpreters
+const { spawnSync } = jest.requireActual('child_process');
+
+describe('Metrics', () => {
+  const scriptsDir = path.join(__dirname, '..', 'scripts');
+
+  // Run a snippet against scripts/metrics.py; returns what it printed and logged
+  const run = (lines) => {
+    const code = ['import json, logging', 'from metrics import *', ...lines].join('\n');
+    const result = spawnSync('python3', ['-c', code], { cwd: scriptsDir, encoding: 'utf8' });
+    return { output: JSON.parse(result.stdout), stderr: result.stderr };
+  };
+
+  test('should not fail what it measures when the metrics files are unwritable', () => {
+    const { output, stderr } = run([
+      'missing = "/nonexistent-dir/metrics"',
+      'recorder = Metrics(path=f"{missing}.jsonl", prom_path=f"{missing}.prom")',
+      '@recorder.run("batch")',
+      'def batch():',
+      '    for _ in range(3):',
+      '        with recorder.span("order"):',
+      '            pass',
+      '    return "placed"',
+      'result = batch()',
+      'try:',
+      '    with recorder.span("order"):',
+      '        raise KeyError("instrument")',
+      'except KeyError as e:',
+      '    raised = str(e)',
+      'print(json.dumps([result, raised, recorder.summary()["order"]["count"], recorder.summary()["order"]["errors"]]))'
+    ]);
+
+    expect(output).toEqual(['placed', "'instrument'", 4, 1]);
+    // One warning per file rather than one per span
+    expect(stderr.match(/Cannot write metrics to/g)).toHaveLength(2);
+  });
+});
@@ -0,0 +1,142 @@
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+
+// setup.js mocks child_process for the route tests; these run real interpreters
+const { spawnSync } = jest.requireActual('child_process');
+
+describe('Order Journal', () => {
+  const backendDir = path.join(__dirname, '..');
+  let workDir;
+
+  // Run a snippet against scripts/robinhood_order.py with robin_stocks
+  // resolved to benchmarks/fakes, in a scratch directory holding the journal
+  // and instrument cache. Each process starts with an empty fake broker.
+  const python = (lines) => {
+    const code = ['import json, os, random', 'import robinhood_order', 'from robinhood_order import *', ...lines].join('\n');
+    return spawnSync('python3', ['-c', code], {
+      cwd: workDir,
+      encoding: 'utf8',
+      env: {
+        ...process.env,
+        PYTHONPATH: [path.join(backendDir, 'benchmarks', 'fakes'), path.join(backendDir, 'scripts')].join(path.delimiter),
+        HOME: workDir
+      }
+    });
+  };
+
+  // Parse the last line a snippet prints
+  const run = (lines) => JSON.parse(python(lines).stdout.trim().split('\n').pop());
+
+  // Four equal legs, with the market open and no pacing between legs
+  const basket = [
+    'robinhood_order.check_market_hours = lambda: True',
+    'random.uniform = lambda a, b: 0',
+    'holdings = [{"Stock": f"T000{i}", "Stock Allocation Weight (%)": 25} for i in range(4)]',
+    'real_buy = r.orders.order_buy_fractional_by_quantity'
+  ];
+
+  // Stream a basket without --batch and kill the process once the third
+  // leg's intent is journaled; returns the streamed events and exit status
+  const crashOnThirdLeg = () => {
+    const result = python([
+      ...basket,
+      'def crash_on_third(symbol, quantity, **kwargs):',
+      '    if symbol == "T0002":',
+      '        os._exit(1)',
+      '    return real_buy(symbol, quantity, **kwargs)',
+      'r.orders.order_buy_fractional_by_quantity = crash_on_third',
+      'place_orders(1000, holdings, on_event=ndjson_writer())'
+    ]);
+    const events = result.stdout.trim().split('\n').map(line => JSON.parse(line));
+    return { events, status: result.status };
+  };
+
+  beforeEach(() => {
+    workDir = fs.mkdtempSync(path.join(os.tmpdir(), 'order-journal-'));
+  });
+
+  afterEach(() => {
+    fs.rmSync(workDir, { recursive: true, force: true });
+  });
+
+  test('should name the batch before the first leg and keep the legs of a crashed run', () => {
+    const { events, status } = crashOnThirdLeg();
+
+    expect(status).toBe(1);
+    expect(events[0]).toMatchObject({ event: 'batch', side: 'buy', resume: false });
+    expect(events.slice(1).map(event => [event.event, event.symbol])).toEqual([['placed', 'T0000'], ['placed', 'T0001']]);
+
+    expect(run([
+      `legs = get_journal().batch("${events[0].batch_id}", "buy").legs()`,
+      'print(json.dumps({symbol: leg["phase"] for symbol, leg in sorted(legs.items())}))'
+    ])).toEqual({ T0000: 'submitted', T0001: 'submitted', T0002: 'intent' });
+  });
+
+  test('should skip completed legs when resuming a crashed batch', () => {
+    const { events } = crashOnThirdLeg();
+    const batchId = events[0].batch_id;
+
+    // The new process's broker has no order for the in-flight leg, so it is placed again
+    expect(run([
+      ...basket,
+      `result = place_orders(1000, holdings, batch_id="${batchId}", resume=True)`,
+      'print(json.dumps([result["batch_id"], [s["symbol"] for s in result["skipped_stocks"]], [o["symbol"] for o in result["orders"]]]))'
+    ])).toEqual([batchId, ['T0000', 'T0001'], ['T0002', 'T0003']]);
+  });
+
+  test('should reconcile an in-flight leg the broker accepted before the crash', () => {
+    expect(run([
+      ...basket,
+      'def crash_after_third(symbol, quantity, **kwargs):',
+      '    order = real_buy(symbol, quantity, **kwargs)',
+      '    if symbol == "T0002":',
+      '        raise SystemExit(1)',
+      '    return order',
+      'r.orders.order_buy_fractional_by_quantity = crash_after_third',
+      'try:',
+      '    place_orders(1000, holdings, batch_id="accepted")',
+      'except SystemExit:',
+      '    pass',
+      'r.orders.order_buy_fractional_by_quantity = real_buy',
+      'in_flight = get_journal().batch("accepted", "buy").legs()["T0002"]["phase"]',
+      'result = place_orders(1000, holdings, batch_id="accepted", resume=True)',
+      'orders = r.get_all_stock_orders()',
+      'print(json.dumps([in_flight, result["skipped_stocks"], [o["symbol"] for o in result["orders"]], len(orders)]))'
+    ])).toEqual([
+      'intent',
+      [
+        { symbol: 'T0000', reason: 'Already submitted', order_id: 'fake-order-1' },
+        { symbol: 'T0001', reason: 'Already submitted', order_id: 'fake-order-2' },
+        { symbol: 'T0002', reason: 'Already submitted', order_id: 'fake-order-3' }
+      ],
+      ['T0003'],
+      4
+    ]);
+  });
+
+  test('should not resubmit an order the broker took despite a lost response', () => {
+    expect(run([
+      'journal = get_journal().batch("lost", "buy")',
+      'def lost_response(symbol, quantity, **kwargs):',
+      '    r.orders.order_buy_fractional_by_quantity(symbol, quantity, **kwargs)',
+      '    return None',
+      'order = journaled_call(journal, "T0001", 1.5, lost_response)',
+      'print(json.dumps([order["id"], len(r.get_all_stock_orders()), journal.legs()["T0001"]["phase"]]))'
+    ])).toEqual(['fake-order-1', 1, 'submitted']);
+  });
+
+  test('should submit again once the broker shows no order for a timed out call', () => {
+    expect(run([
+      'journal = get_journal().batch("timeout", "buy")',
+      'calls = []',
+      'def timed_out_once(symbol, quantity, **kwargs):',
+      '    calls.append(symbol)',
+      '    if len(calls) == 1:',
+      '        raise ConnectionError("Read timed out")',
+      '    return r.orders.order_buy_fractional_by_quantity(symbol, quantity, **kwargs)',
+      'order = journaled_call(journal, "T0001", 1.5, timed_out_once)',
+      'print(json.dumps([order["id"], len(calls), len(r.get_all_stock_orders()), journal.legs()["T0001"]["phase"]]))'
+    ])).toEqual(['fake-order-1', 2, 1, 'submitted']);
+  });
+});
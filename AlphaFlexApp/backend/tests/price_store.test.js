@@ -0,0 +1,114 @@
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+
+// setup.js mocks child_process for the route tests; these run real interpreters
+const { spawnSync } = jest.requireActual('child_process');
+
+describe('Price Store', () => {
+  const scriptsDir = path.join(__dirname, '..', 'scripts');
+  let workDir;
+
+  // Run a snippet against scripts/price_store.py in a scratch directory
+  // holding the store, and parse what it prints
+  const run = (lines) => {
+    const code = [
+      'import json, os',
+      'import numpy as np',
+      'import pandas as pd',
+      'import price_store',
+      'from price_store import *',
+      'def frame(value, dates, tickers):',
+      '    return pd.DataFrame(np.full((dates, len(tickers)), value), index=pd.bdate_range("2024-01-01", periods=dates), columns=tickers)',
+      'def store_files():',
+      '    return sorted(name.split("-")[0] if name.startswith("closes-") else name for name in os.listdir(STORE_DIR))',
+      ...lines
+    ].join('\n');
+    const result = spawnSync('python3', ['-c', code], {
+      cwd: workDir,
+      encoding: 'utf8',
+      env: { ...process.env, PYTHONPATH: scriptsDir }
+    });
+    return JSON.parse(result.stdout);
+  };
+
+  beforeEach(() => {
+    workDir = fs.mkdtempSync(path.join(os.tmpdir(), 'price-store-'));
+  });
+
+  afterEach(() => {
+    fs.rmSync(workDir, { recursive: true, force: true });
+  });
+
+  test('should reload the matrix it saved', () => {
+    expect(run([
+      'prices = pd.DataFrame({"NVDA": [1.5, np.nan, 3.0], "AAPL": [4.0, 5.0, np.nan]}, index=pd.to_datetime(["2024-01-03", "2024-01-02", "2024-01-04"]))',
+      'save_prices(prices)',
+      'loaded = load_prices()',
+      'print(json.dumps([list(loaded.columns), [d.strftime("%Y-%m-%d") for d in loaded.index],',
+      '                  loaded.astype(object).where(loaded.notna(), None).values.tolist(),',
+      '                  list(load_prices(["AAPL", "MSFT"]).columns), store_files()]))'
+    ])).toEqual([
+      ['NVDA', 'AAPL'],
+      ['2024-01-02', '2024-01-03', '2024-01-04'],
+      [[null, 5.0], [1.5, 4.0], [3.0, null]],
+      ['AAPL', 'MSFT'],
+      ['closes', 'index.json']
+    ]);
+  });
+
+  test('should publish a save by swapping the index and drop superseded matrices', () => {
+    expect(run([
+      'price_store.MATRIX_GRACE = 0',
+      'save_prices(frame(1.0, 3, ["A", "B"]))',
+      'first = json.load(open(INDEX_FILE))["matrix"]',
+      'save_prices(frame(2.0, 5, ["A", "B", "C"]))',
+      'second = json.load(open(INDEX_FILE))["matrix"]',
+      'after_two = store_files()',
+      'save_prices(frame(3.0, 4, ["A"]))',
+      'loaded = load_prices()',
+      'print(json.dumps([first != second, after_two, os.path.exists(os.path.join(STORE_DIR, first)),',
+      '                  os.path.exists(os.path.join(STORE_DIR, second)), list(loaded.shape), float(loaded.values.max())]))'
+    ])).toEqual([true, ['closes', 'closes', 'index.json'], false, true, [4, 1], 3.0]);
+  });
+
+  test('should leave the published store alone when a write fails', () => {
+    expect(run([
+      'save_prices(frame(1.0, 3, ["A", "B"]))',
+      'def broken(f):',
+      '    f.write(b"partial")',
+      '    raise OSError("disk full")',
+      'try:',
+      '    price_store._write_atomic(INDEX_FILE, broken)',
+      'except OSError as e:',
+      '    error = str(e)',
+      'print(json.dumps([error, list(load_prices().shape), store_files()]))'
+    ])).toEqual(['disk full', [3, 2], ['closes', 'index.json']]);
+  });
+
+  test('should never pair a matrix with another save\'s index', () => {
+    expect(run([
+      'import threading',
+      'stores = [frame(1.0, 3, ["A", "B"]), frame(2.0, 5, ["A", "B", "C"])]',
+      'save_prices(stores[0])',
+      'errors = []',
+      'def writer(n):',
+      '    for i in range(40):',
+      '        try:',
+      '            save_prices(stores[(i + n) % 2])',
+      '        except Exception as e:',
+      '            errors.append(str(e))',
+      'writers = [threading.Thread(target=writer, args=(n,)) for n in range(2)]',
+      'for thread in writers:',
+      '    thread.start()',
+      'seen = set()',
+      'while any(thread.is_alive() for thread in writers):',
+      '    loaded = load_prices()',
+      '    seen.add((loaded.shape, float(loaded.values.min()), float(loaded.values.max())))',
+      'for thread in writers:',
+      '    thread.join()',
+      'leftovers = [name for name in os.listdir(STORE_DIR) if name.endswith(".tmp")]',
+      'print(json.dumps([seen <= {((3, 2), 1.0, 1.0), ((5, 3), 2.0, 2.0)}, errors, leftovers]))'
+    ])).toEqual([true, [], []]);
+  });
+});
@@ -0,0 +1,153 @@
+const { EventEmitter } = require('events');
+const { PassThrough } = require('stream');
+const { SCHEMA_VERSION } = require('../columnar');
+
+describe('Python Worker', () => {
+  let pythonWorker;
+  let fakeProcess;
+  let requests;
+  let spawn;
+
+  const createFakeProcess = () => {
+    const proc = new EventEmitter();
+    proc.stdout = new PassThrough();
+    proc.stderr = new PassThrough();
+    proc.stdin = new PassThrough();
+    proc.stdin.on('data', (data) => {
+      data.toString().trim().split('\n').forEach(line => requests.push(JSON.parse(line)));
+    });
+    return proc;
+  };
+
+  const reply = (message) => {
+    fakeProcess.stdout.write(JSON.stringify(message) + '\n');
+  };
+
+  beforeEach(() => {
+    jest.resetModules();
+    requests = [];
+    fakeProcess = createFakeProcess();
+    spawn = require('child_process').spawn;
+    spawn.mockReturnValue(fakeProcess);
+    pythonWorker = require('../python-worker');
+  });
+
+  afterEach(() => {
+    pythonWorker.stop();
+  });
+
+  test('should spawn a single process for multiple calls', async () => {
+    const started = pythonWorker.start();
+    reply({ id: null, event: 'ready' });
+    await started;
+
+    const first = pythonWorker.call('ping');
+    const second = pythonWorker.call('get_portfolio');
+    await new Promise(resolve => setImmediate(resolve));
+
+    reply({ id: requests[1].id, result: { 'Portfolio Name': 'AlphaFlex Growth' } });
+    reply({ id: requests[0].id, result: { success: true } });
+
+    await expect(first).resolves.toEqual({ success: true });
+    await expect(second).resolves.toEqual({ 'Portfolio Name': 'AlphaFlex Growth' });
+    expect(spawn).toHaveBeenCalledTimes(1);
+  });
+
+  test('should reject calls that return an error', async () => {
+    const started = pythonWorker.start();
+    reply({ id: null, event: 'ready' });
+    await started;
+
+    const call = pythonWorker.call('verify_order_status', { order_id: 'abc' });
+    await new Promise(resolve => setImmediate(resolve));
+    reply({ id: requests[0].id, error: 'Authentication required or has expired' });
+
+    await expect(call).rejects.toThrow('Authentication required or has expired');
+  });
+
+  test('should deliver progress events before the streamed result', async () => {
+    const started = pythonWorker.start();
+    reply({ id: null, event: 'ready' });
+    await started;
+
+    const events = [];
+    const call = pythonWorker.stream('place_orders', { total_amount: 100, holdings: [] }, event => events.push(event));
+    await new Promise(resolve => setImmediate(resolve));
+    expect(requests[0]).toMatchObject({ method: 'place_orders', stream: true });
+
+    reply({ id: requests[0].id, progress: { event: 'placed', symbol: 'NVDA' } });
+    reply({ id: requests[0].id, progress: { event: 'failed', symbol: 'AAPL' } });
+    reply({ id: requests[0].id, result: { success: true, orders_placed: 1, orders_failed: 1 } });
+
+    await expect(call).resolves.toEqual({ success: true, orders_placed: 1, orders_failed: 1 });
+    expect(events).toEqual([
+      { event: 'placed', symbol: 'NVDA' },
+      { event: 'failed', symbol: 'AAPL' }
+    ]);
+  });
+
+  test('should decode a columnar frame that follows its header line', async () => {
+    const started = pythonWorker.start();
+    reply({ id: null, event: 'ready' });
+    await started;
+
+    const call = pythonWorker.frame('get_portfolio');
+    await new Promise(resolve => setImmediate(resolve));
+    expect(requests[0]).toMatchObject({ method: 'get_portfolio', format: 'columnar' });
+
+    // A frame with an f64 column holding [1.5, 2.5] and a utf8 column holding
+    // ['NVDA', null], written in two pieces
+    const json = JSON.stringify({
+      schema: 'test',
+      meta: { name: 'AlphaFlex Growth' },
+      tables: {
+        rows: {
+          layout: 'columns',
+          rows: 2,
+          columns: [
+            { name: 'value', type: 'f64', offset: 0, length: 16 },
+            { name: 'symbol', type: 'utf8', validity: 4, offset: 16, length: 20 }
+          ]
+        }
+      }
+    });
+    const header = Buffer.from(json.padEnd(Math.ceil((json.length + 12) / 8) * 8 - 12));
+    const prefix = Buffer.alloc(12);
+    prefix.write('AFCF', 0, 'latin1');
+    prefix.writeUInt16LE(SCHEMA_VERSION, 4);
+    prefix.writeUInt32LE(header.length, 8);
+    const values = Buffer.alloc(16);
+    values.writeDoubleLE(1.5, 0);
+    values.writeDoubleLE(2.5, 8);
+    // Validity bitmap (row 0 set, padded to 4 bytes), offsets [0, 4, 4], then the text
+    const symbols = Buffer.alloc(20);
+    symbols.writeUInt8(0b01, 0);
+    [0, 4, 4].forEach((offset, i) => symbols.writeUInt32LE(offset, 4 + i * 4));
+    symbols.write('NVDA', 16, 'utf8');
+    const frame = Buffer.concat([prefix, header, values, symbols]);
+
+    fakeProcess.stdout.write(JSON.stringify({ id: requests[0].id, frame: frame.length }) + '\n');
+    fakeProcess.stdout.write(frame.subarray(0, 20));
+    fakeProcess.stdout.write(Buffer.concat([frame.subarray(20), Buffer.from(JSON.stringify({ id: 99, result: {} }) + '\n')]));
+
+    const decoded = await call;
+    expect(decoded.version).toBe(SCHEMA_VERSION);
+    expect(decoded.meta).toEqual({ name: 'AlphaFlex Growth' });
+    expect(Array.from(decoded.tables.rows.columns.value)).toEqual([1.5, 2.5]);
+    expect(decoded.tables.rows.columns.symbol).toEqual(['NVDA', null]);
+  });
+
+  test('should reject pending calls when the process exits', async () => {
+    const started = pythonWorker.start();
+    reply({ id: null, event: 'ready' });
+    await started;
+
+    // Keep the worker from restarting once the fake process exits
+    pythonWorker.stopped = true;
+    const call = pythonWorker.call('get_all_performance');
+    await new Promise(resolve => setImmediate(resolve));
+    fakeProcess.emit('exit', 1);
+
+    await expect(call).rejects.toThrow('Python worker exited');
+  });
+});
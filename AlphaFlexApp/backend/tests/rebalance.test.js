@@ -0,0 +1,116 @@
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+
+// setup.js mocks child_process for the route tests; these run real interpreters
+const { spawnSync } = jest.requireActual('child_process');
+
+describe('Batched Rebalancing', () => {
+  const backendDir = path.join(__dirname, '..');
+  let workDir;
+
+  // Run a snippet against scripts/rebalance.py with robin_stocks resolved to
+  // benchmarks/fakes, in a scratch directory holding the journal, the result
+  // files and two accounts' stored sessions, and parse the last line it prints
+  const run = (lines) => {
+    const code = [
+      'import json, os, pickle',
+      'import rebalance',
+      'from rebalance import *',
+      'from session_manager import TOKEN_DIR',
+      'TOKEN_DIR.mkdir(parents=True, exist_ok=True)',
+      'accounts = [{"username": "first@example.com", "amount": 1000}, {"username": "second@example.com", "amount": 2500}]',
+      'for account in accounts:',
+      '    with open(session_manager.pickle_path(account["username"]), "wb") as f:',
+      '        pickle.dump({"token_type": "Bearer", "access_token": "token", "refresh_token": "refresh"}, f)',
+      'holdings = [{"Stock": f"T000{i}", "Stock Allocation Weight (%)": weight} for i, weight in enumerate([40, 30, 20, 10])]',
+      'def account_result(username, batch_id):',
+      '    with open(os.path.join(RESULTS_DIR, batch_id, f"{session_manager.pickle_name(username)}.json")) as f:',
+      '        return json.load(f)',
+      ...lines
+    ].join('\n');
+    const result = spawnSync('python3', ['-c', code], {
+      cwd: workDir,
+      encoding: 'utf8',
+      env: {
+        ...process.env,
+        PYTHONPATH: [path.join(backendDir, 'benchmarks', 'fakes'), path.join(backendDir, 'scripts')].join(path.delimiter),
+        HOME: workDir
+      }
+    });
+    return JSON.parse(result.stdout.trim().split('\n').pop());
+  };
+
+  beforeEach(() => {
+    workDir = fs.mkdtempSync(path.join(os.tmpdir(), 'rebalance-'));
+  });
+
+  afterEach(() => {
+    fs.rmSync(workDir, { recursive: true, force: true });
+  });
+
+  test('should size every account by weight and write one result file per account', () => {
+    expect(run([
+      'rebalance.check_market_hours = lambda: True',
+      'summary = rebalance_accounts(holdings, accounts, rate_limit=1000, batch_id="sized")',
+      'checks = []',
+      'for account in accounts:',
+      '    result = account_result(account["username"], "sized")',
+      '    prices = {o["symbol"]: o["price"] for o in result["orders"]}',
+      '    expected = {h["Stock"]: round(account["amount"] * h["Stock Allocation Weight (%)"] / 100 / prices[h["Stock"]], 6) for h in holdings}',
+      '    checks.append([',
+      '        result["username"],',
+      '        sorted(o["symbol"] for o in result["orders"]),',
+      '        all(abs(o["shares"] - expected[o["symbol"]]) < 1e-9 for o in result["orders"]),',
+      '        result["total_allocated"],',
+      '        abs(result["residual_cash"] - (account["amount"] - sum(o["shares"] * o["price"] for o in result["orders"]))) < 1e-6,',
+      '        result["market_closed"],',
+      '    ])',
+      'print(json.dumps([summary["accounts_succeeded"], checks]))'
+    ])).toEqual([2, [
+      ['first@example.com', ['T0000', 'T0001', 'T0002', 'T0003'], true, 1000, true, false],
+      ['second@example.com', ['T0000', 'T0001', 'T0002', 'T0003'], true, 2500, true, false]
+    ]]);
+  });
+
+  test('should stop at the cutoff and finish the batch on resume', () => {
+    expect(run([
+      // The window closes once the first account's second order is in
+      'closed = [False]',
+      'rebalance.check_market_hours = lambda: not closed[0]',
+      'real_submit = rebalance.submit_buy_order',
+      'submitted = []',
+      'def submit_then_close(*args, **kwargs):',
+      '    order = real_submit(*args, **kwargs)',
+      '    submitted.append(order["symbol"])',
+      '    closed[0] = len(submitted) == 2',
+      '    return order',
+      'rebalance.submit_buy_order = submit_then_close',
+      'cut = rebalance_accounts(holdings, accounts, max_workers=1, rate_limit=1000, batch_id="cutoff")',
+      'first = account_result("first@example.com", "cutoff")',
+      'second = account_result("second@example.com", "cutoff")',
+      'closed[0] = False',
+      'rebalance.submit_buy_order = real_submit',
+      'resumed = rebalance_accounts(holdings, accounts, max_workers=1, rate_limit=1000, batch_id="cutoff", resume=True)',
+      'first_resumed = account_result("first@example.com", "cutoff")',
+      'second_resumed = account_result("second@example.com", "cutoff")',
+      'print(json.dumps([',
+      '    cut["accounts_market_closed"],',
+      '    [len(first["orders"]), [f["symbol"] for f in first["failed_orders"] if f.get("market_closed")], first["market_closed"]],',
+      '    [second["skipped"], second["error_type"], second["batch_id"]],',
+      '    resumed["accounts_market_closed"],',
+      '    [first_resumed["orders_skipped"], sorted(o["symbol"] for o in first_resumed["orders"])],',
+      '    [second_resumed["orders_skipped"], len(second_resumed["orders"])],',
+      '    len(r.get_all_stock_orders())',
+      ']))'
+    ])).toEqual([
+      2,
+      [2, ['T0002', 'T0003'], true],
+      [true, 'market_closed', 'cutoff'],
+      0,
+      [2, ['T0002', 'T0003']],
+      [0, 4],
+      8
+    ]);
+  });
+});
@@ -0,0 +1,95 @@
+const path = require('path');
+
+// setup.js mocks child_process for the route tests; these run real interpreters
+const { spawnSync } = jest.requireActual('child_process');
+
+describe('Broker Retry Policy', () => {
+  const scriptsDir = path.join(__dirname, '..', 'scripts');
+
+  // Run a snippet against scripts/retry_policy.py and parse what it prints
+  const run = (lines) => {
+    const code = ['import json', 'from retry_policy import *', ...lines].join('\n');
+    const result = spawnSync('python3', ['-c', code], { cwd: scriptsDir, encoding: 'utf8' });
+    return JSON.parse(result.stdout);
+  };
+
+  test('should retry throttling and transient errors but not insufficient funds', () => {
+    expect(run([
+      'errors = [',
+      '    Exception("Request was throttled. Expected available in 7 seconds."),',
+      '    ConnectionError("Connection reset by peer"),',
+      '    BrokerError("Not enough buying power."),',
+      '    BrokerError("Not enough shares to sell."),',
+      '    BrokerError("Service unavailable", status=503),',
+      '    KeyError("instrument"),',
+      ']',
+      'print(json.dumps([list(classify(e)) for e in errors]))'
+    ])).toEqual([[true, 7], [true, null], [false, null], [false, null], [true, null], [false, null]]);
+  });
+
+  test('should keep jittered backoff within the exponential cap', () => {
+    expect(run([
+      'policy = RetryPolicy(base_delay=1, max_delay=4)',
+      'print(json.dumps([max(policy.backoff(a) for _ in range(500)) <= min(4, 2 ** (a - 1)) for a in range(1, 6)]))'
+    ])).toEqual([true, true, true, true, true]);
+  });
+
+  test('should stop at the first fatal error and retry transient ones', () => {
+    expect(run([
+      'policy = RetryPolicy(max_attempts=3, base_delay=0, max_delay=0)',
+      'calls = []',
+      'def flaky():',
+      '    calls.append(1)',
+      '    if len(calls) < 3:',
+      '        raise ConnectionError("timed out")',
+      '    return {"id": "abc"}',
+      'order = policy.call("order", flaky, validate=accepted_order)',
+      'try:',
+      '    policy.call("order", lambda: {"detail": "Not enough buying power."}, validate=accepted_order)',
+      'except BrokerError as e:',
+      '    rejected = str(e)',
+      'print(json.dumps([order["id"], len(calls), rejected]))'
+    ])).toEqual(['abc', 3, 'Not enough buying power.']);
+  });
+
+  test('should only retry order calls that certainly created no order', () => {
+    expect(run([
+      'errors = [',
+      '    Exception("Request was throttled. Expected available in 7 seconds."),',
+      '    BrokerError("Service unavailable", status=503),',
+      '    ConnectionError("Read timed out"),',
+      '    ConnectionRefusedError("Connection refused"),',
+      '    BrokerError("Not enough buying power."),',
+      ']',
+      'calls = []',
+      'def lost_response():',
+      '    calls.append(1)',
+      '    return None',
+      'policy = RetryPolicy(max_attempts=3, base_delay=0, max_delay=0, classify=classify_order)',
+      'try:',
+      '    policy.call("order", lost_response, validate=accepted_order)',
+      'except OrderOutcomeUnknown as e:',
+      '    unknown = str(e)',
+      'print(json.dumps([[list(classify_order(e)) for e in errors], len(calls), unknown]))'
+    ])).toEqual([
+      [[true, 7], [false, null], [false, null], [true, null], [false, null]],
+      1,
+      'Order was not acknowledged: None'
+    ]);
+  });
+
+  test('should open when the failure rate spikes and close after a good trial call', () => {
+    expect(run([
+      'breaker = CircuitBreaker(window=10, min_calls=4, failure_rate=0.5, cooldown=0.05)',
+      'states = []',
+      'for success in (True, False, True, False):',
+      '    breaker.record(success)',
+      '    states.append(breaker.state())',
+      'breaker.wait()',
+      'states.append(breaker.state())',
+      'breaker.record(True)',
+      'states.append(breaker.state())',
+      'print(json.dumps([states, breaker.trips]))'
+    ])).toEqual([['closed', 'closed', 'closed', 'open', 'half_open', 'closed'], 1]);
+  });
+});
@@ -0,0 +1,55 @@
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+
+// setup.js mocks child_process for the route tests; these run real interpreters
+const { spawnSync } = jest.requireActual('child_process');
+
+describe('Python Startup Time', () => {
+  const backendDir = path.join(__dirname, '..');
+  const budgetMs = Number(process.env.STARTUP_BUDGET_MS || 1000);
+  const heavyModules = ['pandas', 'numpy', 'robin_stocks', 'pytz', 'alpha_flex', 'yfinance'];
+
+  const runScript = (args, pythonArgs = [], env = process.env) => {
+    const start = process.hrtime.bigint();
+    const result = spawnSync('python3', [...pythonArgs, 'scripts/robinhood_order.py', ...args], {
+      cwd: backendDir,
+      encoding: 'utf8',
+      env
+    });
+    return { ...result, elapsedMs: Number(process.hrtime.bigint() - start) / 1e6 };
+  };
+
+  const importedModules = (stderr) => stderr
+    .split('\n')
+    .filter(line => line.startsWith('import time:'))
+    .map(line => line.split('|')[2].trim());
+
+  // Resolves robin_stocks to the offline stand-ins in benchmarks/fakes, with
+  // an empty home so no stored session is picked up
+  const offlineEnv = () => ({
+    ...process.env,
+    PYTHONPATH: [
+      path.join(backendDir, 'benchmarks', 'fakes'),
+      path.join(backendDir, 'scripts'),
+      process.env.PYTHONPATH || ''
+    ].join(path.delimiter),
+    HOME: fs.mkdtempSync(path.join(os.tmpdir(), 'startup-time-'))
+  });
+
+  test('should cold start verify within the budget', () => {
+    // No warm-up run: the subcommand's own imports count against the budget
+    const { stdout, elapsedMs } = runScript(['verify', 'startup-check'], [], offlineEnv());
+
+    expect(JSON.parse(stdout)).toMatchObject({ success: false, error: 'Order startup-check not found' });
+    expect(elapsedMs).toBeLessThan(budgetMs);
+  });
+
+  test('should not import heavy dependencies before they are needed', () => {
+    const { stderr } = runScript(['verify'], ['-X', 'importtime']);
+    const imported = importedModules(stderr);
+
+    expect(imported).toContain('session_manager');
+    heavyModules.forEach(name => expect(imported).not.toContain(name));
+  });
+});
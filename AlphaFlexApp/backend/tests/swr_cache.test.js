@@ -0,0 +1,52 @@
+const { StaleWhileRevalidateCache } = require('../swr-cache');
+
+describe('Stale-While-Revalidate Cache', () => {
+  const DAY = 24 * 60 * 60 * 1000;
+
+  const createCache = (entry, refreshValue = { fresh: true }) => {
+    let resolveRefresh;
+    const refresh = jest.fn(() => new Promise((resolve) => {
+      resolveRefresh = () => resolve(refreshValue);
+    }));
+    const save = jest.fn().mockResolvedValue();
+    const cache = new StaleWhileRevalidateCache({
+      name: 'test',
+      load: jest.fn().mockResolvedValue(entry),
+      save,
+      refresh
+    });
+    return { cache, refresh, save, finishRefresh: () => resolveRefresh() };
+  };
+
+  test('should serve fresh data without refreshing', async () => {
+    const { cache, refresh } = createCache({ value: { cached: true }, lastUpdated: new Date().toISOString() });
+
+    await expect(cache.get()).resolves.toEqual({ cached: true });
+    expect(refresh).not.toHaveBeenCalled();
+  });
+
+  test('should serve stale data immediately and refresh once in the background', async () => {
+    const stale = { value: { cached: true }, lastUpdated: new Date(Date.now() - 2 * DAY).toISOString() };
+    const { cache, refresh, save, finishRefresh } = createCache(stale);
+
+    await expect(cache.get()).resolves.toEqual({ cached: true });
+    await expect(cache.get()).resolves.toEqual({ cached: true });
+    expect(refresh).toHaveBeenCalledTimes(1);
+
+    finishRefresh();
+    await cache.inflight;
+    expect(save).toHaveBeenCalledWith({ fresh: true });
+    expect(cache.inflight).toBeNull();
+  });
+
+  test('should wait for the first fill when nothing is cached', async () => {
+    const { cache, refresh, finishRefresh } = createCache(null);
+
+    const pending = cache.get();
+    await new Promise(resolve => setImmediate(resolve));
+    finishRefresh();
+
+    await expect(pending).resolves.toEqual({ fresh: true });
+    expect(refresh).toHaveBeenCalledTimes(1);
+  });
+});